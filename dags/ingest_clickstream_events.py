@@ -17,6 +17,7 @@ Author: Zaid Shaikh
 ============================================
 """
 
+import json
 import logging
 import os
 from datetime import datetime, timedelta
@@ -51,6 +52,13 @@ S3_RAW_BUCKET = os.getenv("S3_RAW_BUCKET", "ecommerce-raw-data-bnf5etbn")
 # Local data path (for initial load)
 DATA_PATH = "/opt/airflow/data/generated/clickstream_events.csv"
 
+# Typed Parquet output of generate_data.py --format parquet (preferred if present)
+PARQUET_DATA_PATH = "/opt/airflow/data/generated/clickstream_events.parquet"
+
+# Hive-partitioned output of generate_data.py --partition-by (preferred if present)
+PARTITIONED_DATA_PATH = "/opt/airflow/data/generated/clickstream_events"
+PARTITION_MANIFEST = "_manifest.json"
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
@@ -67,12 +75,44 @@ def get_execution_date(**context):
     return date_str
 
 
+def read_event_partitions(execution_date_str):
+    """
+    Read only the execution date's events from the partitioned output
+
+    Uses the partition manifests (year=/month=/day=, plus any hour=
+    sub-partitions) to find the part files, so no other day is scanned.
+
+    Returns: DataFrame of the day's events (empty if the day has no partition)
+    """
+    year, month, day = execution_date_str.split("-")
+    day_path = Path(PARTITIONED_DATA_PATH) / f"year={year}/month={month}/day={day}"
+
+    frames = []
+    for manifest_path in sorted(day_path.glob(f"**/{PARTITION_MANIFEST}")):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        logging.info(
+            f"   Partition {manifest['partition']}: {manifest['row_count']} events "
+            f"({manifest['min_event_timestamp']} to {manifest['max_event_timestamp']})"
+        )
+        for file_name in manifest["files"]:
+            file_path = manifest_path.parent / file_name
+            if file_path.suffix == ".parquet":
+                frames.append(pd.read_parquet(file_path))
+            else:
+                frames.append(pd.read_csv(file_path))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
 def read_and_filter_events(**context):
     """
     Read clickstream events from CSV and filter by execution date
 
     For initial batch load, processes all historical events.
-    For scheduled runs, would process new events only.
+    With partitioned output (generate_data.py --partition-by), reads only
+    the execution date's partitions.
 
     Returns: Number of events processed
     """
@@ -80,20 +120,46 @@ def read_and_filter_events(**context):
         key="execution_date_str", task_ids="get_execution_date"
     )
 
-    logging.info(f"Reading clickstream events from: {DATA_PATH}")
+    if os.path.isdir(PARTITIONED_DATA_PATH):
+        logging.info(
+            f"Reading {execution_date_str} partitions from: {PARTITIONED_DATA_PATH}"
+        )
+        df = read_event_partitions(execution_date_str)
+
+        if df.empty:
+            logging.info(f"No partition for {execution_date_str}")
+            context["ti"].xcom_push(key="events_data", value="[]")
+            context["ti"].xcom_push(key="event_count", value=0)
+            return 0
+
+        df["event_timestamp"] = pd.to_datetime(df["event_timestamp"])
+        logging.info(f"✅ Read {len(df)} events for {execution_date_str}")
+
+        context["ti"].xcom_push(
+            key="events_data", value=df.to_json(orient="records", date_format="iso")
+        )
+        context["ti"].xcom_push(key="event_count", value=len(df))
+        return len(df)
+
+    data_path = PARQUET_DATA_PATH if os.path.exists(PARQUET_DATA_PATH) else DATA_PATH
+
+    logging.info(f"Reading clickstream events from: {data_path}")
 
     # Check if file exists
-    if not os.path.exists(DATA_PATH):
-        logging.warning(f"⚠️ Clickstream file not found: {DATA_PATH}")
+    if not os.path.exists(data_path):
+        logging.warning(f"⚠️ Clickstream file not found: {data_path}")
         logging.info("   This is normal for scheduled runs after initial load")
         context["ti"].xcom_push(key="events_data", value="[]")
         context["ti"].xcom_push(key="event_count", value=0)
         return 0
 
-    # Read CSV
-    df = pd.read_csv(DATA_PATH)
+    # Read events (Parquet carries its own schema; CSV needs type inference)
+    if data_path == PARQUET_DATA_PATH:
+        df = pd.read_parquet(data_path)
+    else:
+        df = pd.read_csv(data_path)
 
-    logging.info(f"✅ Read {len(df)} total events from CSV")
+    logging.info(f"✅ Read {len(df)} total events from {data_path}")
 
     # Convert event_timestamp to datetime if it's not already
     df["event_timestamp"] = pd.to_datetime(df["event_timestamp"])
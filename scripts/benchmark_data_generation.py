@@ -0,0 +1,340 @@
+"""
+============================================
+Modern E-Commerce Analytics Platform
+Data Generator Benchmark Suite
+============================================
+
+Measures throughput (rows/sec) and peak memory (RSS) of each generator in
+generate_data.py at several TPC-style scale factors, and writes the results
+as JSON so regressions can be tracked between releases.
+
+Every (generator, scale factor) pair runs in a fresh process, so its peak
+RSS is not inflated by earlier runs. Inputs (e.g. the customers passed to
+generate_orders) are built before timing starts, and each generator gets
+one untimed warm-up run; `baseline_rss_mb` is the process peak before the
+generator runs.
+
+Usage:
+    python scripts/benchmark_data_generation.py
+    python scripts/benchmark_data_generation.py --scale-factors 0.1 1 --repeat 5
+    python scripts/benchmark_data_generation.py --baseline previous.json
+
+Output:
+    - JSON results in data/benchmarks/generate_data.json (--output)
+============================================
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import generate_data
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+# ============================================
+# CONFIGURATION
+# ============================================
+
+# Logging setup
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Generators benchmarked, in dependency order
+GENERATORS = [
+    "generate_customers",
+    "generate_orders",
+    "generate_order_items",
+    "generate_clickstream_events",
+]
+
+DEFAULT_SCALE_FACTORS = [0.1, 1, 10]
+DEFAULT_REPEAT = 3
+DEFAULT_OUTPUT = Path("data/benchmarks/generate_data.json")
+
+# Slowdown (fraction of baseline rows/sec) reported as a regression
+DEFAULT_MAX_REGRESSION = 0.2
+
+
+# ============================================
+# MEASUREMENT
+# ============================================
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def prepare_generator(name):
+    """
+    Build a generator's inputs and return a zero-argument call to time
+
+    Args:
+        name: Generator function name (one of GENERATORS)
+
+    Returns:
+        callable: Runs the generator at the current scale factor
+    """
+    if name == "generate_customers":
+        return lambda: generate_data.generate_customers(generate_data.N_CUSTOMERS)
+
+    customers_df = generate_data.generate_customers(generate_data.N_CUSTOMERS)
+    if name == "generate_orders":
+        return lambda: generate_data.generate_orders(
+            customers_df, generate_data.N_ORDERS
+        )
+    if name == "generate_order_items":
+        orders_df = generate_data.generate_orders(customers_df, generate_data.N_ORDERS)
+        return lambda: generate_data.generate_order_items(orders_df)
+
+    return lambda: generate_data.generate_clickstream_events(
+        customers_df, generate_data.N_CLICKSTREAM_EVENTS
+    )
+
+
+def run_benchmark(name, scale_factor, repeat):
+    """
+    Time one generator at one scale factor (runs in its own process)
+
+    Args:
+        name: Generator function name
+        scale_factor: Scale factor applied before building inputs
+        repeat: Number of timed runs (the fastest one is reported)
+
+    Returns:
+        dict: Benchmark result
+    """
+    generate_data.logger.setLevel(logging.WARNING)
+    generate_data.apply_scale_factor(scale_factor)
+    generate_data.load_identity_pools()
+
+    run = prepare_generator(name)
+    baseline_rss = peak_rss_mb()
+
+    # Untimed warm-up run (lazy imports and first-call caches)
+    run()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = run()
+        timings.append(time.perf_counter() - start)
+        rows = len(df)
+        del df
+
+    best = min(timings)
+    return {
+        "generator": name,
+        "scale_factor": scale_factor,
+        "rows": rows,
+        "seconds_best": round(best, 4),
+        "seconds_mean": round(sum(timings) / len(timings), 4),
+        "rows_per_sec": round(rows / best, 1) if best else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline_rss,
+    }
+
+
+def run_suite(scale_factors, repeat):
+    """
+    Run every generator at every scale factor, one fresh process each
+
+    Returns:
+        list: Benchmark results in run order
+    """
+    # Build the identity pool cache once instead of in every child
+    generate_data.load_identity_pools()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for scale_factor in scale_factors:
+        for name in GENERATORS:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_benchmark, (name, scale_factor, repeat))
+            results.append(result)
+
+            logger.info(
+                f"⏱️ SF {scale_factor:g} {name}: {result['rows']:,} rows, "
+                f"{result['rows_per_sec']:,.0f} rows/sec, "
+                f"peak RSS {result['peak_rss_mb']} MB"
+            )
+
+    return results
+
+
+# ============================================
+# REPORTING
+# ============================================
+
+
+def git_commit():
+    """Current git commit of the repository, if available"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results, repeat):
+    """Wrap benchmark results with the environment they were measured in"""
+    return {
+        "benchmark": "generate_data",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "repeat": repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(results, baseline_path, max_regression):
+    """
+    Log throughput changes against an earlier benchmark report
+
+    Args:
+        results: Current benchmark results
+        baseline_path: JSON report of an earlier run
+        max_regression: Slowdown fraction reported as a regression
+
+    Returns:
+        bool: True if no generator regressed by more than max_regression
+    """
+    with open(baseline_path) as f:
+        baseline = {
+            (r["generator"], r["scale_factor"]): r for r in json.load(f)["results"]
+        }
+
+    passed = True
+    logger.info(f"\nComparison with {baseline_path}:")
+
+    for result in results:
+        previous = baseline.get((result["generator"], result["scale_factor"]))
+        if not previous or not previous["rows_per_sec"]:
+            continue
+
+        change = result["rows_per_sec"] / previous["rows_per_sec"] - 1
+        if change < -max_regression:
+            passed = False
+            status = "❌"
+        else:
+            status = "✓"
+        logger.info(
+            f"{status} SF {result['scale_factor']:g} {result['generator']}: "
+            f"{change:+.1%} rows/sec"
+        )
+
+    return passed
+
+
+# ============================================
+# MAIN EXECUTION
+# ============================================
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generate_data.py generators across scale factors"
+    )
+    parser.add_argument(
+        "--scale-factors",
+        type=float,
+        nargs="+",
+        default=DEFAULT_SCALE_FACTORS,
+        help="Scale factors to run (default: 0.1 1 10)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Timed runs per benchmark (default: {DEFAULT_REPEAT})",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_OUTPUT,
+        help=f"JSON results file (default: {DEFAULT_OUTPUT})",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="Earlier JSON results to compare rows/sec against",
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=DEFAULT_MAX_REGRESSION,
+        help="Slowdown reported as a regression (default: 0.2 = 20%%)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function"""
+    args = parse_args(argv)
+
+    logger.info("=" * 50)
+    logger.info("Starting Data Generator Benchmarks")
+    logger.info("=" * 50)
+
+    try:
+        results = run_suite(args.scale_factors, args.repeat)
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(build_report(results, args.repeat), f, indent=2)
+        logger.info(f"💾 Saved: {args.output}")
+
+        if args.baseline and not compare_to_baseline(
+            results, args.baseline, args.max_regression
+        ):
+            logger.error("❌ Throughput regression detected")
+            return False
+
+        logger.info("\n🎉 Benchmarks completed successfully!")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error during benchmarks: {str(e)}")
+        import traceback
+
+        logger.error(traceback.format_exc())
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
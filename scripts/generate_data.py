@@ -6,32 +6,52 @@ Synthetic Data Generation Script
 
 This script generates realistic e-commerce data for the analytics platform:
 - Customers (with SCD Type 2 segments)
+- Customer segment history (optional, --history-depth)
 - Orders (with realistic patterns)
 - Order Items (line items)
 - Clickstream Events (user behavior)
 
 Usage:
-    python scripts/generate_data.py
+    python scripts/generate_data.py [--format csv|parquet]
+    python scripts/generate_data.py --sink postgres
+    python scripts/generate_data.py --tick day|hour
+    python scripts/generate_data.py --scale-factor 10
+    python scripts/generate_data.py --partition-by day|hour
+    python scripts/generate_data.py --id-keys integer
+    python scripts/generate_data.py --profile zipf|holiday-spike|hot-key
+    python scripts/generate_data.py --history-depth 5
 
 Output:
-    - CSV files in data/ directory
-    - Direct PostgreSQL insertion (optional)
+    - CSV or Parquet files in data/ directory
+    - Hive-partitioned clickstream events with manifests (optional, --partition-by)
+    - Direct PostgreSQL insertion via COPY (optional, --sink postgres)
 
 Author: Zaid Shaikh
 Date: October 2025
 ============================================
 """
 
+import argparse
+import io
+import json
 import logging
+import multiprocessing
 import os
-import random
-from datetime import datetime, timedelta
+import shutil
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
 from faker import Faker
 
+# Load environment variables
+load_dotenv()
+
 # ============================================
 # CONFIGURATION
 # ============================================
@@ -44,55 +64,718 @@ logger = logging.getLogger(__name__)
 
 # Random seed for reproducibility
 RANDOM_SEED = 42
-random.seed(RANDOM_SEED)
-np.random.seed(RANDOM_SEED)
-Faker.seed(RANDOM_SEED)
-
-fake = Faker()
 
-# Data generation parameters
-N_CUSTOMERS = 1000
-N_ORDERS = 5000
-N_PRODUCTS = 200  # Product catalog size
-N_CLICKSTREAM_EVENTS = 50000
+# Independent NumPy streams for the vectorized generators (see make_rng)
+RNG_STREAMS = {
+    "customers": 1,
+    "orders": 2,
+    "order_items": 3,
+    "clickstream": 4,
+    "customer_history": 5,
+    "late_events": 6,
+    "order_updates": 7,
+}
+
+# Row counts at scale factor 1; --scale-factor multiplies all of them
+SF1_ROW_COUNTS = {
+    "customers": 1000,
+    "orders": 5000,
+    "products": 200,  # Product catalog size
+    "clickstream_events": 50000,
+}
+SCALE_FACTOR = 1
+
+# Data generation parameters (set from SCALE_FACTOR by apply_scale_factor)
+N_CUSTOMERS = SF1_ROW_COUNTS["customers"]
+N_ORDERS = SF1_ROW_COUNTS["orders"]
+N_PRODUCTS = SF1_ROW_COUNTS["products"]
+N_CLICKSTREAM_EVENTS = SF1_ROW_COUNTS["clickstream_events"]
+
+# Workload profiles (--profile): skew applied to orders, items and events.
+# "uniform" is the default dataset (uniform days and products).
+WORKLOAD_PROFILES = {
+    "uniform": {},
+    # Product popularity ~ 1 / rank^exponent (product 1 is the most popular)
+    "zipf": {"product_zipf_exponent": 1.1},
+    # Day-of-year traffic multipliers around Black Friday and December
+    "holiday-spike": {
+        "holiday_multipliers": {
+            "thanksgiving": 2.0,
+            "black_friday": 8.0,
+            "thanksgiving_weekend": 4.0,
+            "cyber_monday": 6.0,
+            "december": 2.0,  # Dec 1-23
+        }
+    },
+    # A small set of customers receives a large share of orders and sessions
+    "hot-key": {"hot_customer_fraction": 0.001, "hot_customer_share": 0.3},
+}
+WORKLOAD_PROFILE = "uniform"
+
+# SCD Type 2 history (--history-depth): earlier segment versions per customer
+CUSTOMER_SEGMENTS = ["bronze", "silver", "gold", "platinum"]
+
+# SCD Type 2 columns that are NULL by design (open-ended current version),
+# left out of the customers null check
+SCD2_NULLABLE_COLUMNS = ["segment_end_date"]
+
+# Late-arriving data (--late-fraction): sessions whose events arrive after
+# their event time, and order status updates arriving after the order.
+# Lags are exponential around the mean, between 1 hour and the max.
+LATE_EVENT_MEAN_HOURS = 12
+LATE_EVENT_MAX_HOURS = 72
+ORDER_UPDATE_MEAN_HOURS = 48
+ORDER_UPDATE_MAX_HOURS = 14 * 24
+
+# Status an order moves to when its late update arrives
+ORDER_STATUS_UPDATES = {
+    "pending": "processing",
+    "processing": "completed",
+    "completed": "returned",
+}
+
+# Identity vocabularies (names, domains, address parts) built once with Faker
+IDENTITY_POOL_SIZE = 5000  # Faker draws per vocabulary (deduplicated)
+IDENTITY_POOL_CACHE = Path("data/cache/identity_pools.json")
+
+# Clickstream session shape
+SESSION_BATCH_SIZE = 10000  # Most sessions generated per vectorized batch
+SESSION_BATCH_HEADROOM = 1.1  # Extra sessions drawn for the events still needed
+AVG_EVENTS_PER_SESSION = 5
+MAX_EVENTS_PER_SESSION = 50
+AVG_SECONDS_BETWEEN_EVENTS = 45
 
 # Date ranges
 # Generate data up to yesterday to ensure we have complete daily batches
 START_DATE = datetime.now() - timedelta(days=730)  # 2 years ago
 END_DATE = datetime.now() - timedelta(days=1)  # Up to yesterday
+CLICKSTREAM_START_DATE = START_DATE - timedelta(days=30)  # Last 30 days more events
+
+# Character positions of the 32 hex digits in a canonical UUID string
+UUID_HEX_POSITIONS = [i for i in range(36) if i not in (8, 13, 18, 23)]
+
+# Streaming mode: maximum rows generated and written per chunk
+DEFAULT_CHUNK_SIZE = 500000
 
 # Output directory
 OUTPUT_DIR = Path("data/generated")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Output formats (--format)
+OUTPUT_FORMATS = ["csv", "parquet"]
+
+# Incremental generation (--tick): state persisted between runs
+GENERATOR_STATE_FILE = OUTPUT_DIR / "generator_state.json"
+GENERATOR_STATE_KEYS = [
+    "watermark",
+    "tick",
+    "n_customers",
+    "customer_chunk_size",
+    "next_order_id",
+    "orders_per_day",
+    "events_per_day",
+    "format",
+    "sink",
+]
+TICK_PERIODS = ["day", "hour"]
+
+# Hive-partitioned clickstream output (--partition-by): one directory per
+# year=/month=/day=[/hour=], each with its part files and a manifest
+PARTITIONED_EVENTS_DIR = OUTPUT_DIR / "clickstream_events"
+PARTITION_MANIFEST = "_manifest.json"
+PARTITION_LAYOUTS = {
+    "day": ("D", "year=%Y/month=%m/day=%d"),
+    "hour": ("h", "year=%Y/month=%m/day=%d/hour=%H"),
+}
+
+# Final contents of every event-time partition of events and orders after
+# all late data so far has arrived (written with --late-fraction)
+EXPECTED_PARTITIONS_FILE = OUTPUT_DIR / "expected_partitions.json"
+
+# How orders and events reference customers (--id-keys): by email, or by an
+# integer customer_id assigned by the generator (email is then only an attribute)
+ID_KEY_MODES = ["email", "integer"]
+
+# Key column that switches to int64 in integer mode (see dataset_schema)
+INTEGER_KEY_COLUMNS = {
+    "customers": "customer_id",
+    "customer_history": "customer_id",
+    "orders": "customer_id",
+    "clickstream_events": "user_id",
+}
+
+# Output sinks (--sink): files in OUTPUT_DIR, or COPY straight into PostgreSQL
+OUTPUT_SINKS = ["files", "postgres"]
+
+# PostgreSQL source database (--sink postgres), same settings as load_data.py
+DB_CONFIG = {
+    "host": os.getenv("POSTGRES_SOURCE_HOST", "localhost"),
+    "port": os.getenv("POSTGRES_SOURCE_PORT", "5433"),
+    "database": os.getenv("POSTGRES_SOURCE_DB", "ecommerce"),
+    "user": os.getenv("POSTGRES_SOURCE_USER", "ecommerce_user"),
+    "password": os.getenv("POSTGRES_SOURCE_PASSWORD", "ecommerce_password"),
+}
+
+# Column order of each source table as written by the COPY sink
+TABLE_COLUMNS = {
+    "customers": [
+        "customer_id",
+        "email",
+        "first_name",
+        "last_name",
+        "phone",
+        "registration_date",
+        "customer_segment",
+        "segment_start_date",
+        "segment_end_date",
+        "is_current",
+    ],
+    "customer_history": [
+        "customer_id",
+        "customer_segment",
+        "segment_start_date",
+        "segment_end_date",
+        "is_current",
+    ],
+    "orders": [
+        "order_id",
+        "customer_id",
+        "order_date",
+        "order_total",
+        "payment_method",
+        "shipping_address",
+        "order_status",
+    ],
+    "order_items": [
+        "order_id",
+        "product_id",
+        "quantity",
+        "unit_price",
+        "discount_amount",
+    ],
+}
+
+# Explicit Arrow schemas for Parquet output (no type inference on read)
+LOW_CARDINALITY_STRING = pa.dictionary(pa.int8(), pa.string())
+
+DATASET_SCHEMAS = {
+    "customers": pa.schema(
+        [
+            ("email", pa.string()),
+            ("first_name", pa.string()),
+            ("last_name", pa.string()),
+            ("phone", pa.string()),
+            ("registration_date", pa.date32()),
+            ("customer_segment", LOW_CARDINALITY_STRING),
+            ("segment_start_date", pa.date32()),
+            ("segment_end_date", pa.date32()),
+            ("is_current", pa.bool_()),
+        ]
+    ),
+    "customer_history": pa.schema(
+        [
+            ("customer_id", pa.string()),
+            ("customer_segment", LOW_CARDINALITY_STRING),
+            ("segment_start_date", pa.date32()),
+            ("segment_end_date", pa.date32()),
+            ("is_current", pa.bool_()),
+        ]
+    ),
+    "orders": pa.schema(
+        [
+            ("customer_id", pa.string()),
+            ("order_date", pa.timestamp("s")),
+            ("order_total", pa.float64()),
+            ("payment_method", LOW_CARDINALITY_STRING),
+            ("shipping_address", pa.string()),
+            ("order_status", LOW_CARDINALITY_STRING),
+        ]
+    ),
+    "order_items": pa.schema(
+        [
+            ("order_id", pa.int64()),
+            ("product_id", pa.int32()),
+            ("quantity", pa.int16()),
+            ("unit_price", pa.float64()),
+            ("discount_amount", pa.float64()),
+        ]
+    ),
+    "order_updates": pa.schema(
+        [
+            ("order_id", pa.int64()),
+            ("order_date", pa.timestamp("s")),
+            ("previous_status", LOW_CARDINALITY_STRING),
+            ("order_status", LOW_CARDINALITY_STRING),
+            ("updated_at", pa.timestamp("s")),
+        ]
+    ),
+    "clickstream_events": pa.schema(
+        [
+            ("event_id", pa.string()),
+            ("session_id", pa.string()),
+            ("user_id", pa.string()),
+            ("event_timestamp", pa.timestamp("s")),
+            ("event_type", LOW_CARDINALITY_STRING),
+            ("product_id", pa.int32()),
+            ("page_url", pa.string()),
+            ("device_type", LOW_CARDINALITY_STRING),
+            ("browser", LOW_CARDINALITY_STRING),
+        ]
+    ),
+}
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
 
-def weighted_choice(choices, weights):
-    """Select item from choices based on weights"""
-    return random.choices(choices, weights=weights, k=1)[0]
+def apply_scale_factor(scale_factor):
+    """
+    Derive all row counts from one TPC-style scale factor
+
+    SF 1 is the default dataset (SF1_ROW_COUNTS); every count scales
+    linearly and is at least 1. Worker processes call this too (see
+    init_shard_worker), so the counts also hold where modules are re-imported.
+
+    Args:
+        scale_factor: Multiplier for SF1_ROW_COUNTS (e.g. 0.1, 1, 10)
+    """
+    global SCALE_FACTOR, N_CUSTOMERS, N_ORDERS, N_PRODUCTS, N_CLICKSTREAM_EVENTS
+
+    if scale_factor <= 0:
+        raise ValueError(f"Scale factor must be positive, got {scale_factor}")
+
+    counts = {
+        name: max(1, round(count * scale_factor))
+        for name, count in SF1_ROW_COUNTS.items()
+    }
+    SCALE_FACTOR = scale_factor
+    N_CUSTOMERS = counts["customers"]
+    N_ORDERS = counts["orders"]
+    N_PRODUCTS = counts["products"]
+    N_CLICKSTREAM_EVENTS = counts["clickstream_events"]
+
+
+def apply_workload_profile(profile):
+    """
+    Select the workload profile used by all generators in this process
+
+    Worker processes call this too (see init_shard_worker).
+
+    Args:
+        profile: Profile name (key of WORKLOAD_PROFILES)
+    """
+    global WORKLOAD_PROFILE
+
+    if profile not in WORKLOAD_PROFILES:
+        raise ValueError(f"Unknown workload profile: {profile}")
+    WORKLOAD_PROFILE = profile
+
+
+def day_weights(start_date, n_days):
+    """
+    Relative traffic of each day from start_date (1.0 everywhere unless the
+    profile defines holiday multipliers)
+
+    Returns:
+        np.ndarray: n_days weights, or None for uniform days
+    """
+    multipliers = WORKLOAD_PROFILES[WORKLOAD_PROFILE].get("holiday_multipliers")
+    if not multipliers:
+        return None
+
+    days = pd.date_range(start_date.date(), periods=n_days, freq="D")
+    weights = np.ones(n_days)
+
+    december = (days.month == 12) & (days.day <= 23)
+    weights[december] = multipliers["december"]
+
+    for year in days.year.unique():
+        # US Thanksgiving: fourth Thursday of November
+        november_1 = pd.Timestamp(year=year, month=11, day=1)
+        thanksgiving = november_1 + pd.Timedelta(
+            days=(3 - november_1.weekday()) % 7 + 21
+        )
+        spikes = {
+            thanksgiving: multipliers["thanksgiving"],
+            thanksgiving + pd.Timedelta(days=1): multipliers["black_friday"],
+            thanksgiving + pd.Timedelta(days=2): multipliers["thanksgiving_weekend"],
+            thanksgiving + pd.Timedelta(days=3): multipliers["thanksgiving_weekend"],
+            thanksgiving + pd.Timedelta(days=4): multipliers["cyber_monday"],
+        }
+        for day, multiplier in spikes.items():
+            weights[days == day] = multiplier
+
+    return weights
+
+
+def draw_product_ids(size, rng):
+    """Draw product ids 1..N_PRODUCTS (Zipf-distributed under the zipf profile)"""
+    exponent = WORKLOAD_PROFILES[WORKLOAD_PROFILE].get("product_zipf_exponent")
+    if exponent is None:
+        return rng.integers(1, N_PRODUCTS + 1, size)
+
+    popularity = 1.0 / np.arange(1, N_PRODUCTS + 1) ** exponent
+    return rng.choice(N_PRODUCTS, size=size, p=popularity / popularity.sum()) + 1
+
+
+def apply_hot_keys(customer_idx, n_customers, rng):
+    """
+    Redirect a share of customer picks to the hot customers (hot-key profile)
+
+    The hot customers are the first `hot_customer_fraction` of the pool
+    (at least one), so they are the same in every shard and tick.
+
+    Returns:
+        np.ndarray: Customer row positions
+    """
+    profile = WORKLOAD_PROFILES[WORKLOAD_PROFILE]
+    share = profile.get("hot_customer_share")
+    if not share or n_customers == 0:
+        return customer_idx
+
+    n_hot = max(1, int(n_customers * profile["hot_customer_fraction"]))
+    is_hot = rng.random(len(customer_idx)) < share
+    customer_idx = customer_idx.copy()
+    customer_idx[is_hot] = rng.integers(0, n_hot, int(is_hot.sum()))
+    return customer_idx
+
+
+def draw_lateness(size, mean_hours, max_hours, rng):
+    """
+    Draw arrival lags: exponential around mean_hours, between 1 hour and max_hours
+
+    Returns:
+        np.ndarray: timedelta64[s] lags
+    """
+    seconds = np.clip(rng.exponential(mean_hours * 3600, size), 3600, max_hours * 3600)
+    return seconds.astype("int64").astype("timedelta64[s]")
+
+
+def make_rng(stream, shard=0, tick=0):
+    """
+    Create a counter-based NumPy generator for one data stream and shard
+
+    Uses Philox keyed by (RANDOM_SEED, stream) with the shard number in the
+    high word of the counter, so every (stream, shard) pair gets its own
+    non-overlapping sequence. A shard's output therefore depends only on its
+    number, not on which process generates it or what ran before it.
+
+    Incremental runs (--tick) put the tick number in the next counter word,
+    so each tick continues the stream without overlapping the full run.
+
+    Args:
+        stream: Stream name (key of RNG_STREAMS)
+        shard: Shard number within the stream
+        tick: Incremental tick number (0 for a full generation)
+
+    Returns:
+        np.random.Generator: Seeded generator
+    """
+    bit_generator = np.random.Philox(
+        key=(RNG_STREAMS[stream] << 64) | RANDOM_SEED,
+        counter=np.array([0, 0, tick, shard], dtype=np.uint64),
+    )
+    return np.random.Generator(bit_generator)
+
+
+def weighted_choices(choices, weights, size, rng):
+    """Select `size` items from choices based on weights in one call"""
+    p = np.asarray(weights, dtype=float)
+    return rng.choice(np.asarray(choices), size=size, p=p / p.sum())
 
 
-def generate_realistic_date(start_date, end_date, peak_hours=None):
-    """Generate date with realistic business patterns"""
-    # Random date in range
-    time_between = end_date - start_date
-    days_between = time_between.days
-    random_days = random.randint(0, days_between)
-    random_date = start_date + timedelta(days=random_days)
+def generate_realistic_dates(start_date, end_date, size, rng, peak_hours=None):
+    """
+    Generate timestamps with realistic business patterns
+
+    Picks a day in [start_date, end_date] (uniform, or weighted by the
+    workload profile's day_weights) and an hour weighted by peak_hours,
+    drawing whole arrays instead of one timestamp per call.
+    A window shorter than a day (an hourly tick) is instead sampled
+    uniformly over the exact interval [start_date, end_date).
+
+    Returns:
+        np.ndarray: datetime64[s] timestamps
+    """
+    if timedelta(0) < end_date - start_date < timedelta(days=1):
+        window_seconds = int((end_date - start_date).total_seconds())
+        return np.datetime64(start_date, "s") + rng.integers(
+            0, window_seconds, size
+        ).astype("timedelta64[s]")
+
+    days_between = (end_date - start_date).days
+    start_day = np.datetime64(start_date.date(), "s")
 
-    # Add realistic hour patterns if specified
     if peak_hours:
-        hour = weighted_choice(range(24), [peak_hours.get(h, 1) for h in range(24)])
+        hours = weighted_choices(
+            np.arange(24), [peak_hours.get(h, 1) for h in range(24)], size, rng
+        )
+    else:
+        hours = rng.integers(0, 24, size)
+
+    weights = day_weights(start_date, days_between + 1)
+    if weights is None:
+        day_offsets = rng.integers(0, days_between + 1, size)
+    else:
+        day_offsets = rng.choice(days_between + 1, size=size, p=weights / weights.sum())
+
+    seconds = (
+        day_offsets * 86400
+        + hours * 3600
+        + rng.integers(0, 60, size) * 60
+        + rng.integers(0, 60, size)
+    )
+
+    return start_day + seconds.astype("timedelta64[s]")
+
+
+def plan_chunks(n, start_date, end_date, chunk_size, rng):
+    """
+    Split `n` rows over a date range into day-aligned chunks
+
+    Rows are first allocated to days as generate_realistic_dates draws them
+    (uniformly, or by the workload profile's day_weights),
+    then consecutive days are grouped until a chunk holds `chunk_size` rows.
+    A single day larger than `chunk_size` is split into several chunks
+    covering that same day, so no chunk ever exceeds `chunk_size`.
+
+    Args:
+        n: Total number of rows
+        start_date: First day of the range
+        end_date: Last day of the range (inclusive)
+        chunk_size: Maximum rows per chunk
+        rng: NumPy generator
+
+    Returns:
+        list: (chunk_start_date, chunk_end_date, n_rows) tuples in date order
+    """
+    first_day = datetime.combine(start_date.date(), datetime.min.time())
+    n_days = (end_date.date() - start_date.date()).days + 1
+    weights = day_weights(start_date, n_days)
+    if weights is None:
+        daily_counts = rng.multinomial(n, np.full(n_days, 1 / n_days))
     else:
-        hour = random.randint(0, 23)
+        daily_counts = rng.multinomial(n, weights / weights.sum())
+
+    chunks = []
+    chunk_start = first_day
+    chunk_rows = 0
+
+    for day, count in enumerate(daily_counts.tolist()):
+        day_start = first_day + timedelta(days=day)
+
+        # Close the open chunk if this day would overflow it
+        if chunk_rows and chunk_rows + count > chunk_size:
+            chunks.append((chunk_start, day_start - timedelta(days=1), chunk_rows))
+            chunk_rows = 0
+
+        # A day larger than a whole chunk gets dedicated chunks
+        while count > chunk_size:
+            chunks.append((day_start, day_start, chunk_size))
+            count -= chunk_size
+
+        if chunk_rows == 0:
+            chunk_start = day_start
+        chunk_rows += count
+
+    if chunk_rows:
+        chunks.append((chunk_start, first_day + timedelta(days=n_days - 1), chunk_rows))
+
+    return chunks
+
+
+def split_customers_pareto(n_customers, rng):
+    """
+    Split customer row positions into frequent (20%) and occasional buyers
+
+    Returns:
+        tuple: (frequent_customers, occasional_customers) index arrays
+    """
+    shuffled = rng.permutation(n_customers)
+    return shuffled[: int(n_customers * 0.2)], shuffled[int(n_customers * 0.2) :]
+
+
+def customer_keys(customers_df):
+    """
+    Values orders and events use to reference customers
+
+    The integer customer_id when the customers carry one (--id-keys integer),
+    otherwise the email.
+    """
+    column = "customer_id" if "customer_id" in customers_df.columns else "email"
+    return customers_df[column].to_numpy()
+
+
+def select_customer_pool(customers_df):
+    """Customer columns that order and event generation draw from"""
+    columns = ["customer_id", "email", "customer_segment"]
+    return customers_df[[c for c in columns if c in customers_df.columns]]
+
+
+def generate_uuid4_array(size, rng):
+    """
+    Generate random (version 4) UUID strings from one bulk draw of bytes
+
+    Args:
+        size: Number of UUIDs
+        rng: NumPy generator
+
+    Returns:
+        np.ndarray: Array of canonical 36-character UUID strings
+    """
+    raw = np.frombuffer(rng.bytes(16 * size), dtype=np.uint8).reshape(size, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # Version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+
+    hex_chars = np.frombuffer(raw.tobytes().hex().encode("ascii"), dtype=np.uint8)
+    chars = np.full((size, 36), ord("-"), dtype=np.uint8)
+    chars[:, UUID_HEX_POSITIONS] = hex_chars.reshape(size, 32)
+
+    return chars.view("S36").ravel().astype(str)
+
+
+# ============================================
+# IDENTITY POOLS
+# ============================================
+
+# Pools loaded in this process (see load_identity_pools)
+_identity_pools = None
+
+
+def build_identity_pools(size=IDENTITY_POOL_SIZE):
+    """
+    Build name, email domain and address vocabularies with a seeded Faker
+
+    Each vocabulary is `size` Faker draws with duplicates removed, so common
+    values are not over-represented. Email slugs are stored alongside the
+    names (lowercase letters only) so emails can be assembled by indexing.
+
+    Returns:
+        dict: Vocabulary name -> list of strings
+    """
+    logger.info(f"Building identity pools ({size:,} draws per vocabulary)...")
+
+    pool_fake = Faker()
+    pool_fake.seed_instance(RANDOM_SEED)
+
+    def vocabulary(draw):
+        return sorted({draw() for _ in range(size)})
+
+    first_names = vocabulary(pool_fake.first_name)
+    last_names = vocabulary(pool_fake.last_name)
+
+    return {
+        "first_names": first_names,
+        "last_names": last_names,
+        "first_name_slugs": [
+            "".join(filter(str.isalpha, name)).lower() for name in first_names
+        ],
+        "last_name_slugs": [
+            "".join(filter(str.isalpha, name)).lower() for name in last_names
+        ],
+        "email_domains": vocabulary(pool_fake.safe_domain_name),
+        "street_addresses": vocabulary(pool_fake.street_address),
+        "cities": vocabulary(pool_fake.city),
+        "states": vocabulary(pool_fake.state_abbr),
+        "postcodes": vocabulary(pool_fake.postcode),
+    }
+
+
+def load_identity_pools():
+    """
+    Load identity pools from the on-disk cache, building them if needed
+
+    The cache is keyed by RANDOM_SEED and IDENTITY_POOL_SIZE and is loaded
+    at most once per process.
+
+    Returns:
+        dict: Vocabulary name -> np.ndarray of strings
+    """
+    global _identity_pools
+    if _identity_pools is not None:
+        return _identity_pools
 
-    minute = random.randint(0, 59)
-    second = random.randint(0, 59)
+    cache_key = {"seed": RANDOM_SEED, "size": IDENTITY_POOL_SIZE}
+    pools = None
+
+    if IDENTITY_POOL_CACHE.exists():
+        with open(IDENTITY_POOL_CACHE) as f:
+            cached = json.load(f)
+        if cached.get("key") == cache_key:
+            pools = cached["pools"]
+
+    if pools is None:
+        pools = build_identity_pools()
+        IDENTITY_POOL_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = IDENTITY_POOL_CACHE.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"key": cache_key, "pools": pools}, f)
+        tmp_path.replace(IDENTITY_POOL_CACHE)
+        logger.info(f"💾 Cached identity pools: {IDENTITY_POOL_CACHE}")
+
+    _identity_pools = {name: np.array(values) for name, values in pools.items()}
+    return _identity_pools
+
+
+def pick(pool, size, rng):
+    """Draw `size` values uniformly from a vocabulary as a string Series"""
+    return pd.Series(pool[rng.integers(0, len(pool), size)])
+
+
+def generate_emails(first_idx, last_idx, customer_ids, rng):
+    """
+    Assemble customer emails from name slugs, a style and the customer id
 
-    return random_date.replace(hour=hour, minute=minute, second=second)
+    The local part ends in the customer id and name slugs contain only
+    letters, so distinct ids always give distinct emails: uniqueness holds
+    by construction, without retries or a seen-set.
+    """
+    pools = load_identity_pools()
+    first = pd.Series(pools["first_name_slugs"][first_idx])
+    last = pd.Series(pools["last_name_slugs"][last_idx])
+    ids = pd.Series(customer_ids).astype(str)
+
+    styles = rng.integers(0, 3, len(customer_ids))
+    local_part = first + last
+    local_part = local_part.where(styles != 1, first + "." + last)
+    local_part = local_part.where(styles != 2, first.str[:1] + last)
+
+    return (
+        local_part + ids + "@" + pick(pools["email_domains"], len(ids), rng)
+    ).to_numpy()
+
+
+def generate_phone_numbers(size, rng):
+    """Generate US-style phone numbers in a mix of common formats"""
+    # Format parts: prefix, area code, separator, exchange, separator, line
+    prefixes = np.array(["", "(", "+1-", ""])
+    first_separators = np.array(["-", ")", "-", "."])
+    second_separators = np.array(["-", "-", "-", "."])
+    formats = rng.integers(0, len(prefixes), size)
+
+    return (
+        pd.Series(prefixes[formats])
+        + pd.Series(rng.integers(200, 1000, size)).astype(str)
+        + first_separators[formats]
+        + pd.Series(rng.integers(200, 1000, size)).astype(str)
+        + second_separators[formats]
+        + pd.Series(rng.integers(0, 10000, size)).astype(str).str.zfill(4)
+    ).to_numpy()
+
+
+def generate_addresses(size, rng):
+    """Assemble single-line addresses ("street, city, ST zip") from the pools"""
+    pools = load_identity_pools()
+    return (
+        pick(pools["street_addresses"], size, rng)
+        + ", "
+        + pick(pools["cities"], size, rng)
+        + ", "
+        + pick(pools["states"], size, rng)
+        + " "
+        + pick(pools["postcodes"], size, rng)
+    ).to_numpy()
 
 
 # ============================================
@@ -100,79 +783,192 @@ def generate_realistic_date(start_date, end_date, peak_hours=None):
 # ============================================
 
 
-def generate_customers(n=N_CUSTOMERS):
+def generate_customers(n=N_CUSTOMERS, rng=None, first_customer_id=1, id_keys="email"):
     """
     Generate synthetic customer data with SCD Type 2 fields
 
+    Names, emails, phones and dates are assembled as whole arrays from the
+    identity pools (see load_identity_pools) instead of per-row Faker calls.
+
+    Args:
+        n: Number of customers to generate
+        rng: NumPy generator (defaults to the "customers" stream)
+        first_customer_id: customer_id of the first row (when generating one
+            shard of a larger set). Emails embed the customer id, which keeps
+            them unique across shards.
+        id_keys: "integer" adds the customer_id column, which orders and
+            events then reference instead of the email
+
     Returns:
         pd.DataFrame: Customer data
     """
     logger.info(f"Generating {n} customers...")
 
-    customers = []
+    if rng is None:
+        rng = make_rng("customers")
+
+    pools = load_identity_pools()
 
     # Customer segments with realistic distribution
-    segments = ["bronze", "silver", "gold", "platinum"]
+    segments = CUSTOMER_SEGMENTS
     segment_weights = [0.50, 0.30, 0.15, 0.05]  # Most customers are bronze
 
-    for i in range(n):
-        registration_date = fake.date_between(start_date="-2y", end_date="today")
-
-        # Segment assignment (current segment)
-        current_segment = weighted_choice(segments, segment_weights)
+    first_idx = rng.integers(0, len(pools["first_names"]), n)
+    last_idx = rng.integers(0, len(pools["last_names"]), n)
+    customer_ids = np.arange(first_customer_id, first_customer_id + n)
+
+    # Registration within the last 2 years
+    today = np.datetime64(date.today(), "D")
+    registration_dates = today - rng.integers(0, 731, n).astype("timedelta64[D]")
+
+    # Segment start date (could be different from registration)
+    # Some customers upgrade/downgrade over time
+    segment_changed = rng.random(n) < 0.3  # 30% have changed segment
+    days_since_registration = (today - registration_dates).astype(int)
+    change_offsets = (rng.random(n) * (days_since_registration + 1)).astype(int)
+    segment_start_dates = np.where(
+        segment_changed,
+        registration_dates + change_offsets.astype("timedelta64[D]"),
+        registration_dates,
+    )
 
-        # Segment start date (could be different from registration)
-        # Some customers upgrade/downgrade over time
-        if random.random() < 0.3:  # 30% have changed segment
-            segment_start = fake.date_between(
-                start_date=registration_date, end_date="today"
-            )
-        else:
-            segment_start = registration_date
-
-        customer = {
-            "email": fake.unique.email(),
-            "first_name": fake.first_name(),
-            "last_name": fake.last_name(),
-            "phone": fake.phone_number()[:20],  # Limit length
-            "registration_date": registration_date,
-            "customer_segment": current_segment,
-            "segment_start_date": segment_start,
+    df = pd.DataFrame(
+        {
+            "email": generate_emails(first_idx, last_idx, customer_ids, rng),
+            "first_name": pools["first_names"][first_idx],
+            "last_name": pools["last_names"][last_idx],
+            "phone": generate_phone_numbers(n, rng),
+            "registration_date": registration_dates,
+            # Segment assignment (current segment)
+            "customer_segment": weighted_choices(segments, segment_weights, n, rng),
+            "segment_start_date": segment_start_dates,
             "segment_end_date": None,  # Current segment
             "is_current": True,
         }
+    )
 
-        customers.append(customer)
-
-    df = pd.DataFrame(customers)
+    if id_keys == "integer":
+        df.insert(0, "customer_id", customer_ids)
 
     logger.info(f"✅ Generated {len(df)} customers")
-    logger.info(
-        f"   Segment distribution: {df['customer_segment'].value_counts().to_dict()}"
-    )
+    if not df.empty:
+        logger.info(
+            f"   Segment distribution: {df['customer_segment'].value_counts().to_dict()}"
+        )
 
     return df
 
 
+def generate_segment_history(customers_df, depth, rng=None):
+    """
+    Give every customer `depth` earlier segment versions (SCD Type 2)
+
+    Each customer's timeline from registration_date to today is cut at
+    `depth` distinct days: the history rows cover the periods before the
+    last cut ([segment_start_date, segment_end_date), each at least one day,
+    so chk_dates holds) and the current row starts at the last cut. Every
+    version's segment differs from the next one. Customers registered fewer
+    than `depth` days ago are back-dated to make room for their history.
+
+    Args:
+        customers_df: Customers from generate_customers (one current row each)
+        depth: Historical versions per customer
+        rng: NumPy generator (defaults to the "customer_history" stream)
+
+    Returns:
+        tuple: (customers_df with updated registration/segment start dates,
+            history DataFrame keyed like orders.customer_id)
+    """
+    logger.info(f"Generating {depth} historical segment versions per customer...")
+
+    if rng is None:
+        rng = make_rng("customer_history")
+
+    n = len(customers_df)
+    today = np.datetime64(date.today(), "D")
+    registration_dates = np.minimum(
+        customers_df["registration_date"].to_numpy().astype("datetime64[D]"),
+        today - depth,
+    )
+    span = (today - registration_dates).astype(int)
+
+    # `depth` strictly increasing change days in [1, span] per customer
+    cuts = np.sort(rng.integers(0, span[:, None] - depth + 1, (n, depth)), axis=1)
+    cuts += np.arange(1, depth + 1)
+    boundaries = registration_dates[:, None] + np.hstack(
+        [np.zeros((n, 1), dtype=int), cuts]
+    ).astype("timedelta64[D]")
+
+    # Walk back from the current segment, changing segment at every cut
+    segment_codes = np.empty((n, depth + 1), dtype=int)
+    segment_codes[:, depth] = pd.Categorical(
+        customers_df["customer_segment"], categories=CUSTOMER_SEGMENTS
+    ).codes
+    steps = rng.integers(1, len(CUSTOMER_SEGMENTS), (n, depth))
+    for version in range(depth - 1, -1, -1):
+        segment_codes[:, version] = (
+            segment_codes[:, version + 1] + steps[:, version]
+        ) % len(CUSTOMER_SEGMENTS)
+
+    history_df = pd.DataFrame(
+        {
+            "customer_id": np.repeat(customer_keys(customers_df), depth),
+            "customer_segment": np.array(CUSTOMER_SEGMENTS)[
+                segment_codes[:, :depth].ravel()
+            ],
+            "segment_start_date": boundaries[:, :depth].ravel(),
+            "segment_end_date": boundaries[:, 1:].ravel(),
+            "is_current": False,
+        }
+    )
+
+    customers_df = customers_df.assign(
+        registration_date=registration_dates,
+        segment_start_date=boundaries[:, depth],
+    )
+
+    logger.info(f"✅ Generated {len(history_df)} historical customer rows")
+    return customers_df, history_df
+
+
 # ============================================
 # ORDER DATA GENERATION
 # ============================================
 
 
-def generate_orders(customers_df, n=N_ORDERS):
+def generate_orders(
+    customers_df,
+    n=N_ORDERS,
+    rng=None,
+    start_date=None,
+    end_date=None,
+    customer_tiers=None,
+):
     """
     Generate synthetic order data with realistic patterns
 
+    Orders are drawn as whole NumPy arrays (customers, timestamps, totals,
+    payment methods, statuses) rather than one row at a time.
+
     Args:
         customers_df: Customer DataFrame with customer_id
         n: Number of orders to generate
+        rng: NumPy generator (defaults to the "orders" stream)
+        start_date: First order day (defaults to START_DATE)
+        end_date: Last order day (defaults to END_DATE)
+        customer_tiers: (frequent, occasional) customer index arrays from
+            split_customers_pareto; drawn from `rng` when not given. Pass the
+            same tiers to every chunk of a streamed run.
 
     Returns:
         pd.DataFrame: Order data
     """
     logger.info(f"Generating {n} orders...")
 
-    orders = []
+    if rng is None:
+        rng = make_rng("orders")
+    start_date = start_date or START_DATE
+    end_date = end_date or END_DATE
 
     # Payment method distribution (realistic for 2025)
     payment_methods = ["credit_card", "debit_card", "paypal", "apple_pay", "google_pay"]
@@ -196,47 +992,61 @@ def generate_orders(customers_df, n=N_ORDERS):
         22: 4,  # Evening peak
     }
 
-    # Customer purchase frequency (Pareto principle: 20% generate 80% of orders)
-    frequent_customers = customers_df.sample(n=int(len(customers_df) * 0.2))
-    occasional_customers = customers_df[
-        ~customers_df.index.isin(frequent_customers.index)
-    ]
+    # Order total range (min, max) by customer segment
+    segment_price_bands = {
+        "platinum": (150, 800),
+        "gold": (80, 400),
+        "silver": (40, 200),
+        "bronze": (20, 150),
+    }
 
-    for i in range(n):
-        # 80% of orders from 20% of customers
-        if random.random() < 0.8 and len(frequent_customers) > 0:
-            customer = frequent_customers.sample(n=1).iloc[0]
-        else:
-            customer = occasional_customers.sample(n=1).iloc[0]
-
-        order_date = generate_realistic_date(START_DATE, END_DATE, peak_hours)
-
-        # Order total influenced by customer segment
-        segment = customer["customer_segment"]
-        if segment == "platinum":
-            order_total = round(random.uniform(150, 800), 2)
-        elif segment == "gold":
-            order_total = round(random.uniform(80, 400), 2)
-        elif segment == "silver":
-            order_total = round(random.uniform(40, 200), 2)
-        else:  # bronze
-            order_total = round(random.uniform(20, 150), 2)
-
-        order = {
-            "customer_id": customer["email"],  # Will map to actual ID later
-            "order_date": order_date,
-            "order_total": order_total,
-            "payment_method": weighted_choice(payment_methods, payment_weights),
-            "shipping_address": fake.address().replace("\n", ", "),
-            "order_status": weighted_choice(statuses, status_weights),
-        }
+    # Customer purchase frequency (Pareto principle: 20% generate 80% of orders)
+    if customer_tiers is None:
+        customer_tiers = split_customers_pareto(len(customers_df), rng)
+    frequent_customers, occasional_customers = customer_tiers
+
+    # 80% of orders from 20% of customers
+    from_frequent = rng.random(n) < 0.8
+    if len(frequent_customers) == 0:
+        from_frequent[:] = False
+        frequent_customers = occasional_customers  # Drawn but never picked
+    elif len(occasional_customers) == 0:
+        from_frequent[:] = True
+        occasional_customers = frequent_customers  # Drawn but never picked
+
+    customer_idx = np.where(
+        from_frequent,
+        frequent_customers[rng.integers(0, len(frequent_customers), n)],
+        occasional_customers[rng.integers(0, len(occasional_customers), n)],
+    )
+    customer_idx = apply_hot_keys(customer_idx, len(customers_df), rng)
 
-        orders.append(order)
+    order_dates = generate_realistic_dates(start_date, end_date, n, rng, peak_hours)
 
-    df = pd.DataFrame(orders)
+    # Order total influenced by customer segment
+    segments = pd.Categorical(
+        customers_df["customer_segment"].to_numpy()[customer_idx],
+        categories=list(segment_price_bands),
+    )
+    bands = np.array(list(segment_price_bands.values()), dtype=float)
+    low, high = bands[segments.codes].T
+    order_totals = np.round(rng.uniform(low, high), 2)
+
+    df = pd.DataFrame(
+        {
+            "customer_id": customer_keys(customers_df)[customer_idx],
+            "order_date": order_dates,
+            "order_total": order_totals,
+            "payment_method": weighted_choices(
+                payment_methods, payment_weights, n, rng
+            ),
+            "shipping_address": generate_addresses(n, rng),
+            "order_status": weighted_choices(statuses, status_weights, n, rng),
+        }
+    )
 
     # Sort by date for realistic incremental loading
-    df = df.sort_values("order_date").reset_index(drop=True)
+    df = df.sort_values("order_date", kind="stable").reset_index(drop=True)
 
     logger.info(f"✅ Generated {len(df)} orders")
     logger.info(
@@ -247,74 +1057,168 @@ def generate_orders(customers_df, n=N_ORDERS):
     return df
 
 
+def generate_order_updates(orders_df, first_order_id, late_fraction, rng=None):
+    """
+    Draw late status updates for a fraction of orders
+
+    Each order whose status has a follow-up in ORDER_STATUS_UPDATES gets one
+    update with probability `late_fraction`, arriving 1 hour to
+    ORDER_UPDATE_MAX_HOURS after order_date. The updates are a change feed
+    separate from the orders: order_date is the event time and updated_at
+    the arrival time, so an incremental model watermarked on order_date
+    never sees them.
+
+    Args:
+        orders_df: Orders DataFrame (in file order)
+        first_order_id: order_id of the first row in orders_df
+        late_fraction: Probability that an eligible order gets an update
+        rng: NumPy generator (defaults to the "order_updates" stream)
+
+    Returns:
+        pd.DataFrame: Order updates sorted by updated_at
+    """
+    if rng is None:
+        rng = make_rng("order_updates")
+
+    statuses = orders_df["order_status"].to_numpy()
+    updated = np.isin(statuses, list(ORDER_STATUS_UPDATES)) & (
+        rng.random(len(orders_df)) < late_fraction
+    )
+    idx = np.flatnonzero(updated)
+    order_dates = orders_df["order_date"].to_numpy().astype("datetime64[s]")[idx]
+
+    df = pd.DataFrame(
+        {
+            "order_id": first_order_id + idx,
+            "order_date": order_dates,
+            "previous_status": statuses[idx],
+            "order_status": pd.Series(statuses[idx], dtype=object)
+            .map(ORDER_STATUS_UPDATES)
+            .to_numpy(),
+            "updated_at": order_dates
+            + draw_lateness(
+                len(idx), ORDER_UPDATE_MEAN_HOURS, ORDER_UPDATE_MAX_HOURS, rng
+            ),
+        }
+    )
+    return df.sort_values("updated_at", kind="stable").reset_index(drop=True)
+
+
 # ============================================
 # ORDER ITEMS GENERATION
 # ============================================
 
 
-def generate_order_items(orders_df):
+def generate_order_items(orders_df, first_order_id=1, rng=None):
     """
     Generate order line items for each order
 
+    All items of all orders are drawn as flat arrays and split per order
+    with repeat/cumsum segment arithmetic, working in integer cents:
+
+    - Each order's total is split across its items by random weights; the
+      last item of an order takes whatever the others leave, so line totals
+      always sum exactly to order_total.
+    - Undiscounted lines are rounded down to a multiple of their quantity so
+      quantity * unit_price is exact. If an undiscounted last line cannot be
+      split evenly, its quantity falls back to the largest smaller quantity
+      that divides it (1 always does).
+    - Discounted lines (20% of items) get a 5-30% discount; the discount
+      also absorbs any cent rounding, so 0 <= discount <= quantity * price.
+
     Args:
         orders_df: Orders DataFrame
+        first_order_id: order_id of the first row in orders_df. Order IDs are
+            assigned sequentially in file order, so a streamed chunk passes
+            the number of orders written before it plus one.
+        rng: NumPy generator (defaults to the "order_items" stream)
 
     Returns:
         pd.DataFrame: Order items data
     """
     logger.info(f"Generating order items for {len(orders_df)} orders...")
 
-    order_items = []
-
-    for idx, order in orders_df.iterrows():
-        order_id = idx + 1  # Assuming sequential IDs
-        order_total = order["order_total"]
-
-        # Number of items per order (1-5 items, weighted toward 1-2)
-        n_items = weighted_choice([1, 2, 3, 4, 5], [0.40, 0.35, 0.15, 0.07, 0.03])
-
-        # Distribute order total across items
-        remaining_total = order_total
-
-        for i in range(n_items):
-            # Product ID (1 to N_PRODUCTS)
-            product_id = random.randint(1, N_PRODUCTS)
-
-            # Quantity (most orders have quantity 1-2)
-            quantity = weighted_choice([1, 2, 3, 4, 5], [0.60, 0.25, 0.10, 0.03, 0.02])
+    if rng is None:
+        rng = make_rng("order_items")
+
+    n_orders = len(orders_df)
+    if n_orders == 0:
+        return pd.DataFrame(
+            columns=[
+                "order_id",
+                "product_id",
+                "quantity",
+                "unit_price",
+                "discount_amount",
+            ]
+        )
 
-            # Unit price
-            if i == n_items - 1:  # Last item gets remaining amount
-                unit_price = round(remaining_total / quantity, 2)
-            else:
-                # Allocate portion of order total
-                max_price = remaining_total / (n_items - i)
-                unit_price = round(random.uniform(5, min(max_price, 200)) / quantity, 2)
-
-            # Discount (20% of orders have discount)
-            if random.random() < 0.20:
-                max_discount = unit_price * quantity * 0.3  # Max 30% discount
-                discount_amount = round(random.uniform(1, max_discount), 2)
-            else:
-                discount_amount = 0.00
+    # Number of items per order (1-5 items, weighted toward 1-2)
+    n_items = weighted_choices(
+        [1, 2, 3, 4, 5], [0.40, 0.35, 0.15, 0.07, 0.03], n_orders, rng
+    )
+    n_total = int(n_items.sum())
 
-            line_total = quantity * unit_price - discount_amount
-            remaining_total -= line_total
+    # Segment layout: item -> order position, first/last item of each order
+    order_pos = np.repeat(np.arange(n_orders), n_items)
+    last_item = np.cumsum(n_items) - 1
+    first_item = last_item - n_items + 1
+    is_last = np.zeros(n_total, dtype=bool)
+    is_last[last_item] = True
 
-            item = {
-                "order_id": order_id,
-                "product_id": product_id,
-                "quantity": quantity,
-                "unit_price": unit_price,
-                "discount_amount": discount_amount,
-            }
+    # Product ID (1 to N_PRODUCTS)
+    product_id = draw_product_ids(n_total, rng)
 
-            order_items.append(item)
+    # Quantity (most orders have quantity 1-2)
+    quantity = weighted_choices(
+        [1, 2, 3, 4, 5], [0.60, 0.25, 0.10, 0.03, 0.02], n_total, rng
+    )
 
-    df = pd.DataFrame(order_items)
+    # Discount (20% of items have discount)
+    discounted = rng.random(n_total) < 0.20
+
+    # Distribute order total across items (in cents)
+    total_cents = np.rint(orders_df["order_total"].to_numpy() * 100).astype(np.int64)
+    weights = 0.5 + rng.random(n_total)
+    weight_sums = np.add.reduceat(weights, first_item)
+    line_cents = np.floor(
+        total_cents[order_pos] * weights / weight_sums[order_pos]
+    ).astype(np.int64)
+    line_cents = np.where(discounted, line_cents, line_cents // quantity * quantity)
+
+    # Last item gets remaining amount
+    allocated = np.add.reduceat(np.where(is_last, 0, line_cents), first_item)
+    line_cents[last_item] = total_cents - allocated
+
+    # Undiscounted last lines: largest quantity <= drawn that divides evenly
+    needs_fit = is_last & ~discounted & (line_cents % quantity != 0)
+    fitted = np.ones(n_total, dtype=quantity.dtype)
+    for candidate in range(4, 1, -1):
+        fits = (candidate < quantity) & (line_cents % candidate == 0) & (fitted == 1)
+        fitted[fits] = candidate
+    quantity = np.where(needs_fit, fitted, quantity)
+
+    # Unit price (discounted lines: gross price up, discount absorbs rounding)
+    discount_rate = rng.uniform(0.05, 0.30, n_total)
+    unit_cents = np.where(
+        discounted,
+        np.ceil(line_cents / ((1 - discount_rate) * quantity)).astype(np.int64),
+        line_cents // quantity,
+    )
+    discount_cents = unit_cents * quantity - line_cents
+
+    df = pd.DataFrame(
+        {
+            "order_id": first_order_id + order_pos,
+            "product_id": product_id,
+            "quantity": quantity,
+            "unit_price": unit_cents / 100,
+            "discount_amount": discount_cents / 100,
+        }
+    )
 
     logger.info(f"✅ Generated {len(df)} order items")
-    logger.info(f"   Average items per order: {len(df) / len(orders_df):.2f}")
+    logger.info(f"   Average items per order: {len(df) / n_orders:.2f}")
     logger.info(f"   Products referenced: {df['product_id'].nunique()}")
 
     return df
@@ -325,21 +1229,26 @@ def generate_order_items(orders_df):
 # ============================================
 
 
-def generate_clickstream_events(customers_df, n=N_CLICKSTREAM_EVENTS):
+def generate_clickstream_session_batch(
+    customers_df, n_sessions, rng, start_date=None, end_date=None
+):
     """
-    Generate synthetic clickstream/user behavior events
+    Generate the events for one batch of browsing sessions
+
+    Every column is drawn as a whole array. Device, browser, user and
+    session_id are drawn once per session and repeated for its events;
+    event timestamps advance from the session start by random gaps.
 
     Args:
         customers_df: Customer DataFrame
-        n: Number of events to generate
+        n_sessions: Number of sessions in the batch
+        rng: NumPy generator
+        start_date: First session day (defaults to 30 days before START_DATE)
+        end_date: Last session day (defaults to END_DATE)
 
     Returns:
-        pd.DataFrame: Clickstream events
+        pd.DataFrame: Clickstream events (unsorted)
     """
-    logger.info(f"Generating {n} clickstream events...")
-
-    events = []
-
     # Event types with realistic distribution
     event_types = ["page_view", "add_to_cart", "remove_from_cart", "purchase", "search"]
     event_weights = [0.60, 0.15, 0.05, 0.08, 0.12]
@@ -352,6 +1261,15 @@ def generate_clickstream_events(customers_df, n=N_CLICKSTREAM_EVENTS):
     browsers = ["chrome", "safari", "firefox", "edge"]
     browser_weights = [0.50, 0.30, 0.15, 0.05]
 
+    # Page path by event type
+    page_paths = {
+        "page_view": "/products/",
+        "add_to_cart": "/cart/add/",
+        "remove_from_cart": "/cart/remove/",
+        "purchase": "/checkout/complete/",
+        "search": "/search/",
+    }
+
     # Peak browsing hours
     peak_hours = {
         8: 2,
@@ -369,84 +1287,1725 @@ def generate_clickstream_events(customers_df, n=N_CLICKSTREAM_EVENTS):
         23: 4,  # Evening peak
     }
 
-    for i in range(n):
-        # Random customer (user_id references customer email for now)
-        customer = customers_df.sample(n=1).iloc[0]
-
-        # Event timestamp
-        event_timestamp = generate_realistic_date(
-            START_DATE - timedelta(days=30),  # Last 30 days more events
-            END_DATE,
-            peak_hours,
-        )
-
-        event = {
-            "event_id": fake.uuid4(),
-            "session_id": fake.uuid4(),
-            "user_id": customer["email"],
-            "event_timestamp": event_timestamp,
-            "event_type": weighted_choice(event_types, event_weights),
-            "product_id": random.randint(1, N_PRODUCTS),
-            "page_url": fake.uri_path(),
-            "device_type": weighted_choice(devices, device_weights),
-            "browser": weighted_choice(browsers, browser_weights),
-        }
+    # Session-level attributes
+    session_lengths = np.minimum(
+        rng.geometric(1 / AVG_EVENTS_PER_SESSION, n_sessions), MAX_EVENTS_PER_SESSION
+    )
+    session_starts = generate_realistic_dates(
+        start_date or CLICKSTREAM_START_DATE,
+        end_date or END_DATE,
+        n_sessions,
+        rng,
+        peak_hours,
+    )
+    session_users = apply_hot_keys(
+        rng.integers(0, len(customers_df), n_sessions), len(customers_df), rng
+    )
 
-        events.append(event)
+    # Expand sessions to events
+    n_events = int(session_lengths.sum())
+    session_idx = np.repeat(np.arange(n_sessions), session_lengths)
+
+    # Seconds since session start: cumulative gaps, restarting per session
+    gaps = rng.exponential(AVG_SECONDS_BETWEEN_EVENTS, n_events).astype("int64")
+    offsets = np.cumsum(gaps)
+    session_first = np.cumsum(session_lengths) - session_lengths
+    offsets -= np.repeat(offsets[session_first] - gaps[session_first], session_lengths)
+
+    event_type = weighted_choices(event_types, event_weights, n_events, rng)
+    product_id = draw_product_ids(n_events, rng)
+    page_url = pd.Series(event_type).map(page_paths) + pd.Series(product_id).astype(str)
+
+    return pd.DataFrame(
+        {
+            "event_id": generate_uuid4_array(n_events, rng),
+            "session_id": generate_uuid4_array(n_sessions, rng)[session_idx],
+            "user_id": customer_keys(customers_df)[session_users][session_idx],
+            "event_timestamp": session_starts[session_idx]
+            + offsets.astype("timedelta64[s]"),
+            "event_type": event_type,
+            "product_id": product_id,
+            "page_url": page_url.to_numpy(),
+            "device_type": weighted_choices(devices, device_weights, n_sessions, rng)[
+                session_idx
+            ],
+            "browser": weighted_choices(browsers, browser_weights, n_sessions, rng)[
+                session_idx
+            ],
+        }
+    )
 
-    df = pd.DataFrame(events)
 
-    # Sort by timestamp
-    df = df.sort_values("event_timestamp").reset_index(drop=True)
+def add_late_arrivals(events_df, late_fraction, rng):
+    """
+    Make a fraction of sessions arrive late (e.g. buffered on a mobile device)
 
-    logger.info(f"✅ Generated {len(df)} clickstream events")
-    logger.info(
-        f"   Event type distribution: {df['event_type'].value_counts().to_dict()}"
-    )
-    logger.info(f"   Device distribution: {df['device_type'].value_counts().to_dict()}")
+    The generated timestamps become arrival_timestamp. For late sessions,
+    event_timestamp is moved back by one lag per session (see draw_lateness),
+    so their events arrive in a later partition than their event time.
 
-    return df
+    Args:
+        events_df: Clickstream events
+        late_fraction: Probability that a session arrives late
+        rng: NumPy generator
 
+    Returns:
+        pd.DataFrame: Events with arrival_timestamp, sorted by arrival
+    """
+    session_codes, sessions = pd.factorize(events_df["session_id"])
+    late = rng.random(len(sessions)) < late_fraction
+    lag = draw_lateness(len(sessions), LATE_EVENT_MEAN_HOURS, LATE_EVENT_MAX_HOURS, rng)
+    lag[~late] = 0
+
+    arrival = events_df["event_timestamp"].to_numpy().astype("datetime64[s]")
+    df = events_df.assign(event_timestamp=arrival - lag[session_codes])
+    df.insert(df.columns.get_loc("event_timestamp") + 1, "arrival_timestamp", arrival)
+    return df.sort_values("arrival_timestamp", kind="stable").reset_index(drop=True)
+
+
+def generate_clickstream_events(
+    customers_df,
+    n=N_CLICKSTREAM_EVENTS,
+    rng=None,
+    start_date=None,
+    end_date=None,
+    late_fraction=0,
+    late_rng=None,
+):
+    """
+    Generate synthetic clickstream/user behavior events
 
-# ============================================
-# MAIN EXECUTION
-# ============================================
+    Events are produced in batches of sessions (see
+    generate_clickstream_session_batch) until `n` events are reached. Each
+    batch is sized for the events still needed (with some headroom, at most
+    SESSION_BATCH_SIZE sessions), so small tick and shard runs do not draw
+    thousands of sessions only to keep a few.
+    With a `late_fraction`, some sessions arrive late (see
+    add_late_arrivals) and rows are in arrival order instead.
 
+    Args:
+        customers_df: Customer DataFrame
+        n: Number of events to generate
+        rng: NumPy generator (defaults to the "clickstream" stream)
+        start_date: First session day (defaults to 30 days before START_DATE)
+        end_date: Last session day (defaults to END_DATE)
+        late_fraction: Fraction of sessions arriving after their event time
+        late_rng: NumPy generator for the lags (defaults to "late_events")
 
-def main():
-    """Main execution function"""
-    logger.info("=" * 50)
-    logger.info("Starting Data Generation Process")
-    logger.info("=" * 50)
+    Returns:
+        pd.DataFrame: Clickstream events
+    """
+    logger.info(f"Generating {n} clickstream events...")
 
-    try:
-        # Generate customers
-        customers_df = generate_customers(N_CUSTOMERS)
-        customers_df.to_csv(OUTPUT_DIR / "customers.csv", index=False)
-        logger.info(f"💾 Saved: {OUTPUT_DIR / 'customers.csv'}")
+    if rng is None:
+        rng = make_rng("clickstream")
+
+    batches = []
+    remaining = n
+    while remaining > 0:
+        n_sessions = min(
+            SESSION_BATCH_SIZE,
+            int(remaining / AVG_EVENTS_PER_SESSION * SESSION_BATCH_HEADROOM) + 1,
+        )
+        batch = generate_clickstream_session_batch(
+            customers_df, n_sessions, rng, start_date, end_date
+        )
+        batches.append(batch.iloc[:remaining])
+        remaining -= len(batches[-1])
+
+    df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+
+    # Sort by timestamp (arrival time when some sessions arrive late)
+    if not df.empty and late_fraction:
+        df = add_late_arrivals(df, late_fraction, late_rng or make_rng("late_events"))
+    elif not df.empty:
+        df = df.sort_values("event_timestamp", kind="stable").reset_index(drop=True)
+
+    logger.info(f"✅ Generated {len(df)} clickstream events")
+    if not df.empty:
+        logger.info(
+            f"   Event type distribution: {df['event_type'].value_counts().to_dict()}"
+        )
+        logger.info(
+            f"   Device distribution: {df['device_type'].value_counts().to_dict()}"
+        )
+        logger.info(f"   Sessions: {df['session_id'].nunique():,}")
+
+    return df
+
+
+# ============================================
+# OUTPUT WRITERS
+# ============================================
+
+
+def dataset_path(dataset, fmt):
+    """Output file for a dataset, e.g. data/generated/orders.parquet"""
+    return OUTPUT_DIR / f"{dataset}.{fmt}"
+
+
+def dataset_schema(dataset, df):
+    """
+    Arrow schema for a dataset
+
+    With integer customer keys (--id-keys integer) the key column is int64
+    (and customers gain a leading customer_id column). Events with late
+    arrivals (--late-fraction) gain arrival_timestamp after event_timestamp.
+    """
+    schema = DATASET_SCHEMAS[dataset]
+    if "arrival_timestamp" in df.columns:
+        schema = schema.insert(
+            schema.get_field_index("event_timestamp") + 1,
+            pa.field("arrival_timestamp", pa.timestamp("s")),
+        )
+
+    key = INTEGER_KEY_COLUMNS.get(dataset)
+    if key not in df.columns or not pd.api.types.is_integer_dtype(df[key]):
+        return schema
+
+    field = pa.field(key, pa.int64())
+    if key in schema.names:
+        return schema.set(schema.get_field_index(key), field)
+    return schema.insert(0, field)
+
+
+def write_dataset(df, dataset, fmt, path=None, header=True):
+    """
+    Write a dataset (or one shard of it) as CSV or Parquet
+
+    Parquet output is converted with the dataset's explicit Arrow schema
+    (see dataset_schema), so readers get typed columns without inference.
+    Writing the dataset's own output file first removes that dataset's files
+    of both formats from earlier runs (see remove_dataset_outputs).
+
+    Args:
+        df: Dataset DataFrame
+        dataset: Dataset name (key of DATASET_SCHEMAS)
+        fmt: "csv" or "parquet"
+        path: Output file (defaults to dataset_path(dataset, fmt))
+        header: Write the CSV header row
+    """
+    if path is None:
+        remove_dataset_outputs(dataset)
+        path = dataset_path(dataset, fmt)
+
+    if fmt == "parquet":
+        table = pa.Table.from_pandas(
+            df, schema=dataset_schema(dataset, df), preserve_index=False
+        )
+        pq.write_table(table, path)
+    else:
+        df.to_csv(path, header=header, index=False)
+
+
+def remove_dataset_outputs(dataset):
+    """
+    Remove a dataset's output files of every format from earlier runs
+
+    The clickstream DAG reads the Parquet file whenever one exists, so a CSV
+    run must not leave an older Parquet file behind (nor a Parquet run an
+    older CSV that a reader could pick up).
+    """
+    for fmt in OUTPUT_FORMATS:
+        dataset_path(dataset, fmt).unlink(missing_ok=True)
+
+
+def write_optional_dataset(df, dataset, fmt):
+    """
+    Write a dataset only some runs produce, replacing any earlier one
+
+    Files of both formats from earlier runs are removed first, so a run
+    without the dataset (df is None) does not leave stale rows for
+    load_data.py.
+    """
+    remove_dataset_outputs(dataset)
+
+    if df is not None:
+        write_dataset(df, dataset, fmt)
+        logger.info(f"💾 Saved: {dataset_path(dataset, fmt)}")
+
+
+def append_dataset(df, dataset, fmt):
+    """
+    Append rows to a dataset's output file, creating it if missing
+
+    CSV rows are appended without a header. Parquet files cannot be
+    extended in place, so the existing row groups are copied into a new
+    file followed by one row group for `df`, which then replaces the old one.
+    """
+    path = dataset_path(dataset, fmt)
+    if not path.exists():
+        write_dataset(df, dataset, fmt)
+        return
+
+    if fmt == "parquet":
+        existing = pq.ParquetFile(path)
+        tmp_path = path.with_suffix(".tmp")
+        with pq.ParquetWriter(tmp_path, existing.schema_arrow) as writer:
+            for row_group in range(existing.num_row_groups):
+                writer.write_table(existing.read_row_group(row_group))
+            table = pa.Table.from_pandas(
+                df, schema=dataset_schema(dataset, df), preserve_index=False
+            )
+            # Parquet stores second timestamps as ms; match the file's schema
+            writer.write_table(table.cast(existing.schema_arrow))
+        tmp_path.replace(path)
+    else:
+        df.to_csv(path, mode="a", header=False, index=False)
+
+
+class PartMerger:
+    """
+    Append shard part files to one output file, in the order given
+
+    CSV parts are concatenated byte for byte (only the first part carries a
+    header). Parquet parts each become one row group of the output file.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.parquet_writer = None
+        self.parts = 0
+
+    def append(self, part_path):
+        """Append one part file and remove it"""
+        if part_path.suffix == ".parquet":
+            table = pq.read_table(part_path)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            with open(self.output_path, "ab" if self.parts else "wb") as output, open(
+                part_path, "rb"
+            ) as part:
+                shutil.copyfileobj(part, output)
+
+        part_path.unlink()
+        self.parts += 1
+
+    def close(self):
+        """Finish the output file"""
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def remove_event_outputs():
+    """
+    Remove clickstream output of both layouts from earlier runs
+
+    The clickstream DAG reads the partition tree whenever it exists, so an
+    unpartitioned run must drop it along with the single-file outputs (and a
+    partitioned run the single files along with the old tree).
+    """
+    shutil.rmtree(PARTITIONED_EVENTS_DIR, ignore_errors=True)
+    remove_dataset_outputs("clickstream_events")
+
+
+def write_event_partitions(df, fmt, partition_by, part_name):
+    """
+    Write clickstream events into Hive-style partition directories
+
+    Rows are grouped by the day (or hour) of event_timestamp and each group
+    is written as `<part_name>.<fmt>` under PARTITIONED_EVENTS_DIR, e.g.
+    year=2025/month=03/day=14/part-00001.csv (with its own CSV header).
+    Events with late arrivals are grouped by arrival_timestamp instead, as
+    a landing zone would receive them.
+
+    Args:
+        df: Clickstream events
+        fmt: "csv" or "parquet"
+        partition_by: "day" or "hour" (key of PARTITION_LAYOUTS)
+        part_name: File name (without extension) within each partition
+
+    Returns:
+        dict: Partition path -> stats (files, row_count, min/max timestamps)
+    """
+    unit, layout = PARTITION_LAYOUTS[partition_by]
+    column = (
+        "arrival_timestamp" if "arrival_timestamp" in df.columns else "event_timestamp"
+    )
+    partition_keys = df[column].to_numpy().astype(f"datetime64[{unit}]")
+
+    partition_stats = {}
+    for partition_start, group in df.groupby(partition_keys, sort=True):
+        partition = pd.Timestamp(partition_start).strftime(layout)
+        partition_dir = PARTITIONED_EVENTS_DIR / partition
+        partition_dir.mkdir(parents=True, exist_ok=True)
+
+        file_name = f"{part_name}.{fmt}"
+        write_dataset(group, "clickstream_events", fmt, partition_dir / file_name)
+
+        partition_stats[partition] = {
+            "files": [file_name],
+            "row_count": len(group),
+            "min_event_timestamp": str(group["event_timestamp"].min()),
+            "max_event_timestamp": str(group["event_timestamp"].max()),
+        }
+
+    return partition_stats
+
+
+def merge_partition_stats(total, partition_stats):
+    """Fold one writer's partition stats into `total` (in place)"""
+    for partition, stats in partition_stats.items():
+        merged = total.setdefault(
+            partition,
+            {
+                "files": [],
+                "row_count": 0,
+                "min_event_timestamp": stats["min_event_timestamp"],
+                "max_event_timestamp": stats["max_event_timestamp"],
+            },
+        )
+        merged["files"] += stats["files"]
+        merged["row_count"] += stats["row_count"]
+        merged["min_event_timestamp"] = min(
+            merged["min_event_timestamp"], stats["min_event_timestamp"]
+        )
+        merged["max_event_timestamp"] = max(
+            merged["max_event_timestamp"], stats["max_event_timestamp"]
+        )
+    return total
+
+
+def write_partition_manifests(partition_stats, fmt):
+    """
+    Write (or extend) the manifest of every partition in `partition_stats`
+
+    A partition's manifest lists its part files with the total row count and
+    min/max event_timestamp, so readers can select partitions without
+    scanning them. Existing manifests (from earlier ticks) are extended.
+    """
+    for partition, stats in sorted(partition_stats.items()):
+        manifest_path = PARTITIONED_EVENTS_DIR / partition / PARTITION_MANIFEST
+
+        if manifest_path.exists():
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            merge_partition_stats({partition: manifest}, {partition: stats})
+        else:
+            manifest = {"dataset": "clickstream_events", "partition": partition}
+            manifest.update(format=fmt, **stats)
+
+        tmp_path = manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        tmp_path.replace(manifest_path)
+
+    logger.info(
+        f"💾 Wrote {len(partition_stats):,} partition manifests under "
+        f"{PARTITIONED_EVENTS_DIR}"
+    )
+
+
+def expected_event_partitions(df, partition_by="day"):
+    """
+    Final contents of each event-time partition touched by `df`
+
+    Stats per partition of event_timestamp: row count, min/max event
+    timestamp and an order-independent checksum of the event ids (sum of
+    pd.util.hash_pandas_object(event_id, index=False) modulo 2^64), so a
+    reprocessed partition can be checked without keeping the rows.
+
+    Returns:
+        dict: Partition path -> stats
+    """
+    if df.empty:
+        return {}
+
+    unit, layout = PARTITION_LAYOUTS[partition_by]
+    timestamps = df["event_timestamp"].to_numpy().astype("datetime64[s]")
+    keys = timestamps.astype(f"datetime64[{unit}]")
+    hashes = pd.util.hash_pandas_object(df["event_id"], index=False).to_numpy()
+
+    order = np.argsort(keys, kind="stable")
+    keys, timestamps, hashes = keys[order], timestamps[order], hashes[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+
+    return {
+        pd.Timestamp(keys[start]).strftime(layout): {
+            "row_count": int(count),
+            "event_id_checksum": f"{int(checksum):016x}",
+            "min_event_timestamp": str(pd.Timestamp(min_ts)),
+            "max_event_timestamp": str(pd.Timestamp(max_ts)),
+        }
+        for start, count, checksum, min_ts, max_ts in zip(
+            starts,
+            counts,
+            np.add.reduceat(hashes, starts),
+            np.minimum.reduceat(timestamps, starts),
+            np.maximum.reduceat(timestamps, starts),
+        )
+    }
+
+
+def expected_order_partitions(orders_df=None, order_updates_df=None):
+    """
+    Row and status counts per order_date day for orders and/or their updates
+
+    New orders add to the row count and their status; each update moves one
+    order of its order_date's day from previous_status to order_status.
+
+    Returns:
+        dict: Partition path -> {"row_count", "status_counts"}
+    """
+    _, layout = PARTITION_LAYOUTS["day"]
+    changes = []
+    if orders_df is not None:
+        changes.append(
+            pd.DataFrame(
+                {
+                    "order_date": orders_df["order_date"],
+                    "status": orders_df["order_status"],
+                    "rows": 1,
+                    "delta": 1,
+                }
+            )
+        )
+    if order_updates_df is not None:
+        for status_column, delta in [("previous_status", -1), ("order_status", 1)]:
+            changes.append(
+                pd.DataFrame(
+                    {
+                        "order_date": order_updates_df["order_date"],
+                        "status": order_updates_df[status_column],
+                        "rows": 0,
+                        "delta": delta,
+                    }
+                )
+            )
+
+    changes = pd.concat(changes, ignore_index=True)
+    if changes.empty:
+        return {}
+    changes["partition"] = pd.to_datetime(changes["order_date"]).dt.strftime(layout)
+    changes["status"] = changes["status"].astype(str)
+
+    partitions = {}
+    for partition, group in changes.groupby("partition", sort=True):
+        status_counts = group.groupby("status")["delta"].sum()
+        partitions[partition] = {
+            "row_count": int(group["rows"].sum()),
+            "status_counts": {
+                status: int(count) for status, count in status_counts.items() if count
+            },
+        }
+    return partitions
+
+
+def merge_expected_partitions(total, partitions):
+    """Fold expected partition stats into `total` (in place)"""
+    for partition, stats in partitions.items():
+        merged = total.setdefault(partition, {})
+        for key, value in stats.items():
+            if key not in merged:
+                merged[key] = dict(value) if key == "status_counts" else value
+            elif key == "row_count":
+                merged[key] += value
+            elif key == "event_id_checksum":
+                merged[key] = f"{(int(merged[key], 16) + int(value, 16)) % 2**64:016x}"
+            elif key.startswith("min_"):
+                merged[key] = min(merged[key], value)
+            elif key.startswith("max_"):
+                merged[key] = max(merged[key], value)
+            else:
+                for status, count in value.items():
+                    merged[key][status] = merged[key].get(status, 0) + count
+                merged[key] = {k: v for k, v in sorted(merged[key].items()) if v}
+    return total
+
+
+def write_expected_partitions(
+    event_partitions, order_partitions, watermark, partition_by="day"
+):
+    """
+    Write or extend EXPECTED_PARTITIONS_FILE
+
+    The file holds the final contents of every event-time partition of
+    clickstream events and orders given all data that has arrived before
+    `watermark` (late events land in their event-time partition, updates
+    move order statuses). Tick runs fold their new rows into it.
+
+    Args:
+        event_partitions: Stats from expected_event_partitions
+        order_partitions: Stats from expected_order_partitions
+        watermark: Arrival time the expectations are complete up to
+        partition_by: Event partition granularity of a new file
+    """
+    if EXPECTED_PARTITIONS_FILE.exists():
+        with open(EXPECTED_PARTITIONS_FILE) as f:
+            expected = json.load(f)
+    else:
+        expected = {
+            "clickstream_events": {"partition_by": partition_by, "partitions": {}},
+            "orders": {"partition_by": "day", "partitions": {}},
+        }
+
+    merge_expected_partitions(
+        expected["clickstream_events"]["partitions"], event_partitions
+    )
+    merge_expected_partitions(expected["orders"]["partitions"], order_partitions)
+    expected["watermark"] = watermark.isoformat()
+
+    for dataset in ["clickstream_events", "orders"]:
+        expected[dataset]["partitions"] = dict(
+            sorted(expected[dataset]["partitions"].items())
+        )
+
+    tmp_path = EXPECTED_PARTITIONS_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(expected, f, indent=2)
+    tmp_path.replace(EXPECTED_PARTITIONS_FILE)
+    logger.info(f"💾 Saved expected partition contents: {EXPECTED_PARTITIONS_FILE}")
+
+
+# ============================================
+# POSTGRESQL COPY SINK
+# ============================================
+
+
+def get_db_connection():
+    """Create and return PostgreSQL connection"""
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        logger.info("✅ Connected to PostgreSQL database")
+        return conn
+    except Exception as e:
+        logger.error(f"❌ Database connection failed: {str(e)}")
+        raise
+
+
+def to_table_rows(df, dataset, first_id, customer_index=None):
+    """
+    Convert a generated dataset to its source table layout for COPY
+
+    Primary keys are assigned by the generator (customers and orders are
+    numbered in generation order from `first_id`). Orders and customer
+    history generated with email keys have customer_id replaced by the
+    customer's id via `customer_index` (customer emails in id order), so no
+    database lookup is needed.
+
+    Returns:
+        pd.DataFrame: Columns in TABLE_COLUMNS[dataset] order
+    """
+    if dataset == "customers":
+        df = df.assign(customer_id=np.arange(first_id, first_id + len(df)))
+    elif dataset == "orders":
+        df = df.assign(order_id=np.arange(first_id, first_id + len(df)))
+
+    if dataset in ("orders", "customer_history") and not (
+        pd.api.types.is_integer_dtype(df["customer_id"])
+    ):
+        df = df.assign(customer_id=customer_index.get_indexer(df["customer_id"]) + 1)
+    return df[TABLE_COLUMNS[dataset]]
+
+
+class PostgresCopyWriter:
+    """
+    Stream shard part files into a source table with COPY FROM STDIN
+
+    Parts are headerless CSV in TABLE_COLUMNS order (see to_table_rows).
+    Same append/close interface as PartMerger, so the streaming pipeline
+    can target either files or the database. `freeze` is only valid when
+    the table was truncated in the current transaction.
+    """
+
+    def __init__(self, conn, table, freeze=True):
+        self.conn = conn
+        self.copy_sql = (
+            f"COPY {table} ({', '.join(TABLE_COLUMNS[table])}) "
+            f"FROM STDIN WITH (FORMAT csv{', FREEZE' if freeze else ''})"
+        )
+
+    def append(self, part_path):
+        """COPY one part file into the table and remove it"""
+        with open(part_path) as part, self.conn.cursor() as cur:
+            cur.copy_expert(self.copy_sql, part)
+        part_path.unlink()
+
+    def close(self):
+        """Nothing to finish; the caller commits the transaction"""
+
+
+def truncate_source_tables(conn):
+    """
+    Empty the customer and order tables in the current transaction
+
+    Truncating in the same transaction as the load lets COPY use FREEZE,
+    which writes rows already frozen and skips later hint-bit rewrites.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "TRUNCATE TABLE order_items, orders, customer_history, customers "
+            "RESTART IDENTITY CASCADE;"
+        )
+    logger.info("  Truncated customers, customer_history, orders and order_items")
+
+
+def reset_source_sequences(conn):
+    """Move the SERIAL sequences past the generator-assigned ids"""
+    with conn.cursor() as cur:
+        for table, column in [("customers", "customer_id"), ("orders", "order_id")]:
+            cur.execute(
+                f"""
+                SELECT setval(
+                    pg_get_serial_sequence('{table}', '{column}'),
+                    COALESCE(MAX({column}), 1),
+                    MAX({column}) IS NOT NULL
+                )
+                FROM {table};
+            """
+            )
+
+
+def apply_order_updates(conn, order_updates_df):
+    """
+    Apply late order status updates in the current transaction
+
+    The updates are COPYed into a temporary staging table and applied with
+    one UPDATE ... FROM (the orders trigger stamps updated_at). The staging
+    table is dropped again, so a transaction can apply several batches.
+    """
+    buffer = io.StringIO()
+    order_updates_df[["order_id", "order_status"]].to_csv(
+        buffer, header=False, index=False
+    )
+    buffer.seek(0)
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TEMP TABLE order_updates_stage (
+                order_id INTEGER PRIMARY KEY,
+                order_status VARCHAR(20) NOT NULL
+            ) ON COMMIT DROP;
+        """
+        )
+        cur.copy_expert("COPY order_updates_stage FROM STDIN WITH (FORMAT csv)", buffer)
+        cur.execute(
+            """
+            UPDATE orders o
+            SET order_status = u.order_status
+            FROM order_updates_stage u
+            WHERE o.order_id = u.order_id;
+        """
+        )
+        cur.execute("DROP TABLE order_updates_stage;")
+    logger.info(f"  Applied {len(order_updates_df):,} order status updates")
+
+
+# ============================================
+# STREAMING / SHARDED GENERATION
+# ============================================
+
+# Customer pool shared with shard workers (set by init_shard_worker)
+_shard_customers = None
+_shard_customer_index = None
+
+
+def init_shard_worker(customer_pool, scale_factor=1, profile="uniform"):
+    """Make the customer pool, row counts and profile available to shard tasks"""
+    global _shard_customers, _shard_customer_index
+    apply_scale_factor(scale_factor)
+    apply_workload_profile(profile)
+    _shard_customers = customer_pool
+    if customer_pool is not None:
+        _shard_customer_index = pd.Index(customer_pool["email"])
+
+
+def run_shard_task(task):
+    """Run one (function, args) shard task; used as the process pool target"""
+    func, args = task
+    return func(*args)
+
+
+def run_shards(tasks, workers, customer_pool=None):
+    """
+    Run shard tasks and yield their results in task order
+
+    With workers > 1 the tasks run in a process pool; results are still
+    yielded in submission order, so the output does not depend on which
+    worker finished first.
+    """
+    if workers <= 1:
+        init_shard_worker(customer_pool, SCALE_FACTOR, WORKLOAD_PROFILE)
+        for task in tasks:
+            yield run_shard_task(task)
+        return
+
+    with multiprocessing.Pool(
+        workers,
+        initializer=init_shard_worker,
+        initargs=(customer_pool, SCALE_FACTOR, WORKLOAD_PROFILE),
+    ) as pool:
+        yield from pool.imap(run_shard_task, tasks)
+
+
+def generate_customer_shard(shard, n, first_customer_id, id_keys="email"):
+    """Generate one shard of customers with its own RNG stream"""
+    return generate_customers(
+        n,
+        rng=make_rng("customers", shard),
+        first_customer_id=first_customer_id,
+        id_keys=id_keys,
+    )
+
+
+def generate_order_shard(
+    shard,
+    chunk,
+    first_order_id,
+    customer_tiers,
+    part_dir,
+    fmt="csv",
+    sink="files",
+    late_fraction=0,
+):
+    """
+    Generate one day-aligned chunk of orders and their items into part files
+
+    With sink="postgres" the parts are headerless CSV in source table layout
+    (generator-assigned ids) ready for PostgresCopyWriter. With a
+    `late_fraction`, the shard also draws its orders' late status updates.
+
+    Returns:
+        tuple: (part paths, orders count, order items count, late output);
+            late output is (order updates, expected order partitions) or None
+    """
+    chunk_start, chunk_end, n_rows = chunk
+
+    orders_df = generate_orders(
+        _shard_customers,
+        n_rows,
+        rng=make_rng("orders", shard),
+        start_date=chunk_start,
+        end_date=chunk_end,
+        customer_tiers=customer_tiers,
+    )
+    order_items_df = generate_order_items(
+        orders_df, first_order_id=first_order_id, rng=make_rng("order_items", shard)
+    )
+
+    if sink == "postgres":
+        orders_part = part_dir / f"orders.part-{shard:05d}.copy.csv"
+        order_items_part = part_dir / f"order_items.part-{shard:05d}.copy.csv"
+        orders_rows = to_table_rows(
+            orders_df, "orders", first_order_id, _shard_customer_index
+        )
+        orders_rows.to_csv(orders_part, header=False, index=False)
+        order_items_df.to_csv(order_items_part, header=False, index=False)
+    else:
+        orders_part = part_dir / f"orders.part-{shard:05d}.{fmt}"
+        order_items_part = part_dir / f"order_items.part-{shard:05d}.{fmt}"
+        write_dataset(orders_df, "orders", fmt, orders_part, header=shard == 1)
+        write_dataset(
+            order_items_df, "order_items", fmt, order_items_part, header=shard == 1
+        )
+
+    late_output = None
+    if late_fraction:
+        order_updates_df = generate_order_updates(
+            orders_df, first_order_id, late_fraction, make_rng("order_updates", shard)
+        )
+        late_output = (order_updates_df, expected_order_partitions(orders_df))
+
+    return (
+        (orders_part, order_items_part),
+        len(orders_df),
+        len(order_items_df),
+        late_output,
+    )
+
+
+def generate_event_shard(
+    shard, chunk, part_dir, fmt="csv", partition_by=None, late_fraction=0
+):
+    """
+    Generate one day-aligned chunk of clickstream events into a part file
+
+    With `partition_by`, the events are written straight into their
+    partition directories instead (see write_event_partitions).
+
+    Returns:
+        tuple: (part path or partition stats, events count, expected
+            event-time partitions or None without a `late_fraction`)
+    """
+    chunk_start, chunk_end, n_rows = chunk
+
+    clickstream_df = generate_clickstream_events(
+        _shard_customers,
+        n_rows,
+        rng=make_rng("clickstream", shard),
+        start_date=chunk_start,
+        end_date=chunk_end,
+        late_fraction=late_fraction,
+        late_rng=make_rng("late_events", shard),
+    )
+    expected = (
+        expected_event_partitions(clickstream_df, partition_by or "day")
+        if late_fraction
+        else None
+    )
+
+    if partition_by:
+        partition_stats = write_event_partitions(
+            clickstream_df, fmt, partition_by, f"part-{shard:05d}"
+        )
+        return partition_stats, len(clickstream_df), expected
+
+    events_part = part_dir / f"clickstream_events.part-{shard:05d}.{fmt}"
+    write_dataset(
+        clickstream_df, "clickstream_events", fmt, events_part, header=shard == 1
+    )
+
+    return events_part, len(clickstream_df), expected
+
+
+def generate_streaming(
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    workers=1,
+    fmt="csv",
+    sink="files",
+    partition_by=None,
+    id_keys="email",
+    history_depth=0,
+    late_fraction=0,
+):
+    """
+    Generate all datasets in fixed-size shards appended to the output files
+
+    Customers, orders/items and events are split into shards of at most
+    `chunk_size` rows. Each shard draws from its own counter-based RNG
+    stream (make_rng(stream, shard)) and writes a part file, and the parts
+    are appended to the output files in shard order. Shard boundaries depend
+    only on `chunk_size`, so the output is byte-identical for any `workers`.
+
+    Only the customer pool and the shards in flight are held in memory, so
+    peak memory does not grow with N_ORDERS or N_CLICKSTREAM_EVENTS. Order
+    and event shards are day-aligned (see plan_chunks) and written in date
+    order; rows are sorted by timestamp within each shard.
+
+    Order IDs follow file order, so each orders shard is given its first
+    order_id (rows in earlier shards + 1) up front from the plan.
+
+    With sink="postgres", customers, orders and order_items are streamed into
+    the source database with COPY instead (one transaction, replacing the
+    existing rows); clickstream events are still written to files.
+
+    With `partition_by` ("day" or "hour"), every shard writes its events
+    straight into Hive-style partition directories, and the partition
+    manifests are written once all shards are done.
+
+    With a `late_fraction`, shards also return their late order updates and
+    expected event-time partition stats. Updates arrived by the end of the
+    run are appended (or applied) shard by shard, sorted by updated_at
+    within each shard; only the pending rest is held until it is saved in
+    the generator state.
+
+    Args:
+        chunk_size: Maximum rows per shard
+        workers: Number of worker processes
+        fmt: Output format ("csv" or "parquet")
+        sink: "files" or "postgres"
+        partition_by: Partition clickstream events by "day" or "hour"
+        id_keys: Reference customers by "email" or "integer" customer_id
+        history_depth: Historical segment versions per customer (SCD Type 2)
+        late_fraction: Fraction of late event sessions and order updates
+
+    Returns:
+        dict: Row counts per dataset
+    """
+    counts = {
+        "customers": 0,
+        "customer_history": 0,
+        "orders": 0,
+        "order_items": 0,
+        "order_updates": 0,
+        "clickstream_events": 0,
+    }
+    part_dir = OUTPUT_DIR / ".parts"
+    part_dir.mkdir(exist_ok=True)
+
+    # Build/cache identity pools once before workers start loading them
+    load_identity_pools()
+
+    # Customers (kept in memory as the pool for orders/events)
+    customer_tasks = [
+        (
+            generate_customer_shard,
+            (shard, min(chunk_size, N_CUSTOMERS - first), first + 1, id_keys),
+        )
+        for shard, first in enumerate(range(0, N_CUSTOMERS, chunk_size))
+    ]
+    customers_df = pd.concat(
+        list(run_shards(customer_tasks, workers)), ignore_index=True
+    )
+    counts["customers"] = len(customers_df)
+
+    # Segment history for the whole pool at once (one stream, any chunk size)
+    history_df = None
+    if history_depth:
+        customers_df, history_df = generate_segment_history(customers_df, history_depth)
+        counts["customer_history"] = len(history_df)
+
+    if sink == "postgres":
+        conn = get_db_connection()
+        truncate_source_tables(conn)
+
+        customers_part = part_dir / "customers.copy.csv"
+        to_table_rows(customers_df, "customers", 1).to_csv(
+            customers_part, header=False, index=False
+        )
+        PostgresCopyWriter(conn, "customers").append(customers_part)
+        logger.info(f"💾 Copied {counts['customers']:,} customers into PostgreSQL")
+
+        if history_df is not None:
+            history_part = part_dir / "customer_history.copy.csv"
+            to_table_rows(
+                history_df,
+                "customer_history",
+                1,
+                pd.Index(customers_df["email"]),
+            ).to_csv(history_part, header=False, index=False)
+            PostgresCopyWriter(conn, "customer_history").append(history_part)
+            logger.info(
+                f"💾 Copied {counts['customer_history']:,} customer history rows "
+                "into PostgreSQL"
+            )
+
+        orders_output = PostgresCopyWriter(conn, "orders")
+        order_items_output = PostgresCopyWriter(conn, "order_items")
+    else:
+        write_dataset(customers_df, "customers", fmt)
+        logger.info(f"💾 Saved: {dataset_path('customers', fmt)}")
+        write_optional_dataset(history_df, "customer_history", fmt)
+
+        remove_dataset_outputs("orders")
+        remove_dataset_outputs("order_items")
+        orders_output = PartMerger(dataset_path("orders", fmt))
+        order_items_output = PartMerger(dataset_path("order_items", fmt))
+
+    customer_pool = select_customer_pool(customers_df)
+
+    # Orders and order items (shard 0 of each stream is reserved for planning)
+    plan_rng = make_rng("orders", 0)
+    customer_tiers = split_customers_pareto(len(customers_df), plan_rng)
+    order_chunks = plan_chunks(N_ORDERS, START_DATE, END_DATE, chunk_size, plan_rng)
+    first_order_ids = np.cumsum([0] + [n_rows for _, _, n_rows in order_chunks]) + 1
+
+    order_tasks = [
+        (
+            generate_order_shard,
+            (
+                shard,
+                chunk,
+                int(first_order_ids[shard - 1]),
+                customer_tiers,
+                part_dir,
+                fmt,
+                sink,
+                late_fraction,
+            ),
+        )
+        for shard, chunk in enumerate(order_chunks, start=1)
+    ]
+
+    # Late order updates arrived by the end of the run are written (or
+    # applied) shard by shard; only the pending ones are kept for the state
+    if sink != "postgres":
+        remove_dataset_outputs("order_updates")
+    pending_dfs = []
+    order_partitions = {}
+    results = run_shards(order_tasks, workers, customer_pool)
+    for shard, (parts, n_orders, n_items, late_output) in enumerate(results, start=1):
+        orders_output.append(parts[0])
+        order_items_output.append(parts[1])
+        counts["orders"] += n_orders
+        counts["order_items"] += n_items
+        if late_output:
+            order_updates_df, pending_df = split_order_updates(
+                late_output[0], full_run_watermark()
+            )
+            if sink == "postgres" and len(order_updates_df):
+                apply_order_updates(conn, order_updates_df)
+            elif len(order_updates_df):
+                append_dataset(order_updates_df, "order_updates", fmt)
+            pending_dfs.append(pending_df)
+            merge_expected_partitions(order_partitions, late_output[1])
+            merge_expected_partitions(
+                order_partitions,
+                expected_order_partitions(order_updates_df=order_updates_df),
+            )
+            counts["order_updates"] += len(order_updates_df)
+
+        chunk_start, chunk_end, _ = order_chunks[shard - 1]
+        logger.info(
+            f"💾 Orders shard {shard}/{len(order_chunks)} "
+            f"({chunk_start.date()} to {chunk_end.date()}): "
+            f"{counts['orders']:,} orders, {counts['order_items']:,} items written"
+        )
+
+    orders_output.close()
+    order_items_output.close()
+
+    pending_updates = []
+    if pending_dfs:
+        pending_updates = order_updates_to_state(
+            pd.concat(pending_dfs, ignore_index=True).sort_values(
+                "updated_at", kind="stable"
+            )
+        )
+
+    if sink == "postgres":
+        reset_source_sequences(conn)
+        conn.commit()
+        conn.close()
+        logger.info("✅ Committed customers, orders and order_items to PostgreSQL")
+
+    # Clickstream events
+    event_chunks = plan_chunks(
+        N_CLICKSTREAM_EVENTS,
+        CLICKSTREAM_START_DATE,
+        END_DATE,
+        chunk_size,
+        make_rng("clickstream", 0),
+    )
+
+    event_tasks = [
+        (
+            generate_event_shard,
+            (shard, chunk, part_dir, fmt, partition_by, late_fraction),
+        )
+        for shard, chunk in enumerate(event_chunks, start=1)
+    ]
+    remove_event_outputs()
+    if partition_by:
+        partition_stats = {}
+    else:
+        events_output = PartMerger(dataset_path("clickstream_events", fmt))
+
+    event_partitions = {}
+    results = run_shards(event_tasks, workers, customer_pool)
+    for shard, (output, n_events, expected) in enumerate(results, start=1):
+        if partition_by:
+            merge_partition_stats(partition_stats, output)
+        else:
+            events_output.append(output)
+        if expected:
+            merge_expected_partitions(event_partitions, expected)
+        counts["clickstream_events"] += n_events
+
+        chunk_start, chunk_end, _ = event_chunks[shard - 1]
+        logger.info(
+            f"💾 Events shard {shard}/{len(event_chunks)} "
+            f"({chunk_start.date()} to {chunk_end.date()}): "
+            f"{counts['clickstream_events']:,} events written"
+        )
+
+    if partition_by:
+        write_partition_manifests(partition_stats, fmt)
+    else:
+        events_output.close()
+    part_dir.rmdir()
+
+    EXPECTED_PARTITIONS_FILE.unlink(missing_ok=True)
+    if late_fraction:
+        write_expected_partitions(
+            event_partitions,
+            order_partitions,
+            full_run_watermark(),
+            partition_by or "day",
+        )
+
+    save_generator_state(
+        initial_generator_state(
+            counts["customers"],
+            chunk_size,
+            counts["orders"] + 1,
+            fmt,
+            sink,
+            partition_by,
+            id_keys,
+            late_fraction,
+            pending_updates,
+        )
+    )
+    return counts
+
+
+# ============================================
+# INCREMENTAL (TICK) GENERATION
+# ============================================
+
+
+def full_run_watermark():
+    """Midnight after END_DATE: the first instant a full run does not cover"""
+    return datetime.combine(END_DATE.date() + timedelta(days=1), datetime.min.time())
+
+
+def split_order_updates(order_updates_df, watermark):
+    """
+    Split order updates into those arrived before `watermark` and the rest
+
+    Returns:
+        tuple: (arrived updates, pending updates)
+    """
+    arrived = order_updates_df["updated_at"].to_numpy() < np.datetime64(watermark, "s")
+    return (
+        order_updates_df[arrived].reset_index(drop=True),
+        order_updates_df[~arrived].reset_index(drop=True),
+    )
+
+
+def order_updates_to_state(order_updates_df):
+    """Pending order updates as JSON-serializable records"""
+    return order_updates_df.assign(
+        order_date=order_updates_df["order_date"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        updated_at=order_updates_df["updated_at"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+    ).to_dict("records")
+
+
+def order_updates_from_state(records):
+    """Rebuild the pending order updates DataFrame from the generator state"""
+    df = pd.DataFrame(records, columns=DATASET_SCHEMAS["order_updates"].names)
+    return df.assign(
+        order_id=df["order_id"].astype("int64"),
+        order_date=pd.to_datetime(df["order_date"]).astype("datetime64[s]"),
+        updated_at=pd.to_datetime(df["updated_at"]).astype("datetime64[s]"),
+    )
+
+
+def initial_generator_state(
+    n_customers,
+    customer_chunk_size,
+    next_order_id,
+    fmt,
+    sink,
+    partition_by=None,
+    id_keys="email",
+    late_fraction=0,
+    pending_order_updates=None,
+):
+    """
+    Build the generator state left behind by a full generation
+
+    The customer pool is stored as its recipe (count and shard size): it is
+    regenerated exactly from its RNG streams, which keeps the state file small
+    at any scale. The watermark starts at midnight after END_DATE, the first
+    instant a full run does not cover.
+
+    Args:
+        n_customers: Customers generated (highest customer_id)
+        customer_chunk_size: Customers per shard in the full run
+        next_order_id: First unused order_id
+        fmt: Output format of the full run
+        sink: Output sink of the full run
+        partition_by: Clickstream partitioning of the full run (or None)
+        id_keys: Customer key mode of the full run
+        late_fraction: Late-arrival fraction of the full run
+        pending_order_updates: Late order updates not yet arrived
+            (see order_updates_to_state)
+
+    Returns:
+        dict: Generator state
+    """
+    order_days = (END_DATE.date() - START_DATE.date()).days + 1
+    event_days = (END_DATE.date() - CLICKSTREAM_START_DATE.date()).days + 1
+
+    return {
+        "watermark": full_run_watermark().isoformat(),
+        "tick": 0,
+        "n_customers": n_customers,
+        "customer_chunk_size": max(customer_chunk_size, 1),
+        "next_order_id": next_order_id,
+        "orders_per_day": N_ORDERS / order_days,
+        "events_per_day": N_CLICKSTREAM_EVENTS / event_days,
+        "scale_factor": SCALE_FACTOR,
+        "profile": WORKLOAD_PROFILE,
+        "format": fmt,
+        "sink": sink,
+        "partition_by": partition_by,
+        "id_keys": id_keys,
+        "late_fraction": late_fraction,
+        "pending_order_updates": pending_order_updates or [],
+    }
+
+
+def load_generator_state():
+    """
+    Load the generator state written by the previous run
+
+    Raises:
+        FileNotFoundError: If there is no state file
+        ValueError: If the state file is not valid JSON or lacks a
+            GENERATOR_STATE_KEYS entry
+    """
+    if not GENERATOR_STATE_FILE.exists():
+        raise FileNotFoundError(
+            f"No generator state at {GENERATOR_STATE_FILE}; "
+            "run a full generation before --tick"
+        )
+    with open(GENERATOR_STATE_FILE) as f:
+        try:
+            state = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(
+                f"Corrupt generator state at {GENERATOR_STATE_FILE} ({e}); "
+                "run a full generation to rebuild it"
+            ) from e
+
+    if not isinstance(state, dict):
+        state = {}
+    missing = [key for key in GENERATOR_STATE_KEYS if key not in state]
+    if missing:
+        raise ValueError(
+            f"Incomplete generator state at {GENERATOR_STATE_FILE} "
+            f"(missing {', '.join(missing)}); run a full generation to rebuild it"
+        )
+    return state
+
+
+def save_generator_state(state):
+    """Write the generator state atomically (tmp file + rename)"""
+    tmp_path = GENERATOR_STATE_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    tmp_path.replace(GENERATOR_STATE_FILE)
+    logger.info(f"💾 Saved generator state: {GENERATOR_STATE_FILE}")
+
+
+def rebuild_customer_pool(state):
+    """Regenerate the customer pool of the full run from its recipe"""
+    n_customers = state["n_customers"]
+    chunk_size = state["customer_chunk_size"]
+
+    customers_df = pd.concat(
+        [
+            generate_customer_shard(
+                shard,
+                min(chunk_size, n_customers - first),
+                first + 1,
+                state.get("id_keys", "email"),
+            )
+            for shard, first in enumerate(range(0, n_customers, chunk_size))
+        ],
+        ignore_index=True,
+    )
+    return select_customer_pool(customers_df)
+
+
+def generate_tick(period):
+    """
+    Append the next day or hour of orders, order items and events
+
+    Continues from the persisted generator state: the period starts at the
+    watermark, order ids continue from the high-water mark, and every tick
+    draws from its own RNG position (make_rng(stream, tick=n)). Volumes are
+    Poisson around the full run's daily rates, and the scale factor and
+    workload profile of the full run are reused (holiday spikes scale the
+    rate of their day). A "day" tick runs to the next midnight, so it also
+    completes a day started by hourly ticks.
+
+    Output goes to the same format and sink as the full run: rows are
+    appended to the files in OUTPUT_DIR, or COPYed into PostgreSQL (which
+    must hold the customers and orders of a --sink postgres run). The state
+    is saved only after the output is written.
+
+    With late arrivals (--late-fraction in the full run), the tick's late
+    sessions are back-dated into earlier days, and the pending order updates
+    whose updated_at falls in the tick are emitted or applied.
+
+    Args:
+        period: "day" or "hour"
+
+    Returns:
+        dict: Row counts per dataset
+    """
+    state = load_generator_state()
+    apply_scale_factor(state.get("scale_factor", 1))
+    apply_workload_profile(state.get("profile", "uniform"))
+    tick = state["tick"] + 1
+    fmt = state["format"]
+    late_fraction = state.get("late_fraction", 0)
+
+    tick_start = datetime.fromisoformat(state["watermark"])
+    if period == "hour":
+        tick_end = tick_start + timedelta(hours=1)
+    else:
+        tick_end = datetime.combine(
+            tick_start.date() + timedelta(days=1), datetime.min.time()
+        )
+    day_fraction = (tick_end - tick_start) / timedelta(days=1)
+
+    # Holiday profile: this day's weight relative to the average day of its year
+    volume = day_fraction
+    weights = day_weights(tick_start, 1)
+    if weights is not None:
+        year_weights = day_weights(datetime(tick_start.year, 1, 1), 365)
+        volume *= weights[0] / year_weights.mean()
+
+    # Whole days use the generators' inclusive-day windows (start == end day)
+    window_end = tick_start if day_fraction == 1 else tick_end
+
+    logger.info(f"⏱️ Tick {tick}: {tick_start} to {tick_end}")
+
+    load_identity_pools()
+    customer_pool = rebuild_customer_pool(state)
+    customer_tiers = split_customers_pareto(len(customer_pool), make_rng("orders", 0))
+
+    rng = make_rng("orders", tick=tick)
+    orders_df = generate_orders(
+        customer_pool,
+        int(rng.poisson(state["orders_per_day"] * volume)),
+        rng=rng,
+        start_date=tick_start,
+        end_date=window_end,
+        customer_tiers=customer_tiers,
+    )
+    order_items_df = generate_order_items(
+        orders_df,
+        first_order_id=state["next_order_id"],
+        rng=make_rng("order_items", tick=tick),
+    )
+
+    rng = make_rng("clickstream", tick=tick)
+    clickstream_df = generate_clickstream_events(
+        customer_pool,
+        int(rng.poisson(state["events_per_day"] * volume)),
+        rng=rng,
+        start_date=tick_start,
+        end_date=window_end,
+        late_fraction=late_fraction,
+        late_rng=make_rng("late_events", tick=tick),
+    )
+
+    # Late order updates arriving in this tick (earlier ones and this tick's)
+    order_updates_df, pending_df = split_order_updates(
+        pd.concat(
+            [
+                order_updates_from_state(state.get("pending_order_updates", [])),
+                generate_order_updates(
+                    orders_df,
+                    state["next_order_id"],
+                    late_fraction,
+                    make_rng("order_updates", tick=tick),
+                ),
+            ],
+            ignore_index=True,
+        ).sort_values("updated_at", kind="stable"),
+        tick_end,
+    )
+
+    if state["sink"] == "postgres":
+        part_dir = OUTPUT_DIR / ".parts"
+        part_dir.mkdir(exist_ok=True)
+        orders_part = part_dir / "orders.tick.copy.csv"
+        order_items_part = part_dir / "order_items.tick.copy.csv"
+        to_table_rows(
+            orders_df,
+            "orders",
+            state["next_order_id"],
+            pd.Index(customer_pool["email"]),
+        ).to_csv(orders_part, header=False, index=False)
+        order_items_df.to_csv(order_items_part, header=False, index=False)
+
+        conn = get_db_connection()
+        PostgresCopyWriter(conn, "orders", freeze=False).append(orders_part)
+        PostgresCopyWriter(conn, "order_items", freeze=False).append(order_items_part)
+        if len(order_updates_df):
+            apply_order_updates(conn, order_updates_df)
+        reset_source_sequences(conn)
+        conn.commit()
+        conn.close()
+        part_dir.rmdir()
+        logger.info("✅ Committed tick orders and order items to PostgreSQL")
+    else:
+        if len(orders_df):
+            append_dataset(orders_df, "orders", fmt)
+            append_dataset(order_items_df, "order_items", fmt)
+        if len(order_updates_df):
+            append_dataset(order_updates_df, "order_updates", fmt)
+
+    if len(clickstream_df) and state.get("partition_by"):
+        partition_stats = write_event_partitions(
+            clickstream_df, fmt, state["partition_by"], f"part-t{tick:06d}"
+        )
+        write_partition_manifests(partition_stats, fmt)
+    elif len(clickstream_df):
+        append_dataset(clickstream_df, "clickstream_events", fmt)
+
+    if late_fraction:
+        write_expected_partitions(
+            expected_event_partitions(
+                clickstream_df, state.get("partition_by") or "day"
+            ),
+            expected_order_partitions(orders_df, order_updates_df),
+            tick_end,
+        )
+
+    state.update(
+        watermark=tick_end.isoformat(),
+        tick=tick,
+        next_order_id=state["next_order_id"] + len(orders_df),
+        pending_order_updates=order_updates_to_state(pending_df),
+    )
+    save_generator_state(state)
+
+    return {
+        "orders": len(orders_df),
+        "order_items": len(order_items_df),
+        "order_updates": len(order_updates_df),
+        "clickstream_events": len(clickstream_df),
+    }
+
+
+# ============================================
+# MAIN EXECUTION
+# ============================================
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic e-commerce data into data/generated/"
+    )
+    parser.add_argument(
+        "--scale-factor",
+        type=float,
+        default=1,
+        help=(
+            "Multiply all row counts (SF 1 = "
+            f"{SF1_ROW_COUNTS['customers']:,} customers, "
+            f"{SF1_ROW_COUNTS['orders']:,} orders; default: 1)"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        choices=list(WORKLOAD_PROFILES),
+        default="uniform",
+        help=(
+            "Workload skew: Zipf product popularity, Black Friday/December "
+            "spikes or hot customers (default: uniform)"
+        ),
+    )
+    parser.add_argument(
+        "--history-depth",
+        type=int,
+        default=0,
+        help=(
+            "Generate N historical segment rows per customer "
+            "(customer_history dataset, SCD Type 2; default: 0)"
+        ),
+    )
+    parser.add_argument(
+        "--late-fraction",
+        type=float,
+        default=0,
+        help=(
+            "Fraction of event sessions arriving after their event time and of "
+            "orders getting a late status update (order_updates; default: 0)"
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Generate and append data in fixed-size chunks (bounded memory)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows per chunk in --stream mode (default: {DEFAULT_CHUNK_SIZE:,})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Generate shards in N worker processes (implies --stream)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="csv",
+        help="Output file format (default: csv)",
+    )
+    parser.add_argument(
+        "--tick",
+        choices=TICK_PERIODS,
+        help=(
+            "Append only the next day or hour of orders, items and events, "
+            f"continuing from {GENERATOR_STATE_FILE}"
+        ),
+    )
+    parser.add_argument(
+        "--partition-by",
+        choices=list(PARTITION_LAYOUTS),
+        help=(
+            "Write clickstream events as year=/month=/day=[/hour=] partitions "
+            f"with manifests under {PARTITIONED_EVENTS_DIR} instead of one file"
+        ),
+    )
+    parser.add_argument(
+        "--id-keys",
+        choices=ID_KEY_MODES,
+        default="email",
+        help=(
+            "Reference customers in orders/events by email, or by an integer "
+            "customer_id assigned by the generator (default: email)"
+        ),
+    )
+    parser.add_argument(
+        "--sink",
+        choices=OUTPUT_SINKS,
+        default="files",
+        help=(
+            "Write customers/orders/order_items to files, or COPY them straight "
+            "into the PostgreSQL source database (implies --stream)"
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.history_depth < 0:
+        parser.error("--history-depth must be 0 or more")
+    if not 0 <= args.late_fraction <= 1:
+        parser.error("--late-fraction must be between 0 and 1")
+    return args
+
+
+def main(argv=None):
+    """Main execution function"""
+    args = parse_args(argv)
+    apply_scale_factor(args.scale_factor)
+    apply_workload_profile(args.profile)
+
+    logger.info("=" * 50)
+    logger.info("Starting Data Generation Process")
+    logger.info("=" * 50)
+
+    try:
+        if args.tick:
+            counts = generate_tick(args.tick)
+
+            logger.info("\n" + "=" * 50)
+            logger.info(f"DATA GENERATION SUMMARY ({args.tick} tick)")
+            logger.info("=" * 50)
+            logger.info(f"✅ Orders: {counts['orders']:,}")
+            logger.info(f"✅ Order Items: {counts['order_items']:,}")
+            if counts["order_updates"]:
+                logger.info(f"✅ Order Updates: {counts['order_updates']:,}")
+            logger.info(f"✅ Clickstream Events: {counts['clickstream_events']:,}")
+            logger.info("=" * 50)
+
+            logger.info("\n🎉 Data generation completed successfully!")
+            return True
+
+        if args.stream or args.workers or args.sink == "postgres":
+            counts = generate_streaming(
+                args.chunk_size,
+                args.workers or 1,
+                args.format,
+                args.sink,
+                args.partition_by,
+                args.id_keys,
+                args.history_depth,
+                args.late_fraction,
+            )
+
+            logger.info("\n" + "=" * 50)
+            logger.info("DATA GENERATION SUMMARY (streaming)")
+            logger.info("=" * 50)
+            logger.info(f"✅ Customers: {counts['customers']:,}")
+            if counts["customer_history"]:
+                logger.info(f"✅ Customer History: {counts['customer_history']:,}")
+            logger.info(f"✅ Orders: {counts['orders']:,}")
+            logger.info(f"✅ Order Items: {counts['order_items']:,}")
+            if counts["order_updates"]:
+                logger.info(f"✅ Order Updates: {counts['order_updates']:,}")
+            logger.info(f"✅ Clickstream Events: {counts['clickstream_events']:,}")
+            logger.info(f"📁 Output Directory: {OUTPUT_DIR.absolute()}")
+            logger.info("=" * 50)
+
+            logger.info("\n🎉 Data generation completed successfully!")
+            return True
+
+        # Generate customers
+        customers_df = generate_customers(N_CUSTOMERS, id_keys=args.id_keys)
+        history_df = None
+        if args.history_depth:
+            customers_df, history_df = generate_segment_history(
+                customers_df, args.history_depth
+            )
+        write_dataset(customers_df, "customers", args.format)
+        logger.info(f"💾 Saved: {dataset_path('customers', args.format)}")
+        write_optional_dataset(history_df, "customer_history", args.format)
 
         # Generate orders
         orders_df = generate_orders(customers_df, N_ORDERS)
-        orders_df.to_csv(OUTPUT_DIR / "orders.csv", index=False)
-        logger.info(f"💾 Saved: {OUTPUT_DIR / 'orders.csv'}")
+        write_dataset(orders_df, "orders", args.format)
+        logger.info(f"💾 Saved: {dataset_path('orders', args.format)}")
 
         # Generate order items
         order_items_df = generate_order_items(orders_df)
-        order_items_df.to_csv(OUTPUT_DIR / "order_items.csv", index=False)
-        logger.info(f"💾 Saved: {OUTPUT_DIR / 'order_items.csv'}")
+        write_dataset(order_items_df, "order_items", args.format)
+        logger.info(f"💾 Saved: {dataset_path('order_items', args.format)}")
+
+        # Late order updates (arrived by the end of the run vs. pending)
+        order_updates_df = None
+        pending_df = None
+        if args.late_fraction:
+            order_updates_df, pending_df = split_order_updates(
+                generate_order_updates(orders_df, 1, args.late_fraction),
+                full_run_watermark(),
+            )
+        write_optional_dataset(order_updates_df, "order_updates", args.format)
 
         # Generate clickstream events
-        clickstream_df = generate_clickstream_events(customers_df, N_CLICKSTREAM_EVENTS)
-        clickstream_df.to_csv(OUTPUT_DIR / "clickstream_events.csv", index=False)
-        logger.info(f"💾 Saved: {OUTPUT_DIR / 'clickstream_events.csv'}")
+        clickstream_df = generate_clickstream_events(
+            customers_df, N_CLICKSTREAM_EVENTS, late_fraction=args.late_fraction
+        )
+        remove_event_outputs()
+        if args.partition_by:
+            partition_stats = write_event_partitions(
+                clickstream_df, args.format, args.partition_by, "part-00000"
+            )
+            write_partition_manifests(partition_stats, args.format)
+        else:
+            write_dataset(clickstream_df, "clickstream_events", args.format)
+            logger.info(f"💾 Saved: {dataset_path('clickstream_events', args.format)}")
+
+        EXPECTED_PARTITIONS_FILE.unlink(missing_ok=True)
+        if args.late_fraction:
+            write_expected_partitions(
+                expected_event_partitions(clickstream_df, args.partition_by or "day"),
+                expected_order_partitions(orders_df, order_updates_df),
+                full_run_watermark(),
+                args.partition_by or "day",
+            )
+
+        save_generator_state(
+            initial_generator_state(
+                len(customers_df),
+                N_CUSTOMERS,
+                len(orders_df) + 1,
+                args.format,
+                "files",
+                args.partition_by,
+                args.id_keys,
+                args.late_fraction,
+                order_updates_to_state(pending_df) if args.late_fraction else None,
+            )
+        )
 
         # Summary statistics
         logger.info("\n" + "=" * 50)
         logger.info("DATA GENERATION SUMMARY")
         logger.info("=" * 50)
         logger.info(f"✅ Customers: {len(customers_df):,}")
+        if history_df is not None:
+            logger.info(f"✅ Customer History: {len(history_df):,}")
         logger.info(f"✅ Orders: {len(orders_df):,}")
         logger.info(f"✅ Order Items: {len(order_items_df):,}")
+        if order_updates_df is not None:
+            logger.info(f"✅ Order Updates: {len(order_updates_df):,}")
         logger.info(f"✅ Clickstream Events: {len(clickstream_df):,}")
         logger.info(f"📁 Output Directory: {OUTPUT_DIR.absolute()}")
         logger.info("=" * 50)
@@ -460,9 +3019,21 @@ def main():
         logger.info(
             f"✓ All order items have positive quantities: {(order_items_df['quantity'] > 0).all()}"
         )
+        required_columns = customers_df.drop(columns=SCD2_NULLABLE_COLUMNS)
         logger.info(
-            f"✓ No null values in customers: {customers_df.isnull().sum().sum() == 0}"
+            "✓ No null values in customers (except SCD2 end dates): "
+            f"{required_columns.notna().all().all()}"
         )
+        if history_df is not None:
+            logger.info(
+                "✓ Customer history ranges valid (end > start): "
+                f"{(history_df['segment_end_date'] > history_df['segment_start_date']).all()}"
+            )
+        if args.late_fraction:
+            late_events = (
+                clickstream_df["arrival_timestamp"] > clickstream_df["event_timestamp"]
+            )
+            logger.info(f"✓ Late-arriving events: {late_events.mean():.1%}")
 
         logger.info("\n🎉 Data generation completed successfully!")
         return True
@@ -11,6 +11,7 @@
 -- ==========================================
 DROP TABLE IF EXISTS order_items CASCADE;
 DROP TABLE IF EXISTS orders CASCADE;
+DROP TABLE IF EXISTS customer_history CASCADE;
 DROP TABLE IF EXISTS customers CASCADE;
 
 -- ==========================================
@@ -45,6 +46,30 @@ CREATE INDEX idx_customers_segment ON customers(customer_segment);
 CREATE INDEX idx_customers_is_current ON customers(is_current);
 CREATE INDEX idx_customers_registration_date ON customers(registration_date);
 
+-- ==========================================
+-- CUSTOMER_HISTORY TABLE (SCD Type 2 history)
+-- ==========================================
+-- Earlier segment versions of each customer (generate_data.py --history-depth).
+-- The current version stays in customers; stg_customers unions both.
+CREATE TABLE customer_history (
+    customer_id INTEGER NOT NULL REFERENCES customers(customer_id) ON DELETE CASCADE,
+    customer_segment VARCHAR(20) NOT NULL,
+    segment_start_date DATE NOT NULL,
+    segment_end_date DATE NOT NULL,
+    is_current BOOLEAN NOT NULL DEFAULT FALSE,
+
+    -- Audit fields
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (customer_id, segment_start_date),
+
+    -- Constraints
+    CONSTRAINT chk_history_segment CHECK (customer_segment IN ('bronze', 'silver', 'gold', 'platinum')),
+    CONSTRAINT chk_history_dates CHECK (segment_end_date > segment_start_date),
+    CONSTRAINT chk_history_not_current CHECK (is_current = FALSE)
+);
+
 -- ==========================================
 -- ORDERS TABLE
 -- ==========================================
@@ -199,6 +224,6 @@ GRANT USAGE, SELECT ON ALL SEQUENCES IN SCHEMA public TO ecommerce_user;
 -- ==========================================
 SELECT
     'PostgreSQL source database setup complete!' AS message,
-    'Tables created: customers, orders, order_items' AS tables,
+    'Tables created: customers, customer_history, orders, order_items' AS tables,
     'Views created: vw_order_details, vw_customer_summary' AS views,
     'Sample data inserted: 1 customer, 1 order, 2 items' AS sample_data;
@@ -0,0 +1,352 @@
+"""
+Shared S3 Data Lake Reader for the Lake Loaders
+
+Lists every object under a prefix (following list_objects_v2 continuation
+tokens past the 1,000-key page limit) and downloads objects in a bounded
+thread pool, handing them to the loader in key order while the next
+downloads are in flight. Bodies are streamed: the loader parses the first
+rows while the rest is still downloading, and only a bounded buffer of each
+object is held in memory (see open_csv and iter_json_array).
+
+Setting LAKE_LOCAL_DIR reads a local copy of the lake instead of S3: each
+bucket is a subdirectory and each key a file path below it. LocalS3Client
+can also be passed directly, as can a moto-mocked boto3 client.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import boto3
+
+# ============================================
+# CONFIGURATION
+# ============================================
+
+# Concurrent downloads, and objects downloaded ahead of the loader
+LAKE_WORKERS = 4
+LAKE_PREFETCH = 2 * LAKE_WORKERS
+
+# Keys per list_objects_v2 page (the S3 maximum)
+LIST_PAGE_SIZE = 1000
+
+# Characters that may continue a JSON number cut off at the end of a piece
+NUMBER_CONTINUATION = "0123456789.eE+-"
+
+# Streamed bodies: bytes per read from S3, and reads buffered per object
+STREAM_CHUNK_SIZE = 1 << 20
+STREAM_BUFFER_CHUNKS = 4
+
+# ============================================
+# LISTING AND DOWNLOADS
+# ============================================
+
+
+def make_s3_client():
+    """boto3 S3 client, or a LocalS3Client when LAKE_LOCAL_DIR is set"""
+    local_dir = os.getenv("LAKE_LOCAL_DIR")
+    if local_dir:
+        return LocalS3Client(local_dir)
+    return boto3.client("s3")
+
+
+def list_objects(s3, bucket, prefix, suffix=""):
+    """
+    List every object under a prefix, one list_objects_v2 page at a time
+
+    Args:
+        s3: S3 client (boto3, moto or LocalS3Client)
+        bucket: Bucket name
+        prefix: Key prefix
+        suffix: Only objects whose key ends with it (e.g. ".csv")
+
+    Yields:
+        dict: Object summary (Key, Size, ETag, LastModified)
+    """
+    kwargs = {"Bucket": bucket, "Prefix": prefix}
+    while True:
+        response = s3.list_objects_v2(**kwargs)
+        for obj in response.get("Contents", []):
+            if obj["Key"].endswith(suffix):
+                yield obj
+
+        if not response.get("IsTruncated"):
+            return
+        kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+
+class ObjectStream(io.RawIOBase):
+    """
+    Readable binary stream of an object body downloaded by another thread
+
+    The downloading thread (see download) hands over STREAM_CHUNK_SIZE reads
+    through a queue of at most STREAM_BUFFER_CHUNKS, so it waits for the
+    reader instead of holding the whole body. Closing the stream stops the
+    download.
+    """
+
+    def __init__(self):
+        self.chunks = queue.Queue(STREAM_BUFFER_CHUNKS)
+        self.cancelled = threading.Event()
+        self.pending = memoryview(b"")
+        self.finished = False
+
+    def download(self, s3, bucket, key):
+        """Read the object body into the queue (runs in a pool thread)"""
+        try:
+            response = s3.get_object(Bucket=bucket, Key=key)
+            with closing(response["Body"]) as body:
+                for chunk in iter(lambda: body.read(STREAM_CHUNK_SIZE), b""):
+                    if not self.put(chunk):
+                        return
+            self.put(None)
+        except Exception as e:
+            self.put(e)
+
+    def put(self, item):
+        """Queue a chunk, None (end) or an exception; False once closed"""
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            if self.finished:
+                return 0
+            item = self.chunks.get()
+            if item is None:
+                self.finished = True
+                return 0
+            if isinstance(item, Exception):
+                raise item
+            self.pending = memoryview(item)
+
+        n = min(len(buffer), len(self.pending))
+        buffer[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+    def close(self):
+        self.cancelled.set()
+        super().close()
+
+
+def iter_objects(s3, bucket, objects, workers=LAKE_WORKERS, prefetch=LAKE_PREFETCH):
+    """
+    Download objects concurrently and yield their bodies as streams, in order
+
+    Each object is downloaded by a pool thread into a bounded buffer (see
+    ObjectStream), so the consumer starts parsing an object while it is
+    still downloading, and at most `prefetch` objects ahead of it are being
+    fetched. Memory is bounded by the buffers, not the object sizes. A
+    stream is closed once the consumer moves on to the next object, and
+    every remaining download is stopped if the consumer stops early.
+
+    Args:
+        s3: S3 client (boto3 clients are thread-safe)
+        bucket: Bucket name
+        objects: Object summaries, e.g. from list_objects
+        workers: Concurrent downloads
+        prefetch: Objects fetched ahead of the consumer
+
+    Yields:
+        tuple: (object summary, buffered binary stream of the body)
+    """
+    pending = deque()
+    with ThreadPoolExecutor(workers) as executor:
+        try:
+            for obj in objects:
+                stream = ObjectStream()
+                executor.submit(stream.download, s3, bucket, obj["Key"])
+                pending.append((obj, stream))
+                if len(pending) > prefetch:
+                    obj, stream = pending.popleft()
+                    with io.BufferedReader(stream, STREAM_CHUNK_SIZE) as body:
+                        yield obj, body
+
+            while pending:
+                obj, stream = pending.popleft()
+                with io.BufferedReader(stream, STREAM_CHUNK_SIZE) as body:
+                    yield obj, body
+        finally:
+            for _, stream in pending:
+                stream.close()
+
+
+# ============================================
+# STREAMING DECODERS
+# ============================================
+
+
+def open_csv(body):
+    """
+    Decode a streamed CSV body incrementally
+
+    Returns:
+        tuple: (header columns, text stream positioned after the header)
+    """
+    text = io.TextIOWrapper(body, encoding="utf-8", newline="")
+    header = next(csv.reader([text.readline()]))
+    return header, text
+
+
+def iter_json_array(body, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Parse a streamed top-level JSON array one element at a time
+
+    The body is decoded in `chunk_size` pieces and each element is parsed
+    with JSONDecoder.raw_decode as soon as it is complete, so memory holds
+    one element plus one piece instead of the whole document. Anything but
+    whitespace after the closing bracket is an error, as for json.loads.
+
+    Args:
+        body: Binary stream of a JSON array (e.g. from iter_objects)
+        chunk_size: Characters decoded per read
+
+    Yields:
+        Next array element
+    """
+    text = io.TextIOWrapper(body, encoding="utf-8")
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    state = "start"  # start -> first -> (value -> separator)* -> end
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                if state == "end":
+                    return
+                raise ValueError("JSON array is truncated")
+            buffer, position = text.read(chunk_size), 0
+            eof = not buffer
+            continue
+
+        char = buffer[position]
+        if state == "end":
+            raise ValueError(f"Unexpected data after JSON array: {char!r}")
+        elif state == "start":
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            position += 1
+            state = "first"
+        elif state == "separator":
+            if char == "]":
+                state = "end"
+            elif char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            else:
+                state = "value"
+            position += 1
+        elif state == "first" and char == "]":
+            position += 1
+            state = "end"
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+
+            # Incomplete, or a number that may go on in the next piece: read on
+            if end is None or (
+                not eof and (end == len(buffer) or buffer[end] in NUMBER_CONTINUATION)
+            ):
+                data = text.read(chunk_size)
+                eof = not data
+                buffer, position = buffer[position:] + data, 0
+                continue
+
+            yield value
+            position = end
+            state = "separator"
+
+
+# ============================================
+# LOCAL FILESYSTEM STAND-IN
+# ============================================
+
+
+class LocalS3Client:
+    """
+    Minimal S3 client over a local directory
+
+    Implements the calls the lake reader makes (list_objects_v2 with
+    continuation tokens, get_object) with S3's response shapes: keys are
+    listed in lexicographic order, ETags are quoted MD5 hex digests, and
+    bodies are file objects supporting read().
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def list_objects_v2(
+        self, Bucket, Prefix="", ContinuationToken=None, MaxKeys=LIST_PAGE_SIZE
+    ):
+        bucket_dir = self.root / Bucket
+        keys = sorted(
+            path.relative_to(bucket_dir).as_posix()
+            for path in bucket_dir.rglob("*")
+            if path.is_file()
+        )
+        keys = [
+            key
+            for key in keys
+            if key.startswith(Prefix)
+            and (ContinuationToken is None or key > ContinuationToken)
+        ]
+
+        page = keys[:MaxKeys]
+        response = {
+            "KeyCount": len(page),
+            "MaxKeys": MaxKeys,
+            "IsTruncated": len(keys) > MaxKeys,
+        }
+        if page:
+            response["Contents"] = [self.head(bucket_dir / key, key) for key in page]
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+    def get_object(self, Bucket, Key):
+        path = self.root / Bucket / Key
+        summary = self.head(path, Key)
+        return {
+            "Body": open(path, "rb"),
+            "ContentLength": summary["Size"],
+            "ETag": summary["ETag"],
+            "LastModified": summary["LastModified"],
+        }
+
+    @staticmethod
+    def head(path, key):
+        """Object summary of a file, as in a list_objects_v2 response"""
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        stat = path.stat()
+        return {
+            "Key": key,
+            "Size": stat.st_size,
+            "ETag": f'"{digest.hexdigest()}"',
+            "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        }
@@ -4,29 +4,47 @@ Modern E-Commerce Analytics Platform
 Data Loading Script - PostgreSQL
 ============================================
 
-This script loads generated CSV data into PostgreSQL source database.
+This script loads generated CSV or Parquet data into PostgreSQL source database.
 
 Prerequisites:
     - PostgreSQL source database running (docker-compose up)
-    - Generated CSV files in data/generated/
+    - Generated CSV or Parquet files in data/generated/
     - .env file with database credentials
 
 Usage:
     python scripts/load_data.py
+    python scripts/load_data.py --method execute_values
+    python scripts/load_data.py --workers 8
+    python scripts/load_data.py --mode incremental
+    python scripts/load_data.py --mode swap
+    python scripts/load_data.py --mode chunked --chunk-size 50000
+    python scripts/load_data.py --workers 8 --defer-indexes
 
 Author: Zaid Shaikh
 Date: October 2025
 ============================================
 """
 
+import argparse
+import io
+import itertools
+import json
 import logging
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 import psycopg2
+import psycopg2.errors
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
 from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
 
 # Load environment variables
 load_dotenv()
@@ -52,6 +70,118 @@ DB_CONFIG = {
 # Data directory
 DATA_DIR = Path("data/generated")
 
+# Supported generator output formats (see generate_data.py --format)
+DATA_FORMATS = ["parquet", "csv"]
+
+# Bulk insert methods (--method): COPY FROM STDIN, or multi-row INSERTs
+LOAD_METHODS = ["copy", "execute_values"]
+
+# Load modes (--mode): truncate and reload, upsert into the existing rows,
+# reload into shadow tables and swap them in, or reload in resumable chunks
+LOAD_MODES = ["full", "incremental", "swap", "chunked"]
+
+# Rows read from a data file and inserted per round trip
+LOAD_CHUNK_SIZE = 100000
+
+# Rows read from a CSV file to tell email from integer customer keys
+LOOKUP_SAMPLE_ROWS = 1000
+
+# Columns loaded into each table (customer_id is added to customers when the
+# file carries it, see table_layout)
+TABLE_COLUMNS = {
+    "customers": [
+        "email",
+        "first_name",
+        "last_name",
+        "phone",
+        "registration_date",
+        "customer_segment",
+        "segment_start_date",
+        "segment_end_date",
+        "is_current",
+    ],
+    "customer_history": [
+        "customer_id",
+        "customer_segment",
+        "segment_start_date",
+        "segment_end_date",
+        "is_current",
+    ],
+    "orders": [
+        "customer_id",
+        "order_date",
+        "order_total",
+        "payment_method",
+        "shipping_address",
+        "order_status",
+    ],
+    "order_items": [
+        "order_id",
+        "product_id",
+        "quantity",
+        "unit_price",
+        "discount_amount",
+    ],
+}
+
+# Parallel loading (--workers): a table starts once the tables it references
+# are committed; tables whose dependencies are done load concurrently
+TABLE_DEPENDENCIES = {
+    "customers": [],
+    "customer_history": ["customers"],
+    "orders": ["customers"],
+    "order_items": ["orders"],
+    "order_updates": ["orders"],
+}
+
+# Bulk-load mode (--defer-indexes): secondary indexes and INSERT triggers of
+# these tables are dropped/disabled for the load and restored afterwards.
+# What was deferred is recorded in DEFERRED_OBJECTS_TABLE in the same
+# transaction, so an interrupted load is repaired by the next run.
+DEFERRED_TABLES = ["customers", "customer_history", "orders", "order_items"]
+DEFERRED_OBJECTS_TABLE = "load_deferred_objects"
+
+# pg_trigger.tgtype bit of triggers that fire on INSERT
+TRIGGER_TYPE_INSERT = 1 << 2
+
+# Keys incremental loads (--mode incremental) merge on: the email for
+# customers, and for orders/items the generator's row numbering. The position
+# ids are only stable while files are appended to (ticks) and never
+# regenerated or reordered, so rows already loaded under the same id must
+# still agree on POSITION_IDENTITY_COLUMNS, or the merge is refused.
+MERGE_KEYS = {
+    "customers": ["email"],
+    "customer_history": ["customer_id", "segment_start_date"],
+    "orders": ["order_id"],
+    "order_items": ["order_item_id"],
+}
+POSITION_IDENTITY_COLUMNS = {
+    "orders": ["customer_id", "order_date"],
+    "order_items": ["order_id", "product_id"],
+}
+
+# Shadow reloads (--mode swap): these tables are rebuilt as <table>_shadow and
+# renamed over the live tables in one transaction. The swap waits at most
+# SWAP_LOCK_TIMEOUT for readers to let go, and is retried SWAP_ATTEMPTS times.
+SWAP_TABLES = ["customers", "customer_history", "orders", "order_items"]
+SHADOW_SUFFIX = "_shadow"
+SWAP_LOCK_TIMEOUT = "5s"
+SWAP_ATTEMPTS = 5
+
+# Resumable loads (--mode chunked): every chunk commits together with its
+# checkpoint in LOAD_PROGRESS_TABLE, and its throughput is appended to the
+# JSON Lines metrics log
+LOAD_PROGRESS_TABLE = "load_progress"
+LOAD_METRICS_LOG = Path("data/load_metrics.jsonl")
+
+# SERIAL keys assigned from the file row position in every load mode, so the
+# ids match the generated files whatever order rows are loaded in
+SERIAL_KEYS = {
+    "customers": "customer_id",
+    "orders": "order_id",
+    "order_items": "order_item_id",
+}
+
 # ============================================
 # DATABASE CONNECTION
 # ============================================
@@ -69,71 +199,413 @@ def get_db_connection():
 
 
 # ============================================
-# DATA LOADING FUNCTIONS
+# DATA FILES
 # ============================================
 
 
-def load_customers(conn, csv_path):
+def find_data_file(dataset):
     """
-    Load customer data into PostgreSQL
+    Locate the generated file for a dataset
 
-    Args:
-        conn: Database connection
-        csv_path: Path to customers.csv
+    If both a CSV and a Parquet file exist, the most recently written one is
+    used (it is the output of the latest generate_data.py run).
+
+    Returns:
+        Path: Data file, or None if the dataset has not been generated
     """
-    logger.info(f"Loading customers from {csv_path}...")
+    candidates = [DATA_DIR / f"{dataset}.{fmt}" for fmt in DATA_FORMATS]
+    existing = [path for path in candidates if path.exists()]
+    if not existing:
+        return None
+    return max(existing, key=lambda path: path.stat().st_mtime)
 
-    df = pd.read_csv(csv_path)
 
-    # Create cursor
-    cur = conn.cursor()
+def iter_data_file(data_path, chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Read a generated data file in chunks of at most `chunk_size` rows
 
-    # Clear existing data (for clean reload)
-    cur.execute("TRUNCATE TABLE customers CASCADE;")
-    logger.info("  Truncated existing customers table")
+    Keeps memory bounded by the chunk size instead of the file size.
 
-    # Prepare data for insertion
-    columns = [
-        "email",
-        "first_name",
-        "last_name",
-        "phone",
-        "registration_date",
-        "customer_segment",
-        "segment_start_date",
-        "segment_end_date",
-        "is_current",
-    ]
+    Yields:
+        pd.DataFrame: Next chunk of rows
+    """
+    if Path(data_path).suffix == ".parquet":
+        for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(data_path, chunksize=chunk_size)
+
+
+def iter_data_file_from(
+    data_path, row_offset=0, byte_offset=0, chunk_size=LOAD_CHUNK_SIZE
+):
+    """
+    Read a data file in chunks starting at a checkpoint
 
-    # Convert DataFrame to list of tuples
-    values = []
-    for _, row in df.iterrows():
-        values.append(
+    CSV files resume by seeking to `byte_offset`, the end of the last chunk
+    read. Parquet files resume at row `row_offset`; their byte offset is the
+    approximate position in the row group data (see parquet_position).
+
+    Yields:
+        tuple: (chunk, row offset, byte offset) reached after each chunk
+    """
+    if Path(data_path).suffix == ".parquet":
+        yield from iter_parquet_from(data_path, row_offset, chunk_size)
+    else:
+        yield from iter_csv_from(data_path, row_offset, byte_offset, chunk_size)
+
+
+def iter_csv_from(data_path, row_offset, byte_offset, chunk_size):
+    """Read a CSV file in chunks of whole records from a byte offset"""
+    with open(data_path, "rb") as f:
+        header = f.readline()
+        f.seek(max(byte_offset, f.tell()))
+
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+
+            # A quoted field may span lines: read on until the quotes balance
+            quotes = sum(line.count(b'"') for line in lines)
+            while quotes % 2:
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(line)
+                quotes += line.count(b'"')
+
+            chunk = pd.read_csv(io.BytesIO(header + b"".join(lines)))
+            row_offset += len(chunk)
+            yield chunk, row_offset, f.tell()
+
+
+def parquet_position(row_groups, row):
+    """
+    Approximate byte offset of a row in the row group data of a Parquet file
+
+    Args:
+        row_groups: (rows, compressed bytes) of each row group
+        row: Row number
+
+    Returns:
+        int: Compressed bytes of the earlier row groups, plus the row's
+            share of its own row group
+    """
+    offset = 0
+    for num_rows, size in row_groups:
+        if row <= num_rows:
+            return offset + size * row // max(num_rows, 1)
+        row -= num_rows
+        offset += size
+    return offset
+
+
+def iter_parquet_from(data_path, row_offset, chunk_size):
+    """Read a Parquet file in chunks from a row, skipping whole row groups"""
+    parquet = pq.ParquetFile(data_path)
+    row_groups = []
+    for i in range(parquet.metadata.num_row_groups):
+        group = parquet.metadata.row_group(i)
+        row_groups.append(
             (
-                row["email"],
-                row["first_name"],
-                row["last_name"],
-                row["phone"],
-                row["registration_date"],
-                row["customer_segment"],
-                row["segment_start_date"],
-                (
-                    None
-                    if pd.isna(row.get("segment_end_date"))
-                    else row["segment_end_date"]
+                group.num_rows,
+                sum(
+                    group.column(c).total_compressed_size
+                    for c in range(group.num_columns)
                 ),
-                row["is_current"],
             )
         )
 
-    # Bulk insert using execute_values (much faster)
-    insert_query = """
-        INSERT INTO customers (email, first_name, last_name, phone, registration_date,
-                             customer_segment, segment_start_date, segment_end_date, is_current)
-        VALUES %s
+    first_group, skip = 0, row_offset
+    while first_group < len(row_groups) and skip >= row_groups[first_group][0]:
+        skip -= row_groups[first_group][0]
+        first_group += 1
+    if first_group == len(row_groups):
+        return
+
+    batches = parquet.iter_batches(
+        batch_size=chunk_size, row_groups=list(range(first_group, len(row_groups)))
+    )
+    for batch in batches:
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        batch = batch.slice(skip)
+        skip = 0
+
+        row_offset += batch.num_rows
+        yield batch.to_pandas(), row_offset, parquet_position(row_groups, row_offset)
+
+
+# ============================================
+# BULK INSERT
+# ============================================
+
+
+def insert_rows(cur, table, columns, df, method="copy"):
+    """
+    Insert a chunk of rows into a table
+
+    With method="copy" the chunk is rendered to CSV in one call and streamed
+    with COPY FROM STDIN (empty fields load as NULL). With
+    method="execute_values" it is converted to tuples of Python values in
+    bulk and inserted with multi-row INSERT statements.
+
+    Args:
+        cur: Database cursor
+        table: Target table
+        columns: Target columns, in the order of the columns of `df`
+        df: Rows to insert (already in table layout)
+        method: "copy" or "execute_values"
+    """
+    if method == "copy":
+        buffer = io.StringIO()
+        df.to_csv(buffer, header=False, index=False)
+        buffer.seek(0)
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    else:
+        values = df.astype(object).where(df.notna(), None)
+        execute_values(
+            cur,
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+            list(values.itertuples(index=False, name=None)),
+        )
+
+
+def email_customer_keys(data_path):
+    """
+    Whether a data file keys customers by email (see customer_id_lookup)
+
+    Files generated with --id-keys integer carry integer customer ids, so
+    loading them needs no lookup on customers. Parquet files are checked by
+    their schema, CSV files by the type of the first rows.
+    """
+    if Path(data_path).suffix == ".parquet":
+        key_type = pq.read_schema(data_path).field("customer_id").type
+        return not pa.types.is_integer(key_type)
+
+    keys = pd.read_csv(data_path, usecols=["customer_id"], nrows=LOOKUP_SAMPLE_ROWS)
+    return not pd.api.types.is_integer_dtype(keys["customer_id"])
+
+
+def customer_id_lookup(cur, table="customers"):
+    """Map customer email to customer_id (for files generated with email keys)"""
+    cur.execute(f"SELECT email, customer_id FROM {table};")
+    return pd.Series(dict(cur.fetchall()), dtype="Int64")
+
+
+def resolve_customer_ids(df, email_to_id):
+    """
+    Replace email customer keys with customer_id, dropping unknown customers
+
+    Files generated with --id-keys integer already carry the customer_id.
     """
+    if pd.api.types.is_integer_dtype(df["customer_id"]):
+        return df
 
-    execute_values(cur, insert_query, values)
+    customer_ids = df["customer_id"].map(email_to_id)  # customer_id is email
+    known = customer_ids.notna()
+    return df[known].assign(customer_id=customer_ids[known].astype("int64"))
+
+
+# ============================================
+# INDEX AND TRIGGER DEFERRAL
+# ============================================
+
+
+def defer_indexes_and_triggers(conn, tables=DEFERRED_TABLES):
+    """
+    Drop secondary indexes and disable INSERT triggers before a bulk load
+
+    Index definitions (pg_get_indexdef) and trigger names are recorded in
+    DEFERRED_OBJECTS_TABLE in the same transaction that drops/disables them,
+    so they are either all recorded or nothing changed. Indexes backing
+    primary key or unique constraints stay (foreign keys and ON CONFLICT
+    need them), as do the internal foreign key triggers. Only user triggers
+    that fire on INSERT are disabled: the load fires no others, and the
+    updated_at (BEFORE UPDATE) triggers must keep working for concurrent
+    updates.
+
+    Args:
+        conn: Database connection
+        tables: Tables whose indexes and triggers are deferred
+
+    Returns:
+        int: Number of deferred indexes and triggers
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {DEFERRED_OBJECTS_TABLE} (
+                object_type VARCHAR(10) NOT NULL,
+                object_name TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                definition TEXT NOT NULL,
+                deferred_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (object_type, object_name)
+            );
+        """
+        )
+        cur.execute(
+            """
+            SELECT 'index', i.indexrelid::regclass::text, t.relname,
+                   pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            JOIN pg_class t ON t.oid = i.indrelid
+            WHERE t.relname = ANY(%(tables)s)
+              AND pg_table_is_visible(t.oid)
+              AND NOT i.indisprimary
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid
+              )
+            UNION ALL
+            SELECT 'trigger', tg.tgname, t.relname, pg_get_triggerdef(tg.oid)
+            FROM pg_trigger tg
+            JOIN pg_class t ON t.oid = tg.tgrelid
+            WHERE t.relname = ANY(%(tables)s)
+              AND pg_table_is_visible(t.oid)
+              AND NOT tg.tgisinternal
+              AND (tg.tgtype & %(insert_trigger)s) <> 0
+              AND tg.tgenabled <> 'D';
+        """,
+            {"tables": list(tables), "insert_trigger": TRIGGER_TYPE_INSERT},
+        )
+        objects = cur.fetchall()
+
+        if objects:
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {DEFERRED_OBJECTS_TABLE}
+                    (object_type, object_name, table_name, definition)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+            """,
+                objects,
+            )
+        for object_type, name, table, _ in objects:
+            if object_type == "index":
+                cur.execute(f"DROP INDEX {name};")
+            else:
+                cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER {name};")
+
+    conn.commit()
+    logger.info(
+        f"  Deferred {sum(o[0] == 'index' for o in objects)} indexes and "
+        f"{sum(o[0] == 'trigger' for o in objects)} triggers"
+    )
+    return len(objects)
+
+
+def restore_deferred_objects(conn):
+    """
+    Rebuild deferred indexes, re-enable deferred triggers and ANALYZE
+
+    Restores whatever DEFERRED_OBJECTS_TABLE lists: after a deferred load,
+    or at the start of the next run if a load was interrupted. Indexes are
+    rebuilt with CREATE INDEX CONCURRENTLY (autocommit, readers and writers
+    are not blocked); an invalid index left by an interrupted build is
+    dropped and built again. Each object is removed from the table once it
+    is restored, so a failed restore can simply be rerun.
+
+    Returns:
+        int: Number of restored indexes and triggers
+    """
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s);", (DEFERRED_OBJECTS_TABLE,))
+        if cur.fetchone()[0] is None:
+            conn.commit()
+            return 0
+        cur.execute(
+            f"""
+            SELECT object_type, object_name, table_name, definition
+            FROM {DEFERRED_OBJECTS_TABLE}
+            ORDER BY deferred_at, object_type, object_name;
+        """
+        )
+        objects = cur.fetchall()
+    conn.commit()
+
+    if not objects:
+        return 0
+
+    logger.info(f"Restoring {len(objects)} deferred indexes and triggers...")
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for object_type, name, table, definition in objects:
+                if object_type == "index":
+                    cur.execute(
+                        "SELECT indisvalid FROM pg_index "
+                        "WHERE indexrelid = to_regclass(%s);",
+                        (name,),
+                    )
+                    existing = cur.fetchone()
+                    if existing and not existing[0]:
+                        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+                    if not existing or not existing[0]:
+                        cur.execute(
+                            definition.replace(
+                                "CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1
+                            )
+                        )
+                else:
+                    cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER {name};")
+
+                cur.execute(
+                    f"DELETE FROM {DEFERRED_OBJECTS_TABLE} "
+                    "WHERE object_type = %s AND object_name = %s;",
+                    (object_type, name),
+                )
+                logger.info(f"  Restored {object_type} {name}")
+
+            for table in sorted({table for _, _, table, _ in objects}):
+                cur.execute(f"ANALYZE {table};")
+            logger.info("  Analyzed reloaded tables")
+    finally:
+        conn.autocommit = autocommit
+
+    return len(objects)
+
+
+# ============================================
+# DATA LOADING FUNCTIONS
+# ============================================
+
+
+def load_customers(conn, data_path, method="copy"):
+    """
+    Load customer data into PostgreSQL
+
+    customer_id is numbered from the row position in the file (see
+    table_ranges), as in every other load mode. Files generated with
+    --id-keys integer carry their own customer_id, which is loaded as-is.
+    The sequence is moved past the loaded ids.
+
+    Args:
+        conn: Database connection
+        data_path: Path to customers.csv or customers.parquet
+        method: "copy" or "execute_values" (see insert_rows)
+    """
+    logger.info(f"Loading customers from {data_path}...")
+
+    # Create cursor
+    cur = conn.cursor()
+
+    # Clear existing data (for clean reload)
+    cur.execute("TRUNCATE TABLE customers RESTART IDENTITY CASCADE;")
+    logger.info("  Truncated existing customers table and reset sequence")
+
+    for columns, rows in table_ranges("customers", data_path):
+        insert_rows(cur, "customers", columns, rows, method)
+
+    reset_sequences(cur, ["customers"])
     conn.commit()
 
     # Get count
@@ -146,53 +618,74 @@ def load_customers(conn, csv_path):
     return count
 
 
-def load_orders(conn, csv_path):
+def load_customer_history(conn, data_path, method="copy"):
     """
-    Load order data into PostgreSQL
+    Load historical customer segment versions into PostgreSQL
+
+    Only present when generate_data.py ran with --history-depth. Rows are
+    keyed by email (or customer_id with --id-keys integer) like orders.
 
     Args:
         conn: Database connection
-        csv_path: Path to orders.csv
+        data_path: Path to customer_history.csv or customer_history.parquet
+        method: "copy" or "execute_values" (see insert_rows)
     """
-    logger.info(f"Loading orders from {csv_path}...")
-
-    df = pd.read_csv(csv_path)
+    logger.info(f"Loading customer history from {data_path}...")
 
     cur = conn.cursor()
 
     # Clear existing data
-    cur.execute("TRUNCATE TABLE orders CASCADE;")
-    cur.execute("ALTER SEQUENCE orders_order_id_seq RESTART WITH 1;")
-    logger.info("  Truncated existing orders table and reset sequence")
+    cur.execute("TRUNCATE TABLE customer_history;")
+    logger.info("  Truncated existing customer_history table")
+
+    columns = TABLE_COLUMNS["customer_history"]
+
+    email_to_id = None
+    if email_customer_keys(data_path):
+        email_to_id = customer_id_lookup(cur)
+    for chunk in iter_data_file(data_path):
+        rows = resolve_customer_ids(chunk, email_to_id)
+        insert_rows(cur, "customer_history", columns, rows[columns], method)
+
+    conn.commit()
+
+    cur.execute("SELECT COUNT(*) FROM customer_history;")
+    count = cur.fetchone()[0]
+
+    logger.info(f"✅ Loaded {count:,} customer history rows")
+
+    cur.close()
+    return count
 
-    # Map customer email to customer_id
-    cur.execute("SELECT customer_id, email FROM customers;")
-    email_to_id = {email: customer_id for customer_id, email in cur.fetchall()}
-
-    # Prepare data
-    values = []
-    for _, row in df.iterrows():
-        customer_id = email_to_id.get(row["customer_id"])  # customer_id in CSV is email
-        if customer_id:
-            values.append(
-                (
-                    customer_id,
-                    row["order_date"],
-                    row["order_total"],
-                    row["payment_method"],
-                    row["shipping_address"],
-                    row["order_status"],
-                )
-            )
 
-    # Bulk insert
-    insert_query = """
-        INSERT INTO orders (customer_id, order_date, order_total,
-                          payment_method, shipping_address, order_status)
-        VALUES %s
+def load_orders(conn, data_path, method="copy"):
+    """
+    Load order data into PostgreSQL
+
+    order_id (SERIAL) is numbered from the row position in the file (see
+    table_ranges), which order_items and order_updates reference. Orders of
+    unknown customers are skipped without shifting later ids.
+
+    Args:
+        conn: Database connection
+        data_path: Path to orders.csv or orders.parquet
+        method: "copy" or "execute_values" (see insert_rows)
     """
+    logger.info(f"Loading orders from {data_path}...")
+
+    cur = conn.cursor()
+
+    # Clear existing data
+    cur.execute("TRUNCATE TABLE orders RESTART IDENTITY CASCADE;")
+    logger.info("  Truncated existing orders table and reset sequence")
+
+    email_to_id = None
+    if email_customer_keys(data_path):
+        email_to_id = customer_id_lookup(cur)
+    for columns, rows in table_ranges("orders", data_path, email_to_id):
+        insert_rows(cur, "orders", columns, rows, method)
 
-    execute_values(cur, insert_query, values)
+    reset_sequences(cur, ["orders"])
     conn.commit()
 
     # Get count
@@ -210,44 +703,30 @@ def load_orders(conn, csv_path):
     return count
 
 
-def load_order_items(conn, csv_path):
+def load_order_items(conn, data_path, method="copy"):
     """
     Load order items into PostgreSQL
 
+    order_item_id (SERIAL) is numbered from the row position in the file
+    (see table_ranges), the key incremental loads merge on.
+
     Args:
         conn: Database connection
-        csv_path: Path to order_items.csv
+        data_path: Path to order_items.csv or order_items.parquet
+        method: "copy" or "execute_values" (see insert_rows)
     """
-    logger.info(f"Loading order items from {csv_path}...")
-
-    df = pd.read_csv(csv_path)
+    logger.info(f"Loading order items from {data_path}...")
 
     cur = conn.cursor()
 
     # Clear existing data
-    cur.execute("TRUNCATE TABLE order_items;")
-    logger.info("  Truncated existing order_items table")
+    cur.execute("TRUNCATE TABLE order_items RESTART IDENTITY;")
+    logger.info("  Truncated existing order_items table and reset sequence")
 
-    # Prepare data - convert numpy types to Python native types
-    values = []
-    for _, row in df.iterrows():
-        values.append(
-            (
-                int(row["order_id"]),
-                int(row["product_id"]),
-                int(row["quantity"]),
-                float(row["unit_price"]),
-                float(row["discount_amount"]),
-            )
-        )
-
-    # Bulk insert
-    insert_query = """
-        INSERT INTO order_items (order_id, product_id, quantity, unit_price, discount_amount)
-        VALUES %s
-    """
+    for columns, rows in table_ranges("order_items", data_path):
+        insert_rows(cur, "order_items", columns, rows, method)
 
-    execute_values(cur, insert_query, values)
+    reset_sequences(cur, ["order_items"])
     conn.commit()
 
     # Get count
@@ -260,6 +739,1040 @@ def load_order_items(conn, csv_path):
     return count
 
 
+def load_order_updates(conn, data_path, method="copy"):
+    """
+    Apply late order status updates to the loaded orders
+
+    Only present when generate_data.py ran with --late-fraction. Updates
+    reference order_id in orders file order, which load_orders keeps. They
+    are bulk-inserted into a temporary staging table and applied with one
+    UPDATE ... FROM.
+
+    Args:
+        conn: Database connection
+        data_path: Path to order_updates.csv or order_updates.parquet
+        method: "copy" or "execute_values" (see insert_rows)
+    """
+    logger.info(f"Applying order updates from {data_path}...")
+
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TEMP TABLE order_updates_stage (
+            order_id INTEGER NOT NULL,
+            order_status VARCHAR(20) NOT NULL
+        ) ON COMMIT DROP;
+    """
+    )
+
+    columns = ["order_id", "order_status"]
+    for chunk in iter_data_file(data_path):
+        insert_rows(cur, "order_updates_stage", columns, chunk[columns], method)
+
+    cur.execute(
+        """
+        UPDATE orders o
+        SET order_status = u.order_status
+        FROM order_updates_stage u
+        WHERE o.order_id = u.order_id;
+    """
+    )
+    count = cur.rowcount
+    conn.commit()
+
+    logger.info(f"✅ Applied {count:,} order status updates")
+
+    cur.close()
+    return count
+
+
+def load_sequential(conn, data_files, method="copy"):
+    """
+    Load all tables one after another on one connection (FK order)
+
+    Args:
+        conn: Database connection
+        data_files: Dataset name -> data file (datasets present only)
+        method: "copy" or "execute_values" (see insert_rows)
+    """
+    load_customers(conn, data_files["customers"], method)
+    if "customer_history" in data_files:
+        load_customer_history(conn, data_files["customer_history"], method)
+    load_orders(conn, data_files["orders"], method)
+    load_order_items(conn, data_files["order_items"], method)
+    if "order_updates" in data_files:
+        load_order_updates(conn, data_files["order_updates"], method)
+
+
+# ============================================
+# PARALLEL LOADING
+# ============================================
+
+
+def load_waves(tables):
+    """
+    Group tables into waves that can load concurrently
+
+    Each wave holds the tables whose dependencies (TABLE_DEPENDENCIES) are
+    all in earlier waves, e.g. customers, then orders and customer_history,
+    then order_items and order_updates.
+
+    Returns:
+        list: Lists of table names, in load order
+    """
+    remaining = list(tables)
+    done = set()
+    waves = []
+    while remaining:
+        wave = [
+            table
+            for table in remaining
+            if all(
+                dep in done or dep not in tables for dep in TABLE_DEPENDENCIES[table]
+            )
+        ]
+        waves.append(wave)
+        done.update(wave)
+        remaining = [table for table in remaining if table not in done]
+    return waves
+
+
+def load_range(pool, table, columns, df, method):
+    """Insert one range of rows over a pooled connection and commit it"""
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            insert_rows(cur, table, columns, df, method)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+    return len(df)
+
+
+def load_pooled(pool, load_func, data_path, method):
+    """Run a whole-table load function over a pooled connection"""
+    conn = pool.getconn()
+    try:
+        return load_func(conn, data_path, method)
+    finally:
+        pool.putconn(conn)
+
+
+def table_layout(table, chunk, first_row, email_to_id=None, number_rows=True):
+    """
+    Put a chunk of file rows into the table's layout
+
+    With `number_rows`, the SERIAL key (SERIAL_KEYS) is numbered from the row
+    position in the file (`first_row` is the chunk's first row) unless the
+    file carries it. Email customer keys are resolved with `email_to_id`
+    (see customer_id_lookup).
+
+    Returns:
+        tuple: (columns, rows)
+    """
+    key = SERIAL_KEYS.get(table)
+    if key and number_rows and key not in chunk.columns:
+        chunk.insert(0, key, range(first_row, first_row + len(chunk)))
+
+    if email_to_id is not None:
+        chunk = resolve_customer_ids(chunk, email_to_id)
+
+    columns = ([key] if key in chunk.columns else []) + [
+        column for column in TABLE_COLUMNS[table] if column != key
+    ]
+    return columns, chunk[columns]
+
+
+def table_ranges(table, data_path, email_to_id=None, number_rows=True):
+    """
+    Split a data file into ranges of rows in the table's layout
+
+    Yields:
+        tuple: (columns, rows) of the next range (see table_layout)
+    """
+    first_row = 1
+    for chunk in iter_data_file(data_path):
+        yield table_layout(table, chunk, first_row, email_to_id, number_rows)
+        first_row += len(chunk)
+
+
+def reset_sequences(cur, tables):
+    """Move the SERIAL sequences of `tables` past the loaded ids"""
+    for table in tables:
+        key = SERIAL_KEYS[table]
+        cur.execute(
+            f"""
+            SELECT setval(
+                pg_get_serial_sequence('{table}', '{key}'),
+                COALESCE(MAX({key}), 1),
+                MAX({key}) IS NOT NULL
+            )
+            FROM {table};
+        """
+        )
+
+
+def load_parallel(data_files, workers, method="copy"):
+    """
+    Load all tables over a connection pool, `workers` ranges at a time
+
+    Tables load in dependency waves (see load_waves): a table starts only
+    after the tables it references are committed. Within a wave every file
+    is read in LOAD_CHUNK_SIZE ranges and each range is inserted and
+    committed over its own pooled connection, with at most 2 x `workers`
+    ranges in memory. SERIAL ids are numbered from file positions, as in a
+    sequential load (see table_ranges), so the result matches one. Ranges
+    commit independently: a failed run leaves a partial load, and the next
+    run starts over with TRUNCATE.
+
+    Args:
+        data_files: Dataset name -> data file (datasets present only)
+        workers: Concurrent connections
+        method: "copy" or "execute_values" (see insert_rows)
+
+    Returns:
+        dict: Rows loaded (or updated) per table
+    """
+    pool = ThreadedConnectionPool(1, workers, **DB_CONFIG)
+    logger.info(f"✅ Opened a pool of {workers} PostgreSQL connections")
+    counts = {table: 0 for table in data_files}
+
+    try:
+        conn = pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute(
+                "TRUNCATE TABLE order_items, orders, customer_history, customers "
+                "RESTART IDENTITY CASCADE;"
+            )
+        conn.commit()
+        pool.putconn(conn)
+        logger.info("  Truncated customers, customer_history, orders and order_items")
+
+        with ThreadPoolExecutor(workers) as executor:
+            for wave in load_waves(list(data_files)):
+                logger.info(f"Loading {', '.join(wave)}...")
+                in_flight = []
+
+                # Look customers up once, before any range holds a connection
+                email_to_id = None
+                if any(
+                    table in ("customer_history", "orders")
+                    and email_customer_keys(data_files[table])
+                    for table in wave
+                ):
+                    conn = pool.getconn()
+                    with conn.cursor() as cur:
+                        email_to_id = customer_id_lookup(cur)
+                    pool.putconn(conn)
+
+                for table in wave:
+                    if table == "order_updates":
+                        future = executor.submit(
+                            load_pooled,
+                            pool,
+                            load_order_updates,
+                            data_files[table],
+                            method,
+                        )
+                        in_flight.append((table, future))
+                        continue
+
+                    lookup = (
+                        email_to_id if table in ("customer_history", "orders") else None
+                    )
+                    ranges = table_ranges(table, data_files[table], lookup)
+                    for columns, rows in ranges:
+                        if len(in_flight) >= 2 * workers:
+                            done_table, future = in_flight.pop(0)
+                            counts[done_table] += future.result()
+                        future = executor.submit(
+                            load_range, pool, table, columns, rows, method
+                        )
+                        in_flight.append((table, future))
+
+                for table, future in in_flight:
+                    counts[table] += future.result()
+
+                conn = pool.getconn()
+                with conn.cursor() as cur:
+                    reset_sequences(
+                        cur, [table for table in wave if table in SERIAL_KEYS]
+                    )
+                conn.commit()
+                pool.putconn(conn)
+                for table in wave:
+                    logger.info(f"✅ Loaded {counts[table]:,} rows into {table}")
+    finally:
+        pool.closeall()
+
+    return counts
+
+
+# ============================================
+# INCREMENTAL (UPSERT) LOADING
+# ============================================
+
+
+def merge_staged_rows(cur, table, columns):
+    """
+    Merge `<table>_stage` into `table` on its MERGE_KEYS
+
+    New keys are inserted. Existing rows are updated only where a column
+    actually differs, so unchanged rows are not rewritten and the
+    updated_at triggers fire only for real changes.
+
+    Returns:
+        tuple: (inserted rows, updated rows)
+    """
+    keys = MERGE_KEYS[table]
+    update_columns = [
+        column
+        for column in columns
+        if column not in keys and column != SERIAL_KEYS.get(table)
+    ]
+    column_list = ", ".join(columns)
+
+    cur.execute(
+        f"""
+        WITH merged AS (
+            INSERT INTO {table} AS t ({column_list})
+            SELECT {column_list} FROM {table}_stage
+            ON CONFLICT ({', '.join(keys)}) DO UPDATE
+            SET {', '.join(f"{column} = EXCLUDED.{column}" for column in update_columns)}
+            WHERE ({', '.join(f"t.{column}" for column in update_columns)})
+                IS DISTINCT FROM
+                ({', '.join(f"EXCLUDED.{column}" for column in update_columns)})
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE inserted),
+            COUNT(*) FILTER (WHERE NOT inserted)
+        FROM merged;
+    """
+    )
+    return cur.fetchone()
+
+
+def check_position_keys(cur, table):
+    """
+    Refuse to merge rows whose position id now names a different row
+
+    Orders and order items are merged on their position in the file (see
+    MERGE_KEYS). A regenerated or reordered file would silently overwrite
+    other rows, so staged rows must match the loaded row with the same id on
+    POSITION_IDENTITY_COLUMNS.
+
+    Raises:
+        ValueError: If any staged row disagrees with the loaded one
+    """
+    key = MERGE_KEYS[table][0]
+    columns = POSITION_IDENTITY_COLUMNS[table]
+    cur.execute(
+        f"""
+        SELECT COUNT(*), MIN({key})
+        FROM {table}_stage s
+        JOIN {table} t USING ({key})
+        WHERE ({', '.join(f"s.{column}" for column in columns)})
+            IS DISTINCT FROM
+            ({', '.join(f"t.{column}" for column in columns)});
+    """
+    )
+    mismatched, first_key = cur.fetchone()
+    if mismatched:
+        raise ValueError(
+            f"{mismatched:,} {table} rows (first {key} {first_key}) differ in "
+            f"{', '.join(columns)} from the loaded rows with the same {key}; "
+            "the file was regenerated or reordered, use --mode full or swap"
+        )
+
+
+def stage_order_updates(cur, data_path, method="copy", table="orders_stage"):
+    """Apply late order status updates to the staged (or shadow) orders"""
+    cur.execute(
+        """
+        CREATE TEMP TABLE order_updates_stage (
+            order_id INTEGER NOT NULL,
+            order_status VARCHAR(20) NOT NULL
+        ) ON COMMIT DROP;
+    """
+    )
+    for chunk in iter_data_file(data_path):
+        insert_rows(
+            cur,
+            "order_updates_stage",
+            ["order_id", "order_status"],
+            chunk[["order_id", "order_status"]],
+            method,
+        )
+
+    cur.execute(
+        f"""
+        UPDATE {table} s
+        SET order_status = u.order_status
+        FROM order_updates_stage u
+        WHERE s.order_id = u.order_id;
+    """
+    )
+
+
+def load_incremental(conn, data_files, method="copy"):
+    """
+    Merge the generated files into the source tables instead of reloading
+
+    Each file is bulk-loaded into a temporary staging table and merged into
+    its table with INSERT ... ON CONFLICT (see merge_staged_rows). Order
+    updates are applied to the staged orders first, so an order's final
+    status is merged once. Nothing is truncated and rows missing from the
+    files are kept; everything runs in one transaction, so readers see the
+    previous contents until the merge commits. Orders and items whose
+    position id was loaded for a different row are refused (see
+    check_position_keys) and nothing is merged.
+
+    Args:
+        conn: Database connection
+        data_files: Dataset name -> data file (datasets present only)
+        method: "copy" or "execute_values" (see insert_rows)
+
+    Returns:
+        dict: Table -> (inserted rows, updated rows)
+    """
+    cur = conn.cursor()
+    counts = {}
+
+    for table in ["customers", "customer_history", "orders", "order_items"]:
+        if table not in data_files:
+            continue
+        logger.info(f"Merging {table} from {data_files[table]}...")
+
+        email_to_id = None
+        if table in ("customer_history", "orders") and email_customer_keys(
+            data_files[table]
+        ):
+            email_to_id = customer_id_lookup(cur)
+
+        staged = False
+        ranges = table_ranges(
+            table, data_files[table], email_to_id, number_rows=table != "customers"
+        )
+        for columns, rows in ranges:
+            if not staged:
+                cur.execute(
+                    f"""
+                    CREATE TEMP TABLE {table}_stage ON COMMIT DROP AS
+                    SELECT {', '.join(columns)} FROM {table} WITH NO DATA;
+                """
+                )
+                staged = True
+            insert_rows(cur, f"{table}_stage", columns, rows, method)
+
+        if not staged:
+            continue
+        if table == "orders" and "order_updates" in data_files:
+            stage_order_updates(cur, data_files["order_updates"], method)
+
+        if table in POSITION_IDENTITY_COLUMNS:
+            try:
+                check_position_keys(cur, table)
+            except ValueError:
+                conn.rollback()
+                raise
+        counts[table] = merge_staged_rows(cur, table, columns)
+        logger.info(
+            f"✅ {table}: {counts[table][0]:,} inserted, "
+            f"{counts[table][1]:,} updated"
+        )
+
+    reset_sequences(cur, [table for table in counts if table in SERIAL_KEYS])
+    conn.commit()
+    cur.close()
+
+    return counts
+
+
+# ============================================
+# SHADOW TABLE SWAP
+# ============================================
+
+
+def shadow_table(table):
+    """Name of the shadow copy of `table`"""
+    return f"{table}{SHADOW_SUFFIX}"
+
+
+def shadow_definition(definition, table):
+    """Point an index or trigger definition of `table` at its shadow table"""
+    return re.sub(
+        rf" ON (\w+\.)?{table} ", f" ON {shadow_table(table)} ", definition, count=1
+    )
+
+
+def drop_shadow_tables(conn, tables=SWAP_TABLES):
+    """Drop shadow tables left by a failed or interrupted swap reload"""
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute(
+            "DROP TABLE IF EXISTS "
+            f"{', '.join(shadow_table(table) for table in tables)} CASCADE;"
+        )
+    conn.commit()
+
+
+def create_shadow_tables(conn, tables=SWAP_TABLES):
+    """
+    Create empty UNLOGGED shadow copies of `tables`
+
+    Columns, defaults (including the SERIAL sequences), generated columns
+    and CHECK constraints are copied with LIKE. Indexes, foreign keys and
+    triggers are added after the load (see index_shadow_tables).
+    """
+    drop_shadow_tables(conn, tables)
+    with conn.cursor() as cur:
+        for table in tables:
+            cur.execute(
+                f"""
+                CREATE UNLOGGED TABLE {shadow_table(table)}
+                (LIKE {table} INCLUDING ALL EXCLUDING INDEXES);
+            """
+            )
+    conn.commit()
+    logger.info(f"  Created shadow tables for {', '.join(tables)}")
+
+
+def load_shadow_tables(conn, data_files, method="copy", tables=SWAP_TABLES):
+    """
+    Bulk load the generated files into the shadow tables
+
+    SERIAL ids are numbered from file positions (see table_ranges), as in a
+    parallel load, and customer emails are resolved against the shadow
+    customers. Order updates are applied to the shadow orders. Tables
+    without a data file stay empty, as after a full load.
+
+    Returns:
+        dict: Rows loaded per table
+    """
+    counts = {}
+    with conn.cursor() as cur:
+        for table in tables:
+            if table not in data_files:
+                continue
+            logger.info(f"Loading {shadow_table(table)} from {data_files[table]}...")
+
+            email_to_id = None
+            if table in ("customer_history", "orders") and email_customer_keys(
+                data_files[table]
+            ):
+                email_to_id = customer_id_lookup(cur, shadow_table("customers"))
+
+            counts[table] = 0
+            for columns, rows in table_ranges(table, data_files[table], email_to_id):
+                insert_rows(cur, shadow_table(table), columns, rows, method)
+                counts[table] += len(rows)
+
+            if table == "orders" and "order_updates" in data_files:
+                stage_order_updates(
+                    cur, data_files["order_updates"], method, shadow_table(table)
+                )
+            conn.commit()
+            logger.info(f"✅ Loaded {counts[table]:,} rows into {shadow_table(table)}")
+
+    return counts
+
+
+def index_shadow_tables(conn, tables=SWAP_TABLES):
+    """
+    Build the live tables' indexes, keys and triggers on the shadow tables
+
+    Indexes are built once over the loaded rows, under temporary
+    `<name>_shadow` names (index names are unique per schema). The shadow
+    tables are then switched to LOGGED and ANALYZEd, and foreign keys are
+    added between them (a logged table cannot reference an unlogged one).
+
+    Returns:
+        list: (shadow index name, live index name) pairs to rename on swap
+    """
+    renames = []
+    with conn.cursor() as cur:
+        for table in tables:
+            cur.execute(
+                """
+                SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid),
+                       pg_get_constraintdef(c.oid)
+                FROM pg_index i
+                LEFT JOIN pg_constraint c
+                  ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+                WHERE i.indrelid = %s::regclass;
+            """,
+                (table,),
+            )
+            for name, definition, constraint in cur.fetchall():
+                shadow_name = f"{name}{SHADOW_SUFFIX}"
+                if constraint:
+                    cur.execute(
+                        f"ALTER TABLE {shadow_table(table)} "
+                        f"ADD CONSTRAINT {shadow_name} {constraint};"
+                    )
+                else:
+                    cur.execute(
+                        shadow_definition(definition, table).replace(
+                            f" INDEX {name} ON ", f" INDEX {shadow_name} ON ", 1
+                        )
+                    )
+                renames.append((shadow_name, name))
+            conn.commit()
+            logger.info(f"  Indexed {shadow_table(table)}")
+
+        for table in tables:
+            cur.execute(f"ALTER TABLE {shadow_table(table)} SET LOGGED;")
+            cur.execute(f"ANALYZE {shadow_table(table)};")
+            conn.commit()
+
+        for table in tables:
+            cur.execute(
+                """
+                SELECT conname, pg_get_constraintdef(oid)
+                FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype = 'f'
+                UNION ALL
+                SELECT NULL, pg_get_triggerdef(oid)
+                FROM pg_trigger
+                WHERE tgrelid = %s::regclass AND NOT tgisinternal;
+            """,
+                (table, table),
+            )
+            for name, definition in cur.fetchall():
+                if name is None:
+                    cur.execute(shadow_definition(definition, table))
+                    continue
+                definition = re.sub(
+                    r"REFERENCES (\w+\.)?(\w+)\(",
+                    lambda m: (
+                        f"REFERENCES {shadow_table(m.group(2))}("
+                        if m.group(2) in tables
+                        else m.group(0)
+                    ),
+                    definition,
+                )
+                cur.execute(
+                    f"ALTER TABLE {shadow_table(table)} "
+                    f"ADD CONSTRAINT {name} {definition};"
+                )
+        conn.commit()
+    logger.info("  Switched shadow tables to LOGGED, added foreign keys and triggers")
+
+    return renames
+
+
+def table_grants(cur, table, schema=None):
+    """Privileges held on a table or view, as (grantee, privilege list) pairs"""
+    cur.execute(
+        """
+        SELECT grantee, string_agg(privilege_type, ', ')
+        FROM information_schema.role_table_grants
+        WHERE table_schema = COALESCE(%s, current_schema()) AND table_name = %s
+        GROUP BY grantee;
+    """,
+        (schema, table),
+    )
+    return cur.fetchall()
+
+
+def apply_grants(cur, grants, table):
+    """Grant the privileges returned by table_grants on another table or view"""
+    for grantee, privileges in grants:
+        role = grantee if grantee == "PUBLIC" else f'"{grantee}"'
+        cur.execute(f"GRANT {privileges} ON {table} TO {role};")
+
+
+def swap_shadow_tables(conn, renames, tables=SWAP_TABLES):
+    """
+    Replace the live tables with their shadow copies in one transaction
+
+    Only catalog changes run while the live tables are locked: the SERIAL
+    sequences move to the shadow columns, views over the tables are dropped,
+    the live tables are dropped, the shadow tables and indexes take their
+    names, and the views and grants are recreated. Readers block only for
+    that transaction. Any other object depending on the live tables makes
+    the DROP fail, and the transaction rolls back with the live tables
+    untouched.
+
+    The ACCESS EXCLUSIVE lock waits at most SWAP_LOCK_TIMEOUT, so a long
+    running reader cannot make the queued lock block every other reader;
+    the swap is retried SWAP_ATTEMPTS times.
+    """
+    for attempt in range(1, SWAP_ATTEMPTS + 1):
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}';")
+                cur.execute(f"LOCK TABLE {', '.join(tables)} IN ACCESS EXCLUSIVE MODE;")
+
+                cur.execute(
+                    """
+                    SELECT DISTINCT v.oid::regclass::text, pg_get_viewdef(v.oid),
+                           n.nspname, v.relname
+                    FROM pg_depend d
+                    JOIN pg_rewrite r ON r.oid = d.objid
+                    JOIN pg_class v ON v.oid = r.ev_class
+                    JOIN pg_namespace n ON n.oid = v.relnamespace
+                    WHERE d.classid = 'pg_rewrite'::regclass
+                      AND d.refobjid = ANY(%s::regclass[])
+                      AND v.relkind = 'v';
+                """,
+                    (list(tables),),
+                )
+                views = cur.fetchall()
+                grants = {
+                    view: table_grants(cur, name, schema)
+                    for view, _, schema, name in views
+                }
+
+                for table in tables:
+                    apply_grants(cur, table_grants(cur, table), shadow_table(table))
+                    if table in SERIAL_KEYS:
+                        key = SERIAL_KEYS[table]
+                        cur.execute(
+                            "SELECT pg_get_serial_sequence(%s, %s);", (table, key)
+                        )
+                        sequence = cur.fetchone()[0]
+                        cur.execute(
+                            f"ALTER SEQUENCE {sequence} "
+                            f"OWNED BY {shadow_table(table)}.{key};"
+                        )
+
+                if views:
+                    cur.execute(f"DROP VIEW {', '.join(view[0] for view in views)};")
+                cur.execute(f"DROP TABLE {', '.join(tables)};")
+                for table in tables:
+                    cur.execute(f"ALTER TABLE {shadow_table(table)} RENAME TO {table};")
+                for shadow_name, name in renames:
+                    cur.execute(f"ALTER INDEX {shadow_name} RENAME TO {name};")
+
+                for view, definition, _, _ in views:
+                    cur.execute(f"CREATE VIEW {view} AS {definition}")
+                    apply_grants(cur, grants[view], view)
+
+                reset_sequences(
+                    cur, [table for table in tables if table in SERIAL_KEYS]
+                )
+            conn.commit()
+            logger.info(f"✅ Swapped in {', '.join(tables)}")
+            return
+
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            logger.warning(
+                f"  Live tables busy, swap attempt {attempt}/{SWAP_ATTEMPTS} "
+                f"timed out after {SWAP_LOCK_TIMEOUT}"
+            )
+            time.sleep(attempt)
+
+    raise RuntimeError(f"Could not lock the live tables in {SWAP_ATTEMPTS} attempts")
+
+
+def load_swap(conn, data_files, method="copy"):
+    """
+    Reload all tables into shadow copies and swap them in atomically
+
+    Unlike a full load, the live tables are never truncated: readers such
+    as ingest_postgres_orders and Metabase see the previous contents until
+    the swap commits, then the new ones. The shadow tables are UNLOGGED
+    while they are bulk loaded (no WAL) and indexed once at the end, then
+    switched to LOGGED before the swap (see swap_shadow_tables). A failed
+    load drops the shadow tables and leaves the live tables as they were.
+
+    Args:
+        conn: Database connection
+        data_files: Dataset name -> data file (datasets present only)
+        method: "copy" or "execute_values" (see insert_rows)
+
+    Returns:
+        dict: Rows loaded per table
+    """
+    try:
+        create_shadow_tables(conn)
+        counts = load_shadow_tables(conn, data_files, method)
+        renames = index_shadow_tables(conn)
+        swap_shadow_tables(conn, renames)
+    except Exception:
+        drop_shadow_tables(conn)
+        raise
+
+    return counts
+
+
+# ============================================
+# RESUMABLE (CHUNKED) LOADING
+# ============================================
+
+
+def file_signature(data_path):
+    """(path, size, mtime) of a data file, to tell whether it changed"""
+    stat = Path(data_path).stat()
+    return str(data_path), stat.st_size, stat.st_mtime
+
+
+def prepare_chunked_load(conn, data_files):
+    """
+    Resume an interrupted chunked load, or start a new one
+
+    A load is resumed when LOAD_PROGRESS_TABLE lists an unfinished table and
+    every data file is the one it was loading (same path, size and mtime).
+    Otherwise the tables are truncated and the progress table is reset in
+    one transaction.
+
+    Args:
+        conn: Database connection
+        data_files: Dataset name -> data file (datasets present only)
+
+    Returns:
+        dict: Dataset -> checkpoint (chunk_number, row_offset, byte_offset,
+            rows_loaded, completed)
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {LOAD_PROGRESS_TABLE} (
+                table_name TEXT PRIMARY KEY,
+                data_file TEXT NOT NULL,
+                file_size BIGINT NOT NULL,
+                file_mtime DOUBLE PRECISION NOT NULL,
+                chunk_number INTEGER NOT NULL DEFAULT 0,
+                row_offset BIGINT NOT NULL DEFAULT 0,
+                byte_offset BIGINT NOT NULL DEFAULT 0,
+                rows_loaded BIGINT NOT NULL DEFAULT 0,
+                completed BOOLEAN NOT NULL DEFAULT FALSE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """
+        )
+        cur.execute(
+            f"""
+            SELECT table_name, data_file, file_size, file_mtime, chunk_number,
+                   row_offset, byte_offset, rows_loaded, completed
+            FROM {LOAD_PROGRESS_TABLE};
+        """
+        )
+        rows = {row[0]: row for row in cur.fetchall()}
+
+        interrupted = any(not row[8] for row in rows.values())
+        unchanged = set(rows) == set(data_files) and all(
+            tuple(rows[table][1:4]) == file_signature(data_files[table])
+            for table in data_files
+        )
+
+        if interrupted and unchanged:
+            logger.info("  Resuming the interrupted chunked load")
+        else:
+            if interrupted:
+                logger.warning(
+                    "  Data files changed since the interrupted load, starting over"
+                )
+            cur.execute(
+                "TRUNCATE TABLE order_items, orders, customer_history, customers "
+                "RESTART IDENTITY CASCADE;"
+            )
+            cur.execute(f"DELETE FROM {LOAD_PROGRESS_TABLE};")
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {LOAD_PROGRESS_TABLE}
+                    (table_name, data_file, file_size, file_mtime)
+                VALUES %s
+            """,
+                [(table, *file_signature(path)) for table, path in data_files.items()],
+            )
+            rows = {
+                table: (table, None, None, None, 0, 0, 0, 0, False)
+                for table in data_files
+            }
+            logger.info(
+                "  Truncated customers, customer_history, orders and order_items"
+            )
+    conn.commit()
+
+    return {
+        table: dict(
+            zip(
+                [
+                    "chunk_number",
+                    "row_offset",
+                    "byte_offset",
+                    "rows_loaded",
+                    "completed",
+                ],
+                row[4:],
+            )
+        )
+        for table, row in rows.items()
+    }
+
+
+def load_table_chunks(conn, table, data_path, checkpoint, method, chunk_size, log):
+    """
+    Load a data file into its table one committed chunk at a time
+
+    Each chunk is inserted and its checkpoint (chunk number, row and byte
+    offset reached) updated in the same transaction, so after a failure the
+    table holds exactly the checkpointed rows. SERIAL ids are numbered from
+    file positions (see table_layout), so resumed rows get the same ids.
+    Every chunk appends rows/sec, bytes/sec and commit latency to `log`.
+
+    Args:
+        conn: Database connection
+        table: Target table
+        data_path: Data file
+        checkpoint: Where to start (see prepare_chunked_load)
+        method: "copy" or "execute_values" (see insert_rows)
+        chunk_size: Rows per chunk
+        log: Open metrics log (JSON Lines)
+
+    Returns:
+        int: Rows in the table from this file
+    """
+    if checkpoint["chunk_number"]:
+        logger.info(
+            f"Resuming {table} after chunk {checkpoint['chunk_number']} "
+            f"(row {checkpoint['row_offset']:,}, byte {checkpoint['byte_offset']:,})"
+        )
+    else:
+        logger.info(f"Loading {table} from {data_path} in {chunk_size:,}-row chunks...")
+
+    with conn.cursor() as cur:
+        email_to_id = None
+        if table in ("customer_history", "orders") and email_customer_keys(data_path):
+            email_to_id = customer_id_lookup(cur)
+
+        chunks = iter_data_file_from(
+            data_path, checkpoint["row_offset"], checkpoint["byte_offset"], chunk_size
+        )
+        started = time.perf_counter()
+        for chunk, row_offset, byte_offset in chunks:
+            columns, rows = table_layout(
+                table, chunk, checkpoint["row_offset"] + 1, email_to_id
+            )
+            insert_rows(cur, table, columns, rows, method)
+            cur.execute(
+                f"""
+                UPDATE {LOAD_PROGRESS_TABLE}
+                SET chunk_number = chunk_number + 1, row_offset = %s,
+                    byte_offset = %s, rows_loaded = rows_loaded + %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE table_name = %s;
+            """,
+                (row_offset, byte_offset, len(rows), table),
+            )
+
+            commit_started = time.perf_counter()
+            conn.commit()
+            finished = time.perf_counter()
+
+            seconds = finished - started
+            n_bytes = byte_offset - checkpoint["byte_offset"]
+            checkpoint["chunk_number"] += 1
+            checkpoint["row_offset"] = row_offset
+            checkpoint["byte_offset"] = byte_offset
+            checkpoint["rows_loaded"] += len(rows)
+            metrics = {
+                "logged_at": datetime.now().isoformat(timespec="seconds"),
+                "table": table,
+                "data_file": str(data_path),
+                "chunk": checkpoint["chunk_number"],
+                "rows": len(rows),
+                "bytes": n_bytes,
+                "seconds": round(seconds, 4),
+                "rows_per_sec": round(len(rows) / seconds, 1) if seconds else None,
+                "bytes_per_sec": round(n_bytes / seconds, 1) if seconds else None,
+                "commit_latency_ms": round((finished - commit_started) * 1000, 2),
+                "row_offset": row_offset,
+                "byte_offset": byte_offset,
+            }
+            log.write(json.dumps(metrics) + "\n")
+            log.flush()
+            logger.info(
+                f"  {table} chunk {metrics['chunk']}: {len(rows):,} rows, "
+                f"{metrics['rows_per_sec'] or 0:,.0f} rows/sec, "
+                f"commit {metrics['commit_latency_ms']:.0f} ms"
+            )
+            started = finished
+
+        cur.execute(
+            f"UPDATE {LOAD_PROGRESS_TABLE} SET completed = TRUE, "
+            "updated_at = CURRENT_TIMESTAMP WHERE table_name = %s;",
+            (table,),
+        )
+    conn.commit()
+
+    logger.info(f"✅ Loaded {checkpoint['rows_loaded']:,} rows into {table}")
+    return checkpoint["rows_loaded"]
+
+
+def load_chunked(
+    conn,
+    data_files,
+    method="copy",
+    chunk_size=LOAD_CHUNK_SIZE,
+    metrics_log=LOAD_METRICS_LOG,
+):
+    """
+    Reload all tables in committed, checkpointed chunks (resumable)
+
+    Tables load in foreign-key order. A rerun after a failure skips the
+    completed tables and continues the interrupted one after its last
+    committed chunk (see prepare_chunked_load). Order updates are applied
+    in one transaction once the orders are complete; applying them again
+    after an interruption is harmless.
+
+    Args:
+        conn: Database connection
+        data_files: Dataset name -> data file (datasets present only)
+        method: "copy" or "execute_values" (see insert_rows)
+        chunk_size: Rows per committed chunk
+        metrics_log: JSON Lines file the per-chunk metrics are appended to
+
+    Returns:
+        dict: Rows loaded (or updated) per table
+    """
+    progress = prepare_chunked_load(conn, data_files)
+    counts = {}
+
+    metrics_log = Path(metrics_log)
+    metrics_log.parent.mkdir(parents=True, exist_ok=True)
+    with open(metrics_log, "a") as log:
+        for table in TABLE_DEPENDENCIES:
+            if table not in data_files:
+                continue
+            checkpoint = progress[table]
+            if checkpoint["completed"]:
+                logger.info(f"  {table} already loaded, skipping")
+                counts[table] = checkpoint["rows_loaded"]
+                continue
+
+            if table == "order_updates":
+                counts[table] = load_order_updates(conn, data_files[table], method)
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"UPDATE {LOAD_PROGRESS_TABLE} SET completed = TRUE, "
+                        "rows_loaded = %s, updated_at = CURRENT_TIMESTAMP "
+                        "WHERE table_name = %s;",
+                        (counts[table], table),
+                    )
+                conn.commit()
+                continue
+
+            counts[table] = load_table_chunks(
+                conn, table, data_files[table], checkpoint, method, chunk_size, log
+            )
+
+    with conn.cursor() as cur:
+        reset_sequences(cur, [table for table in counts if table in SERIAL_KEYS])
+    conn.commit()
+    logger.info(f"  Metrics written to {metrics_log}")
+
+    return counts
+
+
 # ============================================
 # DATA VALIDATION
 # ============================================
@@ -352,31 +1865,131 @@ def validate_data(conn):
 # ============================================
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Load generated data from data/generated/ into PostgreSQL"
+    )
+    parser.add_argument(
+        "--method",
+        choices=LOAD_METHODS,
+        default="copy",
+        help=(
+            "Bulk insert with COPY FROM STDIN, or fall back to multi-row "
+            "INSERTs via execute_values (default: copy)"
+        ),
+    )
+    parser.add_argument(
+        "--mode",
+        choices=LOAD_MODES,
+        default="full",
+        help=(
+            "Truncate and reload every table, merge the files into the "
+            "existing rows with ON CONFLICT upserts, reload into shadow "
+            "tables and swap them in with one rename, or reload in resumable "
+            "checkpointed chunks (default: full)"
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=LOAD_CHUNK_SIZE,
+        help=(
+            "Rows per committed chunk with --mode chunked "
+            f"(default: {LOAD_CHUNK_SIZE})"
+        ),
+    )
+    parser.add_argument(
+        "--metrics-log",
+        type=Path,
+        default=LOAD_METRICS_LOG,
+        help=(
+            "JSON Lines file per-chunk metrics are appended to with --mode "
+            f"chunked (default: {LOAD_METRICS_LOG})"
+        ),
+    )
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help=(
+            "Drop secondary indexes and disable triggers during a full load, "
+            "then rebuild the indexes CONCURRENTLY and ANALYZE"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Load ranges of each table over N pooled connections concurrently, "
+            "in foreign-key order (default: 1, sequential)"
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be 1 or more")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be 1 or more")
+    if args.mode != "full" and args.workers > 1:
+        parser.error("--workers only applies to --mode full")
+    if args.mode != "full" and args.defer_indexes:
+        parser.error("--defer-indexes only applies to --mode full")
+    return args
+
+
+def main(argv=None):
     """Main execution function"""
+    args = parse_args(argv)
+
     logger.info("=" * 50)
     logger.info("Starting Data Loading Process")
     logger.info("=" * 50)
 
     # Check if data files exist
-    customers_csv = DATA_DIR / "customers.csv"
-    orders_csv = DATA_DIR / "orders.csv"
-    order_items_csv = DATA_DIR / "order_items.csv"
-
-    for csv_file in [customers_csv, orders_csv, order_items_csv]:
-        if not csv_file.exists():
-            logger.error(f"❌ Required file not found: {csv_file}")
+    data_files = {}
+    for dataset in ["customers", "orders", "order_items"]:
+        data_files[dataset] = find_data_file(dataset)
+        if data_files[dataset] is None:
+            logger.error(f"❌ Required file not found: {DATA_DIR / dataset}.csv")
             logger.error("   Please run generate_data.py first!")
             return False
 
+    # Optional datasets (generate_data.py --history-depth / --late-fraction)
+    for dataset in ["customer_history", "order_updates"]:
+        data_file = find_data_file(dataset)
+        if data_file is not None:
+            data_files[dataset] = data_file
+
     try:
         # Connect to database
         conn = get_db_connection()
 
-        # Load data in order (respecting foreign keys)
-        load_customers(conn, customers_csv)
-        load_orders(conn, orders_csv)
-        load_order_items(conn, order_items_csv)
+        # Indexes/triggers still deferred by an interrupted earlier load
+        restore_deferred_objects(conn)
+
+        if args.mode == "incremental":
+            # Staging tables merged with ON CONFLICT, in one transaction
+            load_incremental(conn, data_files, args.method)
+        elif args.mode == "swap":
+            # Shadow tables loaded and indexed, then renamed over the live ones
+            load_swap(conn, data_files, args.method)
+        elif args.mode == "chunked":
+            # Committed chunks checkpointed in load_progress, resumable
+            load_chunked(
+                conn, data_files, args.method, args.chunk_size, args.metrics_log
+            )
+        else:
+            if args.defer_indexes:
+                defer_indexes_and_triggers(conn)
+            try:
+                if args.workers > 1:
+                    # Ranges over pooled connections, in foreign-key waves
+                    load_parallel(data_files, args.workers, args.method)
+                else:
+                    load_sequential(conn, data_files, args.method)
+            finally:
+                if args.defer_indexes:
+                    restore_deferred_objects(conn)
 
         # Validate
         validate_data(conn)
@@ -1,14 +1,28 @@
 """
 Load Clickstream Events from S3 CSV to PostgreSQL
+
+Only S3 files that are new or changed since they were last loaded are
+processed (see lake_load_manifest). --full-refresh drops the table and
+reloads every file.
+
+user_id holds customer emails, or integer customer ids for events generated
+with --id-keys integer. Switching between the two needs --full-refresh.
+
+Usage:
+    python scripts/load_events_to_postgres.py
+    python scripts/load_events_to_postgres.py --full-refresh
+    python scripts/load_events_to_postgres.py --id-keys integer --full-refresh
 """
 
-import csv
+import argparse
+import itertools
 import os
-from io import StringIO
 
-import boto3
+import lake_reader
 import psycopg2
 from dotenv import load_dotenv
+from psycopg2.extensions import quote_ident
+from psycopg2.extras import execute_values
 
 # Load environment variables
 load_dotenv()
@@ -26,20 +40,66 @@ PG_CONFIG = {
     "password": "ecommerce_pass",
 }
 
+# Columns loaded into clickstream_events
+EVENT_COLUMNS = [
+    "event_id",
+    "session_id",
+    "user_id",
+    "event_timestamp",
+    "event_type",
+    "product_id",
+    "page_url",
+    "device_type",
+    "browser",
+]
+
+# clickstream_events.user_id type per customer key mode (generate_data.py
+# --id-keys): customer emails, or generator-assigned integer customer ids
+USER_ID_TYPES = {"email": "VARCHAR(255)", "integer": "INTEGER"}
+
+# CSV files COPYed into the staging table before each INSERT ... SELECT
+FILES_PER_BATCH = 10
+
+# Every loaded S3 file (ETag, size, rows, load time); a file is loaded again
+# only when its ETag or size changes
+MANIFEST_TABLE = "lake_load_manifest"
+
+
+def prefix_pattern(prefix):
+    """LIKE pattern matching every key under a prefix (\\, % and _ escaped)"""
+    for char in "\\%_":
+        prefix = prefix.replace(char, "\\" + char)
+    return prefix + "%"
+
 
-def create_events_table():
-    """Create clickstream_events table if not exists"""
+def create_events_table(full_refresh=False, id_keys="email"):
+    """
+    Create the clickstream_events table and load manifest if they do not exist
+
+    Args:
+        full_refresh: Drop clickstream_events (to recreate it with the
+            current schema) and forget which S3_PREFIX files were loaded,
+            so every file is loaded again
+        id_keys: Customer key mode of the events, "email" or "integer"
+            (see USER_ID_TYPES)
+
+    Raises:
+        ValueError: If the existing table's user_id type belongs to the other
+            key mode (switching needs full_refresh)
+    """
+    user_id_type = USER_ID_TYPES[id_keys]
     conn = psycopg2.connect(**PG_CONFIG)
     cur = conn.cursor()
 
-    # Drop table if exists (to recreate with correct schema)
-    cur.execute("DROP TABLE IF EXISTS clickstream_events CASCADE;")
+    if full_refresh:
+        # Drop table if exists (to recreate with correct schema)
+        cur.execute("DROP TABLE IF EXISTS clickstream_events CASCADE;")
 
-    create_table_sql = """
-    CREATE TABLE clickstream_events (
+    create_table_sql = f"""
+    CREATE TABLE IF NOT EXISTS clickstream_events (
         event_id VARCHAR(100) PRIMARY KEY,
         session_id VARCHAR(100),
-        user_id VARCHAR(255),  -- Changed to VARCHAR to handle emails
+        user_id {user_id_type},  -- Email or integer customer key (--id-keys)
         event_timestamp TIMESTAMP,
         event_type VARCHAR(50),
         product_id VARCHAR(100),  -- Changed to VARCHAR for flexibility
@@ -56,83 +116,222 @@ def create_events_table():
     """
 
     cur.execute(create_table_sql)
+    cur.execute(
+        "SELECT atttypid = %s::regtype FROM pg_attribute "
+        "WHERE attrelid = 'clickstream_events'::regclass AND attname = 'user_id';",
+        (user_id_type,),
+    )
+    if not cur.fetchone()[0]:
+        conn.rollback()
+        conn.close()
+        raise ValueError(
+            f"clickstream_events.user_id does not hold {id_keys} keys; "
+            "rerun with --full-refresh to switch key modes"
+        )
+
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            bucket VARCHAR(255) NOT NULL,
+            s3_key TEXT NOT NULL,
+            etag VARCHAR(100) NOT NULL,
+            size_bytes BIGINT NOT NULL,
+            row_count BIGINT NOT NULL,
+            loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (bucket, s3_key)
+        );
+    """
+    )
+    if full_refresh:
+        cur.execute(
+            f"DELETE FROM {MANIFEST_TABLE} WHERE bucket = %s AND s3_key LIKE %s;",
+            (S3_BUCKET, prefix_pattern(S3_PREFIX)),
+        )
+
     conn.commit()
     cur.close()
     conn.close()
-    print("✅ Clickstream events table created successfully")
+    if full_refresh:
+        print("✅ Clickstream events table recreated for a full refresh")
+    else:
+        print("✅ Clickstream events table ready")
 
 
-def load_events_from_s3():
-    """Load events from S3 CSV files to PostgreSQL"""
-    s3 = boto3.client("s3")
-    conn = psycopg2.connect(**PG_CONFIG)
-    cur = conn.cursor()
+def create_stage_table(cur):
+    """Create the temporary staging table the CSV files are COPYed into"""
+    columns = ", ".join(f"{column} TEXT" for column in EVENT_COLUMNS)
+    cur.execute(
+        f"CREATE TEMP TABLE clickstream_events_stage ({columns}) "
+        "ON COMMIT DELETE ROWS;"
+    )
+
+
+def copy_csv_to_stage(cur, body):
+    """
+    COPY one streamed CSV file into the staging table and return its rows
+
+    The body is decoded line by line as it downloads (see
+    lake_reader.open_csv) and streamed straight into COPY. Every column of
+    the file is staged as text. Columns beyond EVENT_COLUMNS are added to
+    the staging table first, so files with extra columns still load.
+    """
+    header, text = lake_reader.open_csv(body)
+    columns = [quote_ident(column, cur) for column in header]
+    for column in header:
+        if column not in EVENT_COLUMNS:
+            cur.execute(
+                "ALTER TABLE clickstream_events_stage "
+                f"ADD COLUMN IF NOT EXISTS {quote_ident(column, cur)} TEXT;"
+            )
+
+    cur.copy_expert(
+        f"COPY clickstream_events_stage ({', '.join(columns)}) "
+        "FROM STDIN WITH (FORMAT csv)",
+        text,
+    )
+    return cur.rowcount
+
+
+def merge_staged_events(cur, id_keys="email"):
+    """
+    Insert the staged events into clickstream_events in one statement
+
+    Events whose event_id is already loaded are skipped, as before. user_id
+    is cast to the key mode's type (see USER_ID_TYPES).
+
+    Returns:
+        tuple: (staged events, inserted events)
+    """
+    cur.execute("SELECT COUNT(*) FROM clickstream_events_stage;")
+    staged = cur.fetchone()[0]
+
+    cur.execute(
+        f"""
+        INSERT INTO clickstream_events ({', '.join(EVENT_COLUMNS)})
+        SELECT
+            event_id,
+            session_id,
+            NULLIF(user_id, '')::{USER_ID_TYPES[id_keys]},
+            event_timestamp::TIMESTAMP,
+            event_type,
+            NULLIF(product_id, ''),
+            page_url,
+            device_type,
+            browser
+        FROM clickstream_events_stage
+        ON CONFLICT (event_id) DO NOTHING;
+    """
+    )
+    return staged, cur.rowcount
+
+
+def unloaded_objects(cur, objects):
+    """
+    Keep the S3 objects that are not in the manifest or changed since loading
+
+    A file counts as changed when its ETag or size differs from the ones
+    recorded when it was loaded.
+    """
+    cur.execute(
+        f"SELECT s3_key, etag, size_bytes FROM {MANIFEST_TABLE} "
+        "WHERE bucket = %s AND s3_key LIKE %s;",
+        (S3_BUCKET, prefix_pattern(S3_PREFIX)),
+    )
+    loaded = {key: (etag, size) for key, etag, size in cur.fetchall()}
+    return [
+        obj for obj in objects if loaded.get(obj["Key"]) != (obj["ETag"], obj["Size"])
+    ]
+
+
+def record_loaded_objects(cur, loaded):
+    """Upsert (object summary, rows) pairs into the manifest"""
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO {MANIFEST_TABLE} (bucket, s3_key, etag, size_bytes, row_count)
+        VALUES %s
+        ON CONFLICT (bucket, s3_key) DO UPDATE SET
+            etag = EXCLUDED.etag,
+            size_bytes = EXCLUDED.size_bytes,
+            row_count = EXCLUDED.row_count,
+            loaded_at = CURRENT_TIMESTAMP;
+    """,
+        [
+            (S3_BUCKET, obj["Key"], obj["ETag"], obj["Size"], rows)
+            for obj, rows in loaded
+        ],
+    )
+
+
+def load_events_from_s3(id_keys="email"):
+    """
+    Load events from S3 CSV files to PostgreSQL
+
+    Files are listed page by page and downloaded ahead of the load in a
+    thread pool (see lake_reader). They are COPYed into a temporary staging
+    table FILES_PER_BATCH at a time, and each batch is inserted with one
+    INSERT ... SELECT ... ON CONFLICT (event_id) DO NOTHING and committed
+    together with its manifest entries.
+
+    Files already in the manifest with the same ETag and size are skipped.
+    A changed file is loaded again; its events already loaded are kept as
+    they are and new ones are added.
+
+    Args:
+        id_keys: Customer key mode of the events, "email" or "integer"
+    """
+    s3 = lake_reader.make_s3_client()
 
     # List all event files in S3
-    response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=S3_PREFIX)
+    listed = list(lake_reader.list_objects(s3, S3_BUCKET, S3_PREFIX, ".csv"))
 
-    if "Contents" not in response:
+    if not listed:
         print("❌ No events found in S3")
         return
 
+    conn = psycopg2.connect(**PG_CONFIG)
+    cur = conn.cursor()
+
+    objects = unloaded_objects(cur, listed)
+    print(
+        f"Found {len(listed)} files, {len(objects)} new or changed since "
+        "the last load"
+    )
+    create_stage_table(cur)
+
     total_events = 0
+    total_conflicts = 0
     processed_files = 0
 
-    for obj in response["Contents"]:
-        if obj["Key"].endswith(".csv"):
+    # CSV files, downloaded while the previous ones load
+    downloads = lake_reader.iter_objects(s3, S3_BUCKET, objects)
+
+    for start in range(0, len(objects), FILES_PER_BATCH):
+        loaded = []
+        for obj, body in itertools.islice(downloads, FILES_PER_BATCH):
             print(f"Processing: {obj['Key']}")
 
-            # Download CSV from S3
-            file_obj = s3.get_object(Bucket=S3_BUCKET, Key=obj["Key"])
-            csv_content = file_obj["Body"].read().decode("utf-8")
-
-            # Parse CSV
-            csv_reader = csv.DictReader(StringIO(csv_content))
-
-            batch_size = 0
-            for row in csv_reader:
-                insert_sql = """
-                INSERT INTO clickstream_events (
-                    event_id, session_id, user_id, event_timestamp,
-                    event_type, product_id, page_url, device_type, browser
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (event_id) DO NOTHING;
-                """
-
-                # Handle user_id as string (could be email or ID)
-                user_id = row.get("user_id", "")
-
-                # Handle product_id as string
-                product_id = row.get("product_id", "")
-
-                cur.execute(
-                    insert_sql,
-                    (
-                        row["event_id"],
-                        row["session_id"],
-                        user_id if user_id else None,
-                        row["event_timestamp"],
-                        row["event_type"],
-                        product_id if product_id else None,
-                        row["page_url"],
-                        row["device_type"],
-                        row["browser"],
-                    ),
-                )
-                batch_size += 1
-                total_events += 1
-
-            # Commit after each file
-            conn.commit()
+            loaded.append((obj, copy_csv_to_stage(cur, body)))
             processed_files += 1
-            print(f"  → Loaded {batch_size} events from this file")
+
+        staged, inserted = merge_staged_events(cur, id_keys)
+        record_loaded_objects(cur, loaded)
+
+        # Commit the batch with its manifest entries (empties the staging table)
+        conn.commit()
+        total_events += inserted
+        total_conflicts += staged - inserted
+        print(
+            f"  → Loaded {inserted:,} of {staged:,} events "
+            f"({staged - inserted:,} duplicate event_ids skipped)"
+        )
 
     cur.close()
     conn.close()
 
     print(f"✅ Processed {processed_files} files")
-    print(f"✅ Loaded {total_events} total events to PostgreSQL")
+    print(f"✅ Loaded {total_events:,} total events to PostgreSQL")
+    print(f"✅ Skipped {total_conflicts:,} duplicate event_ids")
 
     # Get event statistics
     conn = psycopg2.connect(**PG_CONFIG)
@@ -157,12 +356,36 @@ def load_events_from_s3():
     conn.close()
 
 
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Load new or changed clickstream event CSVs from S3 into PostgreSQL"
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Drop and recreate clickstream_events, then reload every S3 file",
+    )
+    parser.add_argument(
+        "--id-keys",
+        choices=list(USER_ID_TYPES),
+        default="email",
+        help=(
+            "Customer key mode of the events (generate_data.py --id-keys); "
+            "switching modes needs --full-refresh"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     print("=" * 60)
     print("Starting clickstream events data load from S3 to PostgreSQL...")
     print("=" * 60)
-    create_events_table()
-    load_events_from_s3()
+    create_events_table(args.full_refresh, args.id_keys)
+    load_events_from_s3(args.id_keys)
     print("=" * 60)
     print("Clickstream events load complete! 🎉")
     print("=" * 60)
@@ -2,11 +2,10 @@
 Load Products from S3 JSON to PostgreSQL
 """
 
-import json
 import os
 from datetime import datetime
 
-import boto3
+import lake_reader
 import psycopg2
 from dotenv import load_dotenv
 
@@ -60,70 +59,72 @@ def create_products_table():
 
 
 def load_products_from_s3():
-    """Load products from S3 JSON files to PostgreSQL"""
-    s3 = boto3.client("s3")
-    conn = psycopg2.connect(**PG_CONFIG)
-    cur = conn.cursor()
+    """
+    Load products from S3 JSON files to PostgreSQL
+
+    Files are listed page by page and downloaded ahead of the load in a
+    thread pool, and each JSON array is parsed one product at a time while
+    it downloads (see lake_reader).
+    """
+    s3 = lake_reader.make_s3_client()
 
     # List all product files in S3
-    response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=S3_PREFIX)
+    objects = list(lake_reader.list_objects(s3, S3_BUCKET, S3_PREFIX, ".json"))
 
-    if "Contents" not in response:
+    if not objects:
         print("❌ No products found in S3")
         return
 
+    conn = psycopg2.connect(**PG_CONFIG)
+    cur = conn.cursor()
+
     total_products = 0
     processed_files = 0
 
-    for obj in response["Contents"]:
-        if obj["Key"].endswith(".json"):
-            print(f"Processing: {obj['Key']}")
-
-            # Download JSON from S3
-            file_obj = s3.get_object(Bucket=S3_BUCKET, Key=obj["Key"])
-            json_content = file_obj["Body"].read().decode("utf-8")
-            products = json.loads(json_content)
-
-            # Insert each product
-            for product in products:
-                insert_sql = """
-                INSERT INTO products (
-                    product_id, title, price, category, description, image,
-                    rating_rate, rating_count, ingestion_timestamp,
-                    ingestion_date, data_source
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (product_id) DO UPDATE SET
-                    title = EXCLUDED.title,
-                    price = EXCLUDED.price,
-                    category = EXCLUDED.category,
-                    description = EXCLUDED.description,
-                    image = EXCLUDED.image,
-                    rating_rate = EXCLUDED.rating_rate,
-                    rating_count = EXCLUDED.rating_count;
-                """
-
-                rating = product.get("rating", {})
-
-                cur.execute(
-                    insert_sql,
-                    (
-                        product["id"],
-                        product["title"],
-                        product["price"],
-                        product["category"],
-                        product["description"],
-                        product["image"],
-                        rating.get("rate", 0),
-                        rating.get("count", 0),
-                        product.get("ingestion_timestamp"),
-                        product.get("ingestion_date"),
-                        product.get("data_source", "fakestoreapi"),
-                    ),
-                )
-                total_products += 1
-
-            processed_files += 1
+    # JSON files, downloaded while the previous ones load
+    for obj, body in lake_reader.iter_objects(s3, S3_BUCKET, objects):
+        print(f"Processing: {obj['Key']}")
+
+        # Insert each product as it is parsed from the download
+        for product in lake_reader.iter_json_array(body):
+            insert_sql = """
+            INSERT INTO products (
+                product_id, title, price, category, description, image,
+                rating_rate, rating_count, ingestion_timestamp,
+                ingestion_date, data_source
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (product_id) DO UPDATE SET
+                title = EXCLUDED.title,
+                price = EXCLUDED.price,
+                category = EXCLUDED.category,
+                description = EXCLUDED.description,
+                image = EXCLUDED.image,
+                rating_rate = EXCLUDED.rating_rate,
+                rating_count = EXCLUDED.rating_count;
+            """
+
+            rating = product.get("rating", {})
+
+            cur.execute(
+                insert_sql,
+                (
+                    product["id"],
+                    product["title"],
+                    product["price"],
+                    product["category"],
+                    product["description"],
+                    product["image"],
+                    rating.get("rate", 0),
+                    rating.get("count", 0),
+                    product.get("ingestion_timestamp"),
+                    product.get("ingestion_date"),
+                    product.get("data_source", "fakestoreapi"),
+                ),
+            )
+            total_products += 1
+
+        processed_files += 1
 
     conn.commit()
     cur.close()
@@ -0,0 +1,14 @@
+"""
+Shared pytest configuration
+
+The scripts in scripts/ are standalone modules that import each other as
+siblings (e.g. `import lake_reader`), so the directory is put on sys.path.
+"""
+
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
@@ -0,0 +1,568 @@
+"""
+Tests for scripts/generate_data.py
+
+Invariants of the vectorized generators, checked on small datasets so
+later vectorization work cannot silently break them, the sharded
+generator's guarantee that output does not depend on --workers, and
+incremental ticks continuing from the persisted state.
+"""
+
+import io
+import json
+import shutil
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import generate_data
+import numpy as np
+import pandas as pd
+import pytest
+
+N_CUSTOMERS = 1000
+N_ORDERS = 5000
+
+# Order total range (min, max) by customer segment (see generate_orders)
+SEGMENT_PRICE_BANDS = {
+    "platinum": (150, 800),
+    "gold": (80, 400),
+    "silver": (40, 200),
+    "bronze": (20, 150),
+}
+
+UUID4_PATTERN = r"[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}"
+
+# ============================================
+# FIXTURES
+# ============================================
+
+
+@pytest.fixture(scope="module", autouse=True)
+def identity_pool_cache(tmp_path_factory):
+    """Build the Faker identity pools once, outside the working tree"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            generate_data,
+            "IDENTITY_POOL_CACHE",
+            tmp_path_factory.mktemp("cache") / "identity_pools.json",
+        )
+        yield
+
+
+@pytest.fixture(scope="module")
+def customers_df():
+    return generate_data.generate_customers(N_CUSTOMERS)
+
+
+@pytest.fixture(scope="module")
+def orders_df(customers_df):
+    return generate_data.generate_orders(customers_df, N_ORDERS)
+
+
+# ============================================
+# CUSTOMERS AND ORDERS
+# ============================================
+
+
+def test_customer_emails_are_unique(customers_df):
+    assert customers_df["email"].is_unique
+    assert customers_df["email"].notna().all()
+
+
+def test_customer_emails_are_unique_across_shards():
+    first = generate_data.generate_customers(500, generate_data.make_rng("customers"))
+    second = generate_data.generate_customers(
+        500, generate_data.make_rng("customers", shard=1), first_customer_id=501
+    )
+    emails = np.concatenate([first["email"], second["email"]])
+    assert len(set(emails)) == len(emails)
+
+
+def test_order_totals_within_segment_price_bands(customers_df, orders_df):
+    segments = customers_df.set_index("email")["customer_segment"]
+    order_segments = orders_df["customer_id"].map(segments)  # customer_id is email
+    assert order_segments.notna().all()
+
+    for segment, (low, high) in SEGMENT_PRICE_BANDS.items():
+        totals = orders_df.loc[order_segments == segment, "order_total"]
+        assert len(totals) > 0
+        assert totals.between(low, high).all(), segment
+
+
+def test_orders_follow_pareto_split(orders_df):
+    # 80% of orders come from the 20% frequent customers
+    orders_per_customer = orders_df["customer_id"].value_counts()
+    top = orders_per_customer.iloc[: N_CUSTOMERS // 5].sum()
+    assert top / len(orders_df) > 0.75
+
+
+@pytest.mark.parametrize("n_customers", [1, 2, 4])
+def test_orders_for_tiny_customer_sets(n_customers):
+    # Too few customers for a frequent tier: every order is still assigned
+    customers = generate_data.generate_customers(n_customers)
+    orders = generate_data.generate_orders(customers, 50)
+    assert len(orders) == 50
+    assert orders["customer_id"].isin(customers["email"]).all()
+
+
+# ============================================
+# CUSTOMER SEGMENT HISTORY (SCD TYPE 2)
+# ============================================
+
+
+def stg_customers(customers_df, history_df):
+    """
+    Union the current customers with their history the way stg_customers does
+
+    History rows take the identity columns of their customer's current row.
+    """
+    key = "customer_id" if "customer_id" in customers_df else "email"
+    current = customers_df.assign(customer_key=customers_df[key])
+    history = history_df.rename(columns={"customer_id": "customer_key"}).merge(
+        current.drop(
+            columns=[
+                "customer_segment",
+                "segment_start_date",
+                "segment_end_date",
+                "is_current",
+            ]
+        ),
+        on="customer_key",
+        how="inner",
+        validate="many_to_one",
+    )
+    assert len(history) == len(history_df)  # Every row joins a customer
+    return pd.concat([current, history], ignore_index=True)
+
+
+@pytest.mark.parametrize("depth", [1, 3])
+@pytest.mark.parametrize("id_keys", ["email", "integer"])
+def test_segment_history_is_a_contiguous_scd2_timeline(depth, id_keys):
+    customers = generate_data.generate_customers(200, id_keys=id_keys)
+    customers, history = generate_data.generate_segment_history(customers, depth)
+    versions = stg_customers(customers, history).sort_values(
+        ["customer_key", "segment_start_date"]
+    )
+    start = versions["segment_start_date"]
+    end = pd.to_datetime(versions["segment_end_date"])
+    by_customer = versions.groupby("customer_key")
+
+    assert (by_customer.size() == depth + 1).all()
+    assert (by_customer["is_current"].sum() == 1).all()
+    # The current version is the latest one and the only open-ended one
+    assert (by_customer["is_current"].last()).all()
+    assert (end.isna() == versions["is_current"]).all()
+
+    # Each version ends where the next one starts, from registration on
+    next_start = by_customer["segment_start_date"].shift(-1)
+    closed = versions["segment_end_date"].notna()
+    assert (end[closed] == next_start[closed]).all()
+    assert (
+        by_customer["segment_start_date"].first()
+        == by_customer["registration_date"].first()
+    ).all()
+    assert (start <= pd.Timestamp.today()).all()
+
+    # init_db.sql: PRIMARY KEY (customer_id, segment_start_date), chk_segment,
+    # chk_dates / chk_history_dates and chk_history_not_current
+    assert not versions.duplicated(["customer_key", "segment_start_date"]).any()
+    assert versions["customer_segment"].isin(generate_data.CUSTOMER_SEGMENTS).all()
+    assert (end[closed] > start[closed]).all()
+    assert not history["is_current"].any()
+    assert history["segment_end_date"].notna().all()
+
+    # A new version always changes the segment
+    next_segment = by_customer["customer_segment"].shift(-1)
+    assert (versions["customer_segment"][closed] != next_segment[closed]).all()
+
+
+# ============================================
+# CLICKSTREAM EVENTS
+# ============================================
+
+
+@pytest.fixture(scope="module")
+def events_df(customers_df):
+    # Small session batches, so the events span many batches
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(generate_data, "SESSION_BATCH_SIZE", 100)
+        return generate_data.generate_clickstream_events(customers_df, 5000)
+
+
+def test_clickstream_event_count_and_ids(events_df):
+    assert len(events_df) == 5000
+    assert events_df["event_id"].is_unique
+    assert events_df["event_id"].str.fullmatch(UUID4_PATTERN).all()
+    assert events_df["event_timestamp"].is_monotonic_increasing
+
+
+def test_clickstream_sessions_are_consistent(customers_df, events_df):
+    sessions = events_df.groupby("session_id")
+    # User, device and browser are drawn once per session
+    for column in ["user_id", "device_type", "browser"]:
+        assert (sessions[column].nunique() == 1).all(), column
+    assert events_df["user_id"].isin(customers_df["email"]).all()
+
+    assert sessions.size().max() <= generate_data.MAX_EVENTS_PER_SESSION
+    assert sessions.ngroups < len(events_df)  # Sessions hold several events
+
+
+def test_clickstream_batches_are_sized_by_remaining_events(customers_df, monkeypatch):
+    drawn = []
+    session_batch = generate_data.generate_clickstream_session_batch
+
+    def recording_batch(customers_df, n_sessions, *args):
+        drawn.append(n_sessions)
+        return session_batch(customers_df, n_sessions, *args)
+
+    monkeypatch.setattr(
+        generate_data, "generate_clickstream_session_batch", recording_batch
+    )
+    events = generate_data.generate_clickstream_events(customers_df, 50)
+
+    assert len(events) == 50
+    # About 50 / AVG_EVENTS_PER_SESSION sessions, not a full SESSION_BATCH_SIZE
+    assert sum(drawn) < 50
+
+
+def test_clickstream_page_urls_match_events(events_df):
+    paths = events_df["event_type"].map(
+        {
+            "page_view": "/products/",
+            "add_to_cart": "/cart/add/",
+            "remove_from_cart": "/cart/remove/",
+            "purchase": "/checkout/complete/",
+            "search": "/search/",
+        }
+    )
+    assert (events_df["page_url"] == paths + events_df["product_id"].astype(str)).all()
+    assert events_df["product_id"].between(1, generate_data.N_PRODUCTS).all()
+
+
+@pytest.mark.parametrize("late_fraction", [0, 0.2])
+def test_late_sessions_are_back_dated_by_one_lag(events_df, late_fraction):
+    rng = generate_data.make_rng("late_events")
+    df = generate_data.add_late_arrivals(events_df, late_fraction, rng)
+
+    assert df["arrival_timestamp"].is_monotonic_increasing
+    assert sorted(df["event_id"]) == sorted(events_df["event_id"])
+    lag = pd.to_datetime(df["arrival_timestamp"]) - pd.to_datetime(
+        df["event_timestamp"]
+    )
+    session_lag = lag.groupby(df["session_id"])
+    assert (session_lag.nunique() == 1).all()  # One lag per session
+
+    lags = session_lag.first()
+    late = lags > pd.Timedelta(0)
+    assert abs(late.mean() - late_fraction) < 0.05
+    assert (
+        lags[late]
+        .between(
+            pd.Timedelta(hours=1),
+            pd.Timedelta(hours=generate_data.LATE_EVENT_MAX_HOURS),
+        )
+        .all()
+    )
+
+
+# ============================================
+# ORDER ITEMS
+# ============================================
+
+
+@pytest.fixture(scope="module")
+def order_items_df(orders_df):
+    return generate_data.generate_order_items(orders_df, first_order_id=101)
+
+
+def test_order_item_lines_sum_to_order_total(orders_df, order_items_df):
+    items = order_items_df
+    line_cents = np.rint(
+        (items["quantity"] * items["unit_price"] - items["discount_amount"]) * 100
+    ).astype("int64")
+    totals = line_cents.groupby(items["order_id"]).sum()
+
+    order_cents = np.rint(orders_df["order_total"].to_numpy() * 100).astype("int64")
+    assert totals.index.tolist() == list(range(101, 101 + len(orders_df)))
+    assert (totals.to_numpy() == order_cents).all()
+
+
+def test_order_item_quantities_and_discounts(order_items_df):
+    items = order_items_df
+    assert items["quantity"].between(1, 5).all()
+    assert items.groupby("order_id").size().between(1, 5).all()
+    assert (items["discount_amount"] >= 0).all()
+    assert (
+        items["discount_amount"] <= items["quantity"] * items["unit_price"] + 1e-9
+    ).all()
+    # About 20% of lines are discounted
+    assert 0.15 < (items["discount_amount"] > 0).mean() < 0.25
+
+
+@pytest.mark.parametrize("profile, skewed", [("uniform", False), ("zipf", True)])
+def test_product_popularity_skew(orders_df, monkeypatch, profile, skewed):
+    monkeypatch.setattr(generate_data, "WORKLOAD_PROFILE", profile)
+    items = generate_data.generate_order_items(orders_df)
+
+    counts = items["product_id"].value_counts()
+    top_10_share = counts.iloc[:10].sum() / len(items)
+    if skewed:
+        # Popularity ~ 1 / rank^1.1 over 200 products: ~57% in the top 10
+        assert counts.index[0] == 1
+        assert top_10_share > 0.5
+    else:
+        assert top_10_share < 0.1
+
+
+# ============================================
+# SHARDED GENERATION
+# ============================================
+
+
+def run_generator(cwd, *args, clean=True):
+    """Run generate_data.py in `cwd` and return {relative path: bytes} of its output"""
+    output_dir = Path(cwd) / generate_data.OUTPUT_DIR
+    if clean:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    subprocess.run(
+        [sys.executable, generate_data.__file__, *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+    return {
+        path.relative_to(output_dir).as_posix(): path.read_bytes()
+        for path in sorted(output_dir.rglob("*"))
+        if path.is_file()
+    }
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_output_is_identical_for_any_worker_count(tmp_path, fmt):
+    # Small chunks, so orders and events are split into several shards
+    args = [
+        "--scale-factor",
+        "0.02",
+        "--chunk-size",
+        "40",
+        "--format",
+        fmt,
+        "--history-depth",
+        "1",
+        "--late-fraction",
+        "0.1",
+    ]
+    # Both runs share the working directory (and its identity pool cache)
+    outputs = {
+        workers: run_generator(tmp_path, "--workers", str(workers), *args)
+        for workers in [1, 3]
+    }
+
+    assert f"orders.{fmt}" in outputs[1]
+    assert f"customer_history.{fmt}" in outputs[1]
+    assert f"order_updates.{fmt}" in outputs[1]
+    assert outputs[1].keys() == outputs[3].keys()
+    for path, data in outputs[1].items():
+        assert data == outputs[3][path], path
+
+
+# ============================================
+# OUTPUT WRITERS
+# ============================================
+
+
+@pytest.mark.parametrize("first, second", [("parquet", "csv"), ("csv", "parquet")])
+def test_writing_a_dataset_removes_the_other_format(
+    customers_df, orders_df, tmp_path, monkeypatch, first, second
+):
+    monkeypatch.setattr(generate_data, "OUTPUT_DIR", tmp_path)
+    generate_data.write_dataset(customers_df, "customers", first)
+    generate_data.write_dataset(customers_df.iloc[:10], "customers", second)
+    # Appending creates a missing file the same way
+    generate_data.append_dataset(orders_df.iloc[:10], "orders", first)
+    generate_data.append_dataset(orders_df.iloc[:10], "orders", second)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"customers.{second}",
+        f"orders.{second}",
+    ]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_rerun_replaces_event_output_layout(tmp_path, stream):
+    args = ["--scale-factor", "0.01"] + (["--stream"] if stream else [])
+
+    partitioned = run_generator(tmp_path, *args, "--partition-by", "day")
+    assert any(path.startswith("clickstream_events/") for path in partitioned)
+    assert "clickstream_events.csv" not in partitioned
+
+    # Without --partition-by the old tree must not shadow the new file
+    single = run_generator(tmp_path, *args, "--format", "parquet", clean=False)
+    assert "clickstream_events.parquet" in single
+    assert not any(path.startswith("clickstream_events/") for path in single)
+
+    partitioned = run_generator(tmp_path, *args, "--partition-by", "day", clean=False)
+    assert "clickstream_events.parquet" not in partitioned
+
+
+# ============================================
+# INCREMENTAL TICKS
+# ============================================
+
+TICK_PERIODS = ["hour", "hour", "day"]
+
+
+def read_csv_output(output, dataset):
+    return pd.read_csv(io.BytesIO(output[f"{dataset}.csv"]))
+
+
+@pytest.fixture(scope="module")
+def tick_outputs(tmp_path_factory):
+    """Output after a full run with late arrivals and after each of TICK_PERIODS"""
+    cwd = tmp_path_factory.mktemp("ticks")
+    outputs = [run_generator(cwd, "--late-fraction", "0.2")]
+    for period in TICK_PERIODS:
+        outputs.append(run_generator(cwd, "--tick", period, clean=False))
+    return outputs
+
+
+def test_ticks_advance_the_watermark(tick_outputs):
+    states = [json.loads(output["generator_state.json"]) for output in tick_outputs]
+    watermark = datetime.fromisoformat(states[0]["watermark"])
+    assert watermark.time() == datetime.min.time()
+
+    expected = [watermark + timedelta(hours=hours) for hours in [0, 1, 2, 24]]
+    assert [datetime.fromisoformat(state["watermark"]) for state in states] == expected
+    assert [state["tick"] for state in states] == [0, 1, 2, 3]
+    for output, state in zip(tick_outputs, states):
+        assert state["next_order_id"] == len(read_csv_output(output, "orders")) + 1
+
+
+def test_ticks_append_new_rows_for_their_period_only(tick_outputs):
+    for before, after in zip(tick_outputs, tick_outputs[1:]):
+        state = json.loads(after["generator_state.json"])
+        tick_start = json.loads(before["generator_state.json"])["watermark"]
+        tick_end = state["watermark"]
+
+        for dataset, column in [
+            ("orders", "order_date"),
+            ("order_items", None),
+            ("clickstream_events", "arrival_timestamp"),
+        ]:
+            # Earlier rows are kept byte for byte
+            assert after[f"{dataset}.csv"].startswith(before[f"{dataset}.csv"])
+            if column:
+                old_rows = len(read_csv_output(before, dataset))
+                new_rows = read_csv_output(after, dataset).iloc[old_rows:]
+                times = pd.to_datetime(new_rows[column])
+                assert (times >= tick_start).all() and (times < tick_end).all()
+
+    # Every tick draws new events instead of repeating earlier ones
+    events = read_csv_output(tick_outputs[-1], "clickstream_events")
+    assert len(events) > len(read_csv_output(tick_outputs[0], "clickstream_events"))
+    assert events["event_id"].is_unique
+    items = read_csv_output(tick_outputs[-1], "order_items")
+    assert (
+        items["order_id"].max()
+        < json.loads(tick_outputs[-1]["generator_state.json"])["next_order_id"]
+    )
+
+
+@pytest.mark.parametrize(
+    "content, error",
+    [
+        (None, FileNotFoundError),
+        ('{"watermark": "2024-01-01T00:00:00", "tick"', ValueError),
+        ('{"watermark": "2024-01-01T00:00:00"}', ValueError),
+        ("[]", ValueError),
+    ],
+)
+def test_tick_fails_cleanly_without_valid_state(tmp_path, monkeypatch, content, error):
+    state_file = tmp_path / "generator_state.json"
+    monkeypatch.setattr(generate_data, "GENERATOR_STATE_FILE", state_file)
+    if content is not None:
+        state_file.write_text(content)
+
+    with pytest.raises(error, match="run a full generation"):
+        generate_data.generate_tick("day")
+    assert sorted(tmp_path.iterdir()) == ([state_file] if content else [])
+
+
+# ============================================
+# LATE-ARRIVING DATA
+# ============================================
+
+
+@pytest.fixture(scope="module")
+def late_output(tmp_path_factory):
+    """Output of a day-partitioned run where 20% of sessions and orders are late"""
+    cwd = tmp_path_factory.mktemp("late")
+    return run_generator(
+        cwd,
+        "--scale-factor",
+        "0.2",
+        "--late-fraction",
+        "0.2",
+        "--partition-by",
+        "day",
+    )
+
+
+def read_event_partitions(output):
+    """Partitioned events with the partition each one was written to"""
+    frames = []
+    for path, data in output.items():
+        if path.startswith("clickstream_events/") and path.endswith(".csv"):
+            partition = path.removeprefix("clickstream_events/").rsplit("/", 1)[0]
+            frames.append(pd.read_csv(io.BytesIO(data)).assign(partition=partition))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_late_events_land_in_their_arrival_partition(late_output):
+    events = read_event_partitions(late_output)
+    layout = generate_data.PARTITION_LAYOUTS["day"][1]
+
+    arrival = pd.to_datetime(events["arrival_timestamp"])
+    event_time = pd.to_datetime(events["event_timestamp"])
+    assert (events["partition"] == arrival.dt.strftime(layout)).all()
+
+    late = arrival > event_time
+    assert late.any()
+    # Late events are written to a later partition than their event day
+    assert (event_time[late].dt.strftime(layout) < events["partition"][late]).any()
+    sessions = late.groupby(events["session_id"]).first()
+    assert abs(sessions.mean() - 0.2) < 0.05
+
+
+def test_expected_partitions_match_the_output(late_output):
+    expected = json.loads(late_output["expected_partitions.json"])
+    layout = generate_data.PARTITION_LAYOUTS["day"][1]
+
+    # Events: by event-time day, wherever they arrived
+    events = read_event_partitions(late_output)
+    event_day = pd.to_datetime(events["event_timestamp"]).dt.strftime(layout)
+    partitions = expected["clickstream_events"]["partitions"]
+    assert sorted(partitions) == sorted(event_day.unique())
+    for partition, group in events.groupby(event_day):
+        stats = partitions[partition]
+        assert stats["row_count"] == len(group)
+        assert stats["min_event_timestamp"] == group["event_timestamp"].min()
+        assert stats["max_event_timestamp"] == group["event_timestamp"].max()
+        checksum = pd.util.hash_pandas_object(group["event_id"], index=False).sum()
+        assert stats["event_id_checksum"] == f"{int(checksum) % 2**64:016x}"
+
+    # Orders: by order_date day, with the arrived status updates applied
+    orders = read_csv_output(late_output, "orders")
+    updates = read_csv_output(late_output, "order_updates")
+    assert len(updates)
+    status = orders["order_status"].copy()
+    status.iloc[updates["order_id"] - 1] = updates["order_status"].to_numpy()
+    order_day = pd.to_datetime(orders["order_date"]).dt.strftime(layout)
+    partitions = expected["orders"]["partitions"]
+    assert sorted(partitions) == sorted(order_day.unique())
+    for partition, statuses in status.groupby(order_day):
+        assert partitions[partition] == {
+            "row_count": len(statuses),
+            "status_counts": statuses.value_counts().sort_index().to_dict(),
+        }
@@ -0,0 +1,294 @@
+"""
+Tests for scripts/lake_reader.py
+
+Listing and downloads run against a moto-mocked S3 bucket and against
+LocalS3Client over a temporary directory.
+"""
+
+import io
+import json
+import threading
+import time
+
+import boto3
+import lake_reader
+import pytest
+from moto import mock_aws
+
+BUCKET = "lake-test"
+PREFIX = "raw/clickstream/"
+
+# ============================================
+# FIXTURES
+# ============================================
+
+
+@pytest.fixture
+def s3():
+    """moto-mocked S3 client with an empty BUCKET"""
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def put_local(root, key, body):
+    """Write an object into a LocalS3Client directory"""
+    path = root / BUCKET / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+
+
+class SlowClient:
+    """Wrap a client so that earlier keys take longer to download"""
+
+    def __init__(self, client, delays):
+        self.client = client
+        self.delays = delays
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def get_object(self, Bucket, Key):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delays.get(Key, 0))
+        with self.lock:
+            self.active -= 1
+        return self.client.get_object(Bucket=Bucket, Key=Key)
+
+
+# ============================================
+# LISTING
+# ============================================
+
+
+def test_list_objects_follows_continuation_past_1000_keys(s3):
+    keys = [f"{PREFIX}date=2024-01-01/part-{i:05d}.csv" for i in range(2100)]
+    for key in keys:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+    s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}_manifest.json", Body=b"{}")
+    s3.put_object(Bucket=BUCKET, Key="raw/products/p.csv", Body=b"x")
+
+    listed = list(lake_reader.list_objects(s3, BUCKET, PREFIX, ".csv"))
+
+    assert [obj["Key"] for obj in listed] == keys
+    assert all(obj["Size"] == 1 and obj["ETag"] for obj in listed)
+
+
+def test_list_objects_local_pages(tmp_path):
+    keys = [f"{PREFIX}part-{i:04d}.csv" for i in range(1203)]
+    for key in keys:
+        put_local(tmp_path, key, b"x")
+    client = lake_reader.LocalS3Client(tmp_path)
+
+    first = client.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX)
+    assert first["KeyCount"] == 1000 and first["IsTruncated"]
+
+    listed = list(lake_reader.list_objects(client, BUCKET, PREFIX))
+    assert [obj["Key"] for obj in listed] == keys
+
+
+# ============================================
+# LOCAL S3 CLIENT
+# ============================================
+
+
+def test_local_client_matches_s3_response_shapes(s3, tmp_path):
+    objects = {f"{PREFIX}a.csv": b"a,b\n1,2\n", f"{PREFIX}b.csv": b"hello"}
+    for key, body in objects.items():
+        s3.put_object(Bucket=BUCKET, Key=key, Body=body)
+        put_local(tmp_path, key, body)
+    local = lake_reader.LocalS3Client(tmp_path)
+
+    expected = s3.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX, MaxKeys=1)
+    actual = local.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX, MaxKeys=1)
+    for field in ["KeyCount", "MaxKeys", "IsTruncated"]:
+        assert actual[field] == expected[field]
+    assert "NextContinuationToken" in actual
+
+    last = local.list_objects_v2(
+        Bucket=BUCKET,
+        Prefix=PREFIX,
+        MaxKeys=1,
+        ContinuationToken=actual["NextContinuationToken"],
+    )
+    assert [obj["Key"] for obj in last["Contents"]] == [f"{PREFIX}b.csv"]
+    assert not last["IsTruncated"] and "NextContinuationToken" not in last
+
+    expected = s3.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX)["Contents"]
+    actual = local.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX)["Contents"]
+    for s3_obj, local_obj in zip(expected, actual):
+        for field in ["Key", "Size", "ETag"]:
+            assert local_obj[field] == s3_obj[field]
+        assert local_obj["LastModified"].tzinfo is not None
+
+    empty = local.list_objects_v2(Bucket=BUCKET, Prefix="missing/")
+    assert empty["KeyCount"] == 0 and "Contents" not in empty
+
+    response = local.get_object(Bucket=BUCKET, Key=f"{PREFIX}a.csv")
+    with response["Body"] as body:
+        assert body.read() == objects[f"{PREFIX}a.csv"]
+    assert response["ContentLength"] == len(objects[f"{PREFIX}a.csv"])
+
+
+# ============================================
+# DOWNLOADS
+# ============================================
+
+
+def test_iter_objects_yields_in_key_order(tmp_path):
+    keys = [f"{PREFIX}part-{i:02d}.csv" for i in range(12)]
+    for key in keys:
+        put_local(tmp_path, key, key.encode() * 100)
+    local = lake_reader.LocalS3Client(tmp_path)
+    # The first keys are the slowest, so later downloads finish first
+    client = SlowClient(local, {key: 0.02 * (12 - i) for i, key in enumerate(keys)})
+
+    objects = lake_reader.list_objects(local, BUCKET, PREFIX)
+    received = [
+        (obj["Key"], body.read())
+        for obj, body in lake_reader.iter_objects(
+            client, BUCKET, objects, workers=4, prefetch=4
+        )
+    ]
+
+    assert received == [(key, key.encode() * 100) for key in keys]
+    assert 1 < client.max_active <= 4
+
+
+def test_iter_objects_stops_downloads_on_early_close(tmp_path, monkeypatch):
+    # Small reads and objects larger than the per-object buffer, so every
+    # prefetched download blocks until it is read or cancelled
+    monkeypatch.setattr(lake_reader, "STREAM_CHUNK_SIZE", 16)
+    keys = [f"{PREFIX}part-{i:02d}.csv" for i in range(20)]
+    for key in keys:
+        put_local(tmp_path, key, b"x" * 4096)
+    client = lake_reader.LocalS3Client(tmp_path)
+
+    objects = list(lake_reader.list_objects(client, BUCKET, PREFIX))
+    stream = lake_reader.iter_objects(client, BUCKET, objects, workers=2, prefetch=3)
+    obj, body = next(stream)
+    assert obj["Key"] == keys[0]
+    assert body.read(16) == b"x" * 16
+
+    started = time.monotonic()
+    stream.close()
+    assert time.monotonic() - started < 5
+    assert body.closed
+
+
+def test_body_exception_reaches_reader():
+    class FailingBody:
+        def __init__(self):
+            self.reads = 0
+
+        def read(self, size):
+            self.reads += 1
+            if self.reads > 1:
+                raise OSError("connection reset")
+            return b"event_id\n"
+
+        def close(self):
+            pass
+
+    class FailingClient:
+        def get_object(self, Bucket, Key):
+            if Key == "missing.csv":
+                raise KeyError(Key)
+            return {"Body": FailingBody()}
+
+    objects = [{"Key": "reset.csv"}, {"Key": "missing.csv"}]
+    bodies = lake_reader.iter_objects(FailingClient(), BUCKET, objects)
+
+    _, body = next(bodies)
+    assert body.readline() == b"event_id\n"
+    with pytest.raises(OSError, match="connection reset"):
+        body.read()
+
+    _, body = next(bodies)
+    with pytest.raises(KeyError):
+        body.read()
+
+
+# ============================================
+# STREAMING DECODERS
+# ============================================
+
+
+class OneByteStream(io.RawIOBase):
+    """Raw stream returning one byte per read, splitting multibyte characters"""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.data:
+            return 0
+        buffer[0] = self.data[0]
+        self.data = self.data[1:]
+        return 1
+
+
+def parse(data, chunk_size=lake_reader.STREAM_CHUNK_SIZE):
+    return list(lake_reader.iter_json_array(io.BytesIO(data), chunk_size))
+
+
+DOCUMENT = [
+    {"product_id": 1, "name": 'Mug ] [ , "quoted"', "price": 12.5, "tags": []},
+    {"product_id": 22, "name": "Café crème 日本 🎉", "price": -3e-2, "stock": None},
+    123456789,
+    1.5e10,
+    "plain",
+    [1, [2, {"nested": True}]],
+    False,
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_iter_json_array_matches_json_loads(chunk_size):
+    data = json.dumps(DOCUMENT, ensure_ascii=False, indent=2).encode()
+    assert parse(data, chunk_size) == DOCUMENT
+
+
+def test_iter_json_array_numbers_cut_at_piece_boundary():
+    # "2" is a complete number on its own; the parser must read on
+    assert parse(b"[2.5]", chunk_size=2) == [2.5]
+    assert parse(b"[10,200,3e5]", chunk_size=1) == [10, 200, 3e5]
+    assert parse(b"[10]", chunk_size=3) == [10]
+
+
+def test_iter_json_array_split_multibyte_characters():
+    data = json.dumps(DOCUMENT, ensure_ascii=False).encode()
+    body = io.BufferedReader(OneByteStream(data), 1)
+    assert list(lake_reader.iter_json_array(body, chunk_size=1)) == DOCUMENT
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ \n ]  \n", b"[]\n"])
+def test_iter_json_array_empty(data):
+    assert parse(data, chunk_size=1) == []
+
+
+@pytest.mark.parametrize("data", [b"[1] x", b"[1][2]", b"[] ,", b"[]]"])
+def test_iter_json_array_rejects_trailing_data(data):
+    with pytest.raises(ValueError, match="after JSON array"):
+        parse(data, chunk_size=1)
+
+
+@pytest.mark.parametrize(
+    "data", [b"", b"[", b"[1, 2", b"[1,", b'[{"a": 1', b'["unterminated']
+)
+@pytest.mark.parametrize("chunk_size", [1, 1 << 20])
+def test_iter_json_array_rejects_truncated_body(data, chunk_size):
+    with pytest.raises(ValueError):
+        parse(data, chunk_size)
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', b"[1 2]", b"[1,]", b"[,1]"])
+def test_iter_json_array_rejects_malformed_arrays(data):
+    with pytest.raises(ValueError):
+        parse(data, chunk_size=1)
@@ -0,0 +1,749 @@
+"""
+Tests for scripts/load_data.py that run without a database
+
+Connections and pools are replaced by fakes that record the SQL they are
+sent and the rows copied into each table.
+"""
+
+import csv
+import io
+import json
+import threading
+import time
+
+import load_data
+import pandas as pd
+import psycopg2
+import pytest
+from psycopg2.pool import PoolError
+
+# ============================================
+# FAKE DATABASE
+# ============================================
+
+
+class FakeCursor:
+    """
+    Cursor that records SQL and emulates the loader's own bookkeeping
+
+    Copied rows, the load_progress checkpoints and the index/trigger
+    catalog only change when the connection commits (or right away in
+    autocommit mode).
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.db = conn.db
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.db.record(sql)
+        self.conn.transaction.append(sql)
+        self.rows = []
+        db = self.db
+        run = self.conn.run
+
+        if sql.startswith("SELECT email, customer_id FROM customers"):
+            self.rows = list(db.customers.items())
+        elif sql.startswith("SELECT COUNT(*), MIN("):
+            table = sql.split(" FROM ")[1].split("_stage")[0]
+            self.rows = [db.mismatched.get(table, (0, None))]
+        elif sql.startswith("SELECT pg_get_serial_sequence(%s, %s)"):
+            self.rows = [(f"public.{params[0]}_{params[1]}_seq",)]
+        elif sql.startswith("TRUNCATE TABLE"):
+            tables = sql.removeprefix("TRUNCATE TABLE ").split(" RESTART")[0]
+            run(lambda: [db.copied.pop(table, None) for table in tables.split(", ")])
+        elif sql.startswith("DROP TABLE"):
+            tables = sql.removeprefix("DROP TABLE ").removeprefix("IF EXISTS ")
+            tables = tables.rstrip(";").removesuffix(" CASCADE").split(", ")
+            run(lambda: [db.copied.pop(table, None) for table in tables])
+        elif sql.startswith("ALTER TABLE") and " RENAME TO " in sql:
+            _, _, old, _, _, new = sql.rstrip(";").split()
+            run(lambda: db.copied.__setitem__(new, db.copied.pop(old, [])))
+        elif sql.startswith("SELECT i.indexrelid::regclass::text"):
+            self.rows = [
+                (name, definition, None)
+                for name, (table, definition, _) in db.indexes.items()
+                if table == params[0]
+            ]
+
+        # Resumable loads: load_progress
+        elif sql.startswith("SELECT table_name, data_file"):
+            self.rows = [tuple(row) for row in db.progress.values()]
+        elif sql.startswith(f"DELETE FROM {load_data.LOAD_PROGRESS_TABLE};"):
+            run(db.progress.clear)
+        elif sql.startswith(f"UPDATE {load_data.LOAD_PROGRESS_TABLE}"):
+            run(lambda: db.update_progress(sql, params))
+
+        # Index and trigger deferral: the catalog and load_deferred_objects
+        elif sql.startswith(
+            f"CREATE TABLE IF NOT EXISTS {load_data.DEFERRED_OBJECTS_TABLE}"
+        ):
+            run(lambda: db.deferred is None and setattr(db, "deferred", {}))
+        elif sql.startswith("SELECT 'index', i.indexrelid"):
+            self.rows = db.deferrable_objects(sql, params)
+        elif sql.startswith("SELECT to_regclass(%s)"):
+            self.rows = [(params[0] if db.deferred is not None else None,)]
+        elif sql.startswith("SELECT object_type, object_name, table_name, definition"):
+            self.rows = list(db.deferred.values())
+        elif sql.startswith("SELECT indisvalid FROM pg_index"):
+            index = db.indexes.get(params[0])
+            self.rows = [(index[2],)] if index else []
+        elif sql.startswith("DROP INDEX CONCURRENTLY IF EXISTS"):
+            assert self.conn.autocommit
+            run(lambda: db.indexes.pop(sql.split()[5].rstrip(";"), None))
+        elif sql.startswith("DROP INDEX"):
+            run(lambda: db.indexes.pop(sql.split()[2].rstrip(";")))
+        elif sql.startswith("CREATE INDEX CONCURRENTLY"):
+            assert self.conn.autocommit
+            name, table = sql.split()[3], sql.split()[5]
+            run(lambda: db.indexes.update({name: (table, sql, True)}))
+        elif sql.startswith("ALTER TABLE") and " TRIGGER " in sql:
+            _, _, table, action, _, name = sql.rstrip(";").split()
+            run(lambda: db.set_trigger(name, action == "ENABLE"))
+        elif sql.startswith(f"DELETE FROM {load_data.DEFERRED_OBJECTS_TABLE}"):
+            run(lambda: db.deferred.pop(tuple(params)))
+
+    def execute_values(self, sql, values):
+        """Stand-in for psycopg2.extras.execute_values (see fake_execute_values)"""
+        sql = " ".join(sql.split())
+        self.execute(sql)
+        db = self.db
+        if sql.startswith(f"INSERT INTO {load_data.LOAD_PROGRESS_TABLE}"):
+            rows = {row[0]: [*row, 0, 0, 0, 0, False] for row in values}
+            self.conn.run(lambda: db.progress.update(rows))
+        elif sql.startswith(f"INSERT INTO {load_data.DEFERRED_OBJECTS_TABLE}"):
+            rows = {tuple(row[:2]): tuple(row) for row in values}
+            self.conn.run(lambda: db.deferred.update(rows))
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else (0, 0)
+
+    def copy_expert(self, sql, buffer):
+        self.db.record(sql)
+        self.conn.transaction.append(sql)
+        table = sql.split()[1]
+        lines = buffer.getvalue().splitlines()
+        # Keep the connection busy like a real COPY would
+        time.sleep(0.05)
+        self.conn.run(lambda: self.db.copied.setdefault(table, []).extend(lines))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.autocommit = False
+        self.pending = []
+        self.transaction = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def run(self, change):
+        """Apply a change at commit (or now, in autocommit mode)"""
+        if self.autocommit:
+            with self.db.lock:
+                change()
+        else:
+            self.pending.append(change)
+
+    def commit(self):
+        with self.db.lock:
+            for change in self.pending:
+                change()
+            if self.transaction:
+                self.db.transactions.append(self.transaction)
+        self.pending = []
+        self.transaction = []
+
+    def rollback(self):
+        self.db.rollbacks += 1
+        self.pending = []
+        self.transaction = []
+
+
+class FakeDatabase:
+    def __init__(self, customers):
+        self.customers = customers
+        self.statements = []
+        self.copied = {}
+        self.lock = threading.Lock()
+        # Table -> (rows, first id) check_position_keys finds mismatched
+        self.mismatched = {}
+        self.rollbacks = 0
+        # Statements of every committed transaction
+        self.transactions = []
+        # Statement prefix -> [matching statements left before failing, error]
+        self.failures = {}
+        # load_progress rows by table
+        self.progress = {}
+        # Catalog: index name -> (table, definition, valid) and trigger
+        # name -> (table, definition, pg_trigger.tgtype, enabled)
+        self.indexes = {}
+        self.triggers = {}
+        # load_deferred_objects rows by (object_type, object_name), or None
+        # while the table does not exist
+        self.deferred = None
+
+    def fail(self, prefix, at=1, error=psycopg2.OperationalError):
+        """Raise `error` on the `at`-th statement starting with `prefix`"""
+        self.failures[prefix] = [at, error]
+
+    def record(self, sql):
+        self.statements.append(sql)
+        for prefix, failure in list(self.failures.items()):
+            if sql.startswith(prefix):
+                failure[0] -= 1
+                if not failure[0]:
+                    del self.failures[prefix]
+                    raise failure[1](f"injected failure at: {sql[:40]}")
+
+    def update_progress(self, sql, params):
+        row = self.progress[params[-1]]
+        if "chunk_number = chunk_number + 1" in sql:
+            row[4] += 1
+            row[5], row[6] = params[0], params[1]
+            row[7] += params[2]
+        elif "rows_loaded = %s" in sql:
+            row[7], row[8] = params[0], True
+        else:
+            row[8] = True
+
+    def deferrable_objects(self, sql, params):
+        """Answer defer_indexes_and_triggers' catalog query"""
+        assert "(tg.tgtype & %(insert_trigger)s) <> 0" in sql
+        assert "NOT tg.tgisinternal" in sql
+        return [
+            ("index", name, table, definition)
+            for name, (table, definition, _) in self.indexes.items()
+            if table in params["tables"]
+        ] + [
+            ("trigger", name, table, definition)
+            for name, (table, definition, tgtype, enabled) in self.triggers.items()
+            if table in params["tables"]
+            and tgtype & params["insert_trigger"]
+            and enabled
+        ]
+
+    def set_trigger(self, name, enabled):
+        table, definition, tgtype, _ = self.triggers[name]
+        self.triggers[name] = (table, definition, tgtype, enabled)
+
+    def pool(self, minconn, maxconn, **kwargs):
+        """Stand-in for ThreadedConnectionPool: fails when exhausted, like psycopg2"""
+        db = self
+        in_use = set()
+        lock = threading.Lock()
+
+        class Pool:
+            def getconn(self):
+                with lock:
+                    if len(in_use) >= maxconn:
+                        raise PoolError("connection pool exhausted")
+                    conn = FakeConnection(db)
+                    in_use.add(conn)
+                    return conn
+
+            def putconn(self, conn):
+                with lock:
+                    in_use.discard(conn)
+
+            def closeall(self):
+                pass
+
+        return Pool()
+
+
+@pytest.fixture(autouse=True)
+def fake_execute_values(monkeypatch):
+    """Route execute_values through the fake cursor"""
+    monkeypatch.setattr(
+        load_data,
+        "execute_values",
+        lambda cur, sql, values: cur.execute_values(sql, values),
+    )
+
+
+# ============================================
+# BULK INSERT METHODS
+# ============================================
+
+
+def test_copy_and_execute_values_insert_the_same_rows(monkeypatch):
+    df = pd.DataFrame(
+        {
+            "order_id": pd.array([1, 2, None], dtype="Int64"),
+            "shipping_address": ['1 Main St, Apt "B"', "line\nbreak", None],
+            "order_total": [10.5, float("nan"), 3.0],
+            "is_current": [True, False, True],
+        }
+    )
+    columns = list(df.columns)
+    db = FakeDatabase({})
+    conn = FakeConnection(db)
+    load_data.insert_rows(conn.cursor(), "orders", columns, df, "copy")
+    conn.commit()
+
+    inserted = []
+    monkeypatch.setattr(
+        load_data,
+        "execute_values",
+        lambda cur, sql, values: inserted.append((sql, values)),
+    )
+    load_data.insert_rows(conn.cursor(), "orders", columns, df, "execute_values")
+
+    assert db.statements == [
+        "COPY orders (order_id, shipping_address, order_total, is_current) "
+        "FROM STDIN WITH (FORMAT csv)"
+    ]
+    [(sql, values)] = inserted
+    assert sql == (
+        "INSERT INTO orders (order_id, shipping_address, order_total, is_current) "
+        "VALUES %s"
+    )
+    # Empty CSV fields load as NULL, like None parameters
+    copied = list(csv.reader(io.StringIO("\n".join(db.copied["orders"]))))
+    assert copied == [
+        ["" if value is None else str(value) for value in row] for row in values
+    ]
+    assert values[2][0] is None and values[1][2] is None
+
+
+# ============================================
+# PARALLEL LOADING
+# ============================================
+
+
+@pytest.fixture
+def history_dataset(tmp_path):
+    """Email-keyed customers, customer_history and orders files"""
+    emails = [f"customer{i}@example.com" for i in range(4)]
+    customers = pd.DataFrame(
+        {
+            "email": emails,
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+            "phone": "555-0100",
+            "registration_date": "2024-01-01",
+            "customer_segment": "Regular",
+            "segment_start_date": "2024-06-01",
+            "segment_end_date": None,
+            "is_current": True,
+        }
+    )
+    history = pd.DataFrame(
+        {
+            "customer_id": emails * 2,
+            "customer_segment": "New",
+            "segment_start_date": ["2024-01-01"] * 4 + ["2024-03-01"] * 4,
+            "segment_end_date": ["2024-03-01"] * 4 + ["2024-06-01"] * 4,
+            "is_current": False,
+        }
+    )
+    orders = pd.DataFrame(
+        {
+            "customer_id": emails * 3,
+            "order_date": "2024-07-01",
+            "order_total": 10.0,
+            "payment_method": "credit_card",
+            "shipping_address": "1 Main St",
+            "order_status": "completed",
+        }
+    )
+
+    data_files = {}
+    for dataset, df in [
+        ("customers", customers),
+        ("customer_history", history),
+        ("orders", orders),
+    ]:
+        data_files[dataset] = tmp_path / f"{dataset}.csv"
+        df.to_csv(data_files[dataset], index=False)
+    return data_files, emails
+
+
+@pytest.fixture
+def integer_dataset(history_dataset):
+    """The history_dataset files with --id-keys integer customer keys"""
+    data_files, emails = history_dataset
+    customer_ids = {email: i + 1 for i, email in enumerate(emails)}
+    for dataset, data_path in data_files.items():
+        df = pd.read_csv(data_path)
+        if dataset == "customers":
+            df.insert(0, "customer_id", df["email"].map(customer_ids))
+        else:
+            df["customer_id"] = df["customer_id"].map(customer_ids)
+        df.to_csv(data_path, index=False)
+    return data_files
+
+
+def lookups(db):
+    return [s for s in db.statements if s.startswith("SELECT email, customer_id")]
+
+
+def test_load_parallel_customer_lookup_does_not_exhaust_pool(
+    history_dataset, monkeypatch
+):
+    data_files, emails = history_dataset
+    db = FakeDatabase({email: i + 1 for i, email in enumerate(emails)})
+    monkeypatch.setattr(load_data, "ThreadedConnectionPool", db.pool)
+
+    # Two-row ranges, so each table keeps every worker busy
+    iter_data_file = load_data.iter_data_file
+    monkeypatch.setattr(
+        load_data,
+        "iter_data_file",
+        lambda data_path: iter_data_file(data_path, chunk_size=2),
+    )
+
+    counts = load_data.load_parallel(data_files, workers=2)
+
+    assert counts == {"customers": 4, "customer_history": 8, "orders": 12}
+    assert {table: len(rows) for table, rows in db.copied.items()} == counts
+    assert len(lookups(db)) == 1
+
+
+def test_integer_customer_keys_skip_the_lookup(integer_dataset, monkeypatch):
+    db = FakeDatabase({})
+    monkeypatch.setattr(load_data, "ThreadedConnectionPool", db.pool)
+
+    counts = load_data.load_parallel(integer_dataset, workers=2)
+    conn = FakeConnection(db)
+    load_data.load_customer_history(conn, integer_dataset["customer_history"])
+    load_data.load_orders(conn, integer_dataset["orders"])
+    load_data.load_incremental(conn, integer_dataset)
+
+    assert counts == {"customers": 4, "customer_history": 8, "orders": 12}
+    assert lookups(db) == []
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_email_customer_keys_by_file_type(tmp_path, suffix):
+    data_path = tmp_path / f"orders{suffix}"
+    for keys, email_keyed in [
+        (["a@example.com", "b@example.com"], True),
+        ([1, 2], False),
+    ]:
+        df = pd.DataFrame({"customer_id": keys, "order_total": 10.0})
+        if suffix == ".parquet":
+            df.to_parquet(data_path, index=False)
+        else:
+            df.to_csv(data_path, index=False)
+        assert load_data.email_customer_keys(data_path) == email_keyed
+
+
+# ============================================
+# SEQUENTIAL LOADING
+# ============================================
+
+
+def copied_ids(db, table):
+    """First CSV field (the SERIAL key) of every row copied into a table"""
+    return [int(row.split(",")[0]) for row in db.copied[table]]
+
+
+@pytest.fixture
+def full_dataset(history_dataset, tmp_path):
+    """The history_dataset files plus order_items, as load_data.main needs"""
+    data_files, emails = history_dataset
+    data_files["order_items"] = tmp_path / "order_items.csv"
+    pd.DataFrame(
+        {
+            "order_id": [1, 1, 2, 4],
+            "product_id": 7,
+            "quantity": 1,
+            "unit_price": 10.0,
+            "discount_amount": 0.0,
+        }
+    ).to_csv(data_files["order_items"], index=False)
+    return data_files, emails
+
+
+def test_load_sequential_numbers_serial_ids_from_file_position(full_dataset):
+    data_files, emails = full_dataset
+    # The third order's customer is unknown: it is skipped, leaving a gap
+    orders = pd.read_csv(data_files["orders"])
+    orders.loc[2, "customer_id"] = "unknown@example.com"
+    orders.to_csv(data_files["orders"], index=False)
+
+    db = FakeDatabase({email: i + 1 for i, email in enumerate(emails)})
+    load_data.load_sequential(FakeConnection(db), data_files)
+
+    assert copied_ids(db, "customers") == [1, 2, 3, 4]
+    assert copied_ids(db, "orders") == [1, 2] + list(range(4, 13))
+    assert copied_ids(db, "order_items") == [1, 2, 3, 4]
+
+    for table, key in load_data.SERIAL_KEYS.items():
+        assert f"TRUNCATE TABLE {table} RESTART IDENTITY" in " ".join(db.statements)
+        assert any(
+            f"pg_get_serial_sequence('{table}', '{key}')" in s for s in db.statements
+        )
+
+
+# ============================================
+# INCREMENTAL LOADING
+# ============================================
+
+
+def test_incremental_checks_position_keys_before_merging(history_dataset):
+    data_files, emails = history_dataset
+    db = FakeDatabase({email: i + 1 for i, email in enumerate(emails)})
+
+    load_data.load_incremental(FakeConnection(db), data_files)
+    checks = [s for s in db.statements if s.startswith("SELECT COUNT(*), MIN(")]
+    assert len(checks) == 1
+    assert "JOIN orders t USING (order_id)" in checks[0]
+    assert "(s.customer_id, s.order_date) IS DISTINCT FROM" in checks[0]
+    assert any(
+        s.startswith("WITH merged AS ( INSERT INTO orders") for s in db.statements
+    )
+
+
+def test_incremental_refuses_regenerated_orders(history_dataset):
+    data_files, emails = history_dataset
+    db = FakeDatabase({email: i + 1 for i, email in enumerate(emails)})
+    db.mismatched["orders"] = (3, 5)
+
+    with pytest.raises(ValueError, match="3 orders rows \\(first order_id 5\\)"):
+        load_data.load_incremental(FakeConnection(db), data_files)
+    assert db.rollbacks == 1
+    assert not any(
+        s.startswith("WITH merged AS ( INSERT INTO orders") for s in db.statements
+    )
+
+
+# ============================================
+# INDEX AND TRIGGER DEFERRAL
+# ============================================
+
+# pg_trigger.tgtype of a row-level BEFORE UPDATE and an AFTER INSERT trigger
+BEFORE_UPDATE_ROW = 1 | 2 | 16
+AFTER_INSERT_ROW = 1 | 4
+
+
+@pytest.fixture
+def catalog_db(full_dataset):
+    """FakeDatabase with init_db.sql-style secondary indexes and triggers"""
+    _, emails = full_dataset
+    db = FakeDatabase({email: i + 1 for i, email in enumerate(emails)})
+    for table, column in [("orders", "customer_id"), ("customers", "email")]:
+        name = f"idx_{table}_{column}"
+        db.indexes[name] = (
+            table,
+            f"CREATE INDEX {name} ON public.{table} USING btree ({column})",
+            True,
+        )
+    db.triggers["update_orders_updated_at"] = (
+        "orders",
+        "CREATE TRIGGER update_orders_updated_at BEFORE UPDATE ON orders ...",
+        BEFORE_UPDATE_ROW,
+        True,
+    )
+    db.triggers["audit_order_inserts"] = (
+        "orders",
+        "CREATE TRIGGER audit_order_inserts AFTER INSERT ON orders ...",
+        AFTER_INSERT_ROW,
+        True,
+    )
+    return db
+
+
+def test_defer_drops_indexes_and_disables_only_insert_triggers(catalog_db):
+    db = catalog_db
+    indexes = dict(db.indexes)
+
+    assert load_data.defer_indexes_and_triggers(FakeConnection(db)) == 3
+    assert db.indexes == {}
+    assert not db.triggers["audit_order_inserts"][3]
+    assert db.triggers["update_orders_updated_at"][3]
+    assert sorted(db.deferred) == [
+        ("index", "idx_customers_email"),
+        ("index", "idx_orders_customer_id"),
+        ("trigger", "audit_order_inserts"),
+    ]
+
+    # Recorded and dropped in one transaction
+    [transaction] = db.transactions
+    assert any(s.startswith("INSERT INTO load_deferred_objects") for s in transaction)
+    assert "DROP INDEX idx_orders_customer_id;" in transaction
+
+    assert load_data.restore_deferred_objects(FakeConnection(db)) == 3
+    assert db.indexes.keys() == indexes.keys()
+    assert all(valid for _, _, valid in db.indexes.values())
+    assert all(enabled for *_, enabled in db.triggers.values())
+    assert db.deferred == {}
+
+
+def test_deferred_objects_are_restored_after_a_failed_load(
+    catalog_db, full_dataset, monkeypatch
+):
+    data_files, _ = full_dataset
+    db = catalog_db
+    db.fail("COPY orders")
+    monkeypatch.setattr(load_data, "get_db_connection", lambda: FakeConnection(db))
+    monkeypatch.setattr(load_data, "find_data_file", data_files.get)
+
+    assert not load_data.main(["--defer-indexes"])
+
+    assert "DROP INDEX idx_orders_customer_id;" in db.statements
+    assert db.indexes.keys() == {"idx_orders_customer_id", "idx_customers_email"}
+    assert all(enabled for *_, enabled in db.triggers.values())
+    assert db.deferred == {}
+    assert "ANALYZE orders;" in db.statements
+    assert "orders" not in db.copied
+
+
+def test_interrupted_deferral_is_repaired_by_the_next_run(catalog_db):
+    db = catalog_db
+    load_data.defer_indexes_and_triggers(FakeConnection(db))
+    # The process died while CREATE INDEX CONCURRENTLY was building one index
+    table, definition = db.deferred["index", "idx_orders_customer_id"][2:]
+    db.indexes["idx_orders_customer_id"] = (table, definition, False)
+
+    assert load_data.restore_deferred_objects(FakeConnection(db)) == 3
+    assert "DROP INDEX CONCURRENTLY IF EXISTS idx_orders_customer_id;" in db.statements
+    assert all(valid for _, _, valid in db.indexes.values())
+    assert all(enabled for *_, enabled in db.triggers.values())
+    assert db.deferred == {}
+    # Nothing is left to restore
+    assert load_data.restore_deferred_objects(FakeConnection(db)) == 0
+
+
+# ============================================
+# SHADOW TABLE SWAP
+# ============================================
+
+
+@pytest.fixture
+def live_tables():
+    """FakeDatabase whose live tables hold one stale row each"""
+    db = FakeDatabase({})
+    for table in load_data.SWAP_TABLES:
+        db.copied[table] = ["stale"]
+    return db
+
+
+def test_swap_retries_when_the_live_tables_are_busy(live_tables, monkeypatch):
+    db = live_tables
+    for table in load_data.SWAP_TABLES:
+        db.copied[load_data.shadow_table(table)] = ["fresh"]
+    db.fail("LOCK TABLE", error=psycopg2.errors.LockNotAvailable)
+    sleeps = []
+    monkeypatch.setattr(load_data.time, "sleep", sleeps.append)
+
+    load_data.swap_shadow_tables(
+        FakeConnection(db),
+        [("idx_orders_customer_id_shadow", "idx_orders_customer_id")],
+    )
+
+    assert sleeps == [1]
+    assert db.rollbacks == 1
+    # The second attempt swaps everything in a single transaction
+    [transaction] = db.transactions
+    assert transaction[1] == (
+        "LOCK TABLE customers, customer_history, orders, order_items "
+        "IN ACCESS EXCLUSIVE MODE;"
+    )
+    for statement in [
+        "ALTER SEQUENCE public.orders_order_id_seq OWNED BY orders_shadow.order_id;",
+        "DROP TABLE customers, customer_history, orders, order_items;",
+        "ALTER TABLE orders_shadow RENAME TO orders;",
+        "ALTER INDEX idx_orders_customer_id_shadow RENAME TO idx_orders_customer_id;",
+    ]:
+        assert statement in transaction
+    assert db.copied == {table: ["fresh"] for table in load_data.SWAP_TABLES}
+
+
+def test_swap_load_replaces_the_live_tables(live_tables, full_dataset):
+    data_files, emails = full_dataset
+    db = live_tables
+    db.customers = {email: i + 1 for i, email in enumerate(emails)}
+    db.indexes["idx_orders_customer_id"] = (
+        "orders",
+        "CREATE INDEX idx_orders_customer_id ON public.orders USING btree "
+        "(customer_id)",
+        True,
+    )
+
+    counts = load_data.load_swap(FakeConnection(db), data_files)
+
+    assert sorted(db.copied) == sorted(load_data.SWAP_TABLES)
+    assert {table: len(db.copied[table]) for table in counts} == counts
+    assert not any(s.startswith("TRUNCATE") for s in db.statements)
+    assert (
+        "CREATE INDEX idx_orders_customer_id_shadow ON orders_shadow USING btree "
+        "(customer_id)" in db.statements
+    )
+    assert (
+        "ALTER INDEX idx_orders_customer_id_shadow RENAME TO idx_orders_customer_id;"
+        in db.statements
+    )
+
+
+def test_failed_swap_load_leaves_the_live_tables(live_tables, full_dataset):
+    data_files, emails = full_dataset
+    db = live_tables
+    db.customers = {email: i + 1 for i, email in enumerate(emails)}
+    db.fail("COPY orders_shadow")
+
+    with pytest.raises(psycopg2.OperationalError):
+        load_data.load_swap(FakeConnection(db), data_files)
+
+    assert db.copied == {table: ["stale"] for table in load_data.SWAP_TABLES}
+    assert db.statements[-1].startswith("DROP TABLE IF EXISTS customers_shadow")
+    assert not any(s.startswith("LOCK TABLE") for s in db.statements)
+
+
+# ============================================
+# RESUMABLE (CHUNKED) LOADING
+# ============================================
+
+
+def test_chunked_load_resumes_after_the_last_committed_chunk(history_dataset, tmp_path):
+    data_files, emails = history_dataset
+    metrics_log = tmp_path / "logs" / "load_metrics.jsonl"
+    db = FakeDatabase({email: i + 1 for i, email in enumerate(emails)})
+    # The connection drops while copying the third chunk of orders
+    db.fail("COPY orders", at=3)
+
+    with pytest.raises(psycopg2.OperationalError):
+        load_data.load_chunked(
+            FakeConnection(db), data_files, chunk_size=2, metrics_log=metrics_log
+        )
+
+    assert db.progress["customers"][8] and db.progress["customer_history"][8]
+    chunk, row_offset, byte_offset, rows_loaded, completed = db.progress["orders"][4:]
+    assert (chunk, row_offset, rows_loaded, completed) == (2, 4, 4, False)
+    assert byte_offset > 0
+    assert len(db.copied["orders"]) == 4
+
+    db.statements.clear()
+    counts = load_data.load_chunked(
+        FakeConnection(db), data_files, chunk_size=2, metrics_log=metrics_log
+    )
+
+    assert counts == {"customers": 4, "customer_history": 8, "orders": 12}
+    assert not any(s.startswith("TRUNCATE") for s in db.statements)
+    order_ids = [int(line.split(",")[0]) for line in db.copied["orders"]]
+    assert order_ids == list(range(1, 13))
+    assert len(db.copied["customers"]) == 4
+    assert all(row[8] for row in db.progress.values())
+
+    metrics = [json.loads(line) for line in metrics_log.read_text().splitlines()]
+    orders = [m for m in metrics if m["table"] == "orders"]
+    assert [m["chunk"] for m in orders] == [1, 2, 3, 4, 5, 6]
+    assert [m["row_offset"] for m in orders] == [2, 4, 6, 8, 10, 12]
+    assert sum(m["rows"] for m in metrics) == 24
@@ -0,0 +1,290 @@
+"""
+Tests for the S3 load manifest and staging in scripts/load_events_to_postgres.py
+
+The manifest table is kept by a fake cursor that evaluates the loader's
+manifest queries, including their LIKE prefix patterns. The same cursor
+stages COPYed CSV rows and merges them into clickstream_events by event_id.
+"""
+
+import csv
+import io
+import re
+
+import lake_reader
+import load_events_to_postgres as loader
+import pytest
+
+BUCKET = "lake-test"
+
+# ============================================
+# FAKE DATABASE
+# ============================================
+
+
+def like(pattern, value):
+    """Evaluate SQL `value LIKE pattern` (backslash escapes)"""
+    regex = ""
+    chars = iter(pattern)
+    for char in chars:
+        if char == "\\":
+            regex += re.escape(next(chars))
+        elif char == "%":
+            regex += ".*"
+        elif char == "_":
+            regex += "."
+        else:
+            regex += re.escape(char)
+    return re.fullmatch(regex, value, re.DOTALL) is not None
+
+
+class FakeCursor:
+    def __init__(self, manifest, user_id_type="VARCHAR(255)"):
+        self.manifest = manifest
+        self.user_id_type = user_id_type
+        self.statements = []
+        self.rows = []
+        self.rowcount = -1
+        # clickstream_events_stage columns and rows, and loaded events by id
+        self.stage_columns = list(loader.EVENT_COLUMNS)
+        self.stage = []
+        self.events = {}
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.statements.append(sql)
+        self.rowcount = -1
+        if sql.startswith(
+            f"SELECT s3_key, etag, size_bytes FROM {loader.MANIFEST_TABLE}"
+        ):
+            assert sql.endswith("WHERE bucket = %s AND s3_key LIKE %s;")
+            bucket, pattern = params
+            self.rows = [
+                (key, etag, size)
+                for (b, key), (etag, size, _) in self.manifest.items()
+                if b == bucket and like(pattern, key)
+            ]
+        elif sql.startswith("DROP TABLE IF EXISTS clickstream_events"):
+            self.user_id_type = None
+        elif sql.startswith("CREATE TABLE IF NOT EXISTS clickstream_events"):
+            created = re.search(r"user_id (\S+),", sql).group(1)
+            self.user_id_type = self.user_id_type or created
+        elif sql.startswith("ALTER TABLE clickstream_events_stage ADD COLUMN"):
+            column = re.search(r'EXISTS "(.+)" TEXT;', sql).group(1)
+            if column not in self.stage_columns:
+                self.stage_columns.append(column)
+        elif sql.startswith("SELECT COUNT(*) FROM clickstream_events_stage"):
+            self.rows = [(len(self.stage),)]
+        elif sql.startswith("INSERT INTO clickstream_events "):
+            assert sql.endswith("ON CONFLICT (event_id) DO NOTHING;")
+            self.rowcount = 0
+            for row in self.stage:
+                if row["event_id"] not in self.events:
+                    self.events[row["event_id"]] = row
+                    self.rowcount += 1
+        elif sql.startswith("SELECT atttypid = %s::regtype"):
+            self.rows = [(params[0] == self.user_id_type,)]
+        elif sql.startswith(f"DELETE FROM {loader.MANIFEST_TABLE}"):
+            assert sql.endswith("WHERE bucket = %s AND s3_key LIKE %s;")
+            bucket, pattern = params
+            for b, key in list(self.manifest):
+                if b == bucket and like(pattern, key):
+                    del self.manifest[b, key]
+
+    def copy_expert(self, sql, file):
+        self.statements.append(sql)
+        header = re.fullmatch(
+            r"COPY clickstream_events_stage \((.*)\) FROM STDIN WITH \(FORMAT csv\)",
+            sql,
+        ).group(1)
+        columns = [column.strip('"') for column in header.split(", ")]
+        assert set(columns) <= set(self.stage_columns)
+        rows = [dict(zip(columns, values)) for values in csv.reader(file)]
+        self.stage.extend(rows)
+        self.rowcount = len(rows)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self.cur = cursor
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        # The staging table is ON COMMIT DELETE ROWS
+        self.cur.stage.clear()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def manifest(monkeypatch):
+    """Manifest rows {(bucket, s3_key): (etag, size_bytes, row_count)}"""
+    rows = {}
+
+    def execute_values(cur, sql, values):
+        assert "ON CONFLICT (bucket, s3_key) DO UPDATE" in sql
+        for bucket, key, etag, size, row_count in values:
+            rows[bucket, key] = (etag, size, row_count)
+
+    monkeypatch.setattr(loader, "execute_values", execute_values)
+    monkeypatch.setattr(loader, "S3_BUCKET", BUCKET)
+    return rows
+
+
+@pytest.fixture(autouse=True)
+def fake_quote_ident(monkeypatch):
+    """quote_ident without a server connection to take the encoding from"""
+    monkeypatch.setattr(
+        loader, "quote_ident", lambda name, cur: '"' + name.replace('"', '""') + '"'
+    )
+
+
+def put_local(root, key, body):
+    """Write an object into a LocalS3Client directory"""
+    path = root / BUCKET / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+
+
+# ============================================
+# TESTS
+# ============================================
+
+
+def test_prefix_pattern_escapes_like_wildcards():
+    assert loader.prefix_pattern("raw/clickstream/") == "raw/clickstream/%"
+    assert loader.prefix_pattern("a_b%c\\d/") == "a\\_b\\%c\\\\d/%"
+
+    pattern = loader.prefix_pattern("raw/click_stream%/")
+    assert like(pattern, "raw/click_stream%/date=2024-01-01/part-0.csv")
+    assert not like(pattern, "raw/clickXstream%/part-0.csv")
+    assert not like(pattern, "raw/click_streamX/part-0.csv")
+
+
+def test_unchanged_files_are_skipped_and_changed_files_reloaded(tmp_path, manifest):
+    prefix = loader.S3_PREFIX
+    for name in ["a", "b", "c"]:
+        put_local(tmp_path, f"{prefix}{name}.csv", b"event_id\n1\n")
+    s3 = lake_reader.LocalS3Client(tmp_path)
+    cur = FakeCursor(manifest)
+
+    listed = list(lake_reader.list_objects(s3, BUCKET, prefix, ".csv"))
+    assert loader.unloaded_objects(cur, listed) == listed
+
+    loader.record_loaded_objects(cur, [(obj, 1) for obj in listed])
+    assert loader.unloaded_objects(cur, listed) == []
+
+    # b is rewritten with the same size (new ETag), c grows (new size)
+    put_local(tmp_path, f"{prefix}b.csv", b"event_id\n2\n")
+    put_local(tmp_path, f"{prefix}c.csv", b"event_id\n1\n3\n")
+    put_local(tmp_path, f"{prefix}d.csv", b"event_id\n4\n")
+    listed = list(lake_reader.list_objects(s3, BUCKET, prefix, ".csv"))
+
+    changed = loader.unloaded_objects(cur, listed)
+    assert [obj["Key"] for obj in changed] == [
+        f"{prefix}{name}.csv" for name in ["b", "c", "d"]
+    ]
+
+    loader.record_loaded_objects(cur, [(obj, 2) for obj in changed])
+    assert loader.unloaded_objects(cur, listed) == []
+    assert manifest[BUCKET, f"{prefix}a.csv"][2] == 1
+    assert manifest[BUCKET, f"{prefix}c.csv"] == (
+        changed[1]["ETag"],
+        changed[1]["Size"],
+        2,
+    )
+
+
+@pytest.mark.parametrize("full_refresh", [False, True])
+def test_full_refresh_clears_only_prefix_entries(manifest, monkeypatch, full_refresh):
+    monkeypatch.setattr(loader, "S3_PREFIX", "raw/click_stream/")
+    entries = [
+        (BUCKET, "raw/click_stream/date=2024-01-01/a.csv"),
+        (BUCKET, "raw/clickXstream/b.csv"),
+        (BUCKET, "raw/products/p.json"),
+        ("other-bucket", "raw/click_stream/date=2024-01-01/a.csv"),
+    ]
+    for entry in entries:
+        manifest[entry] = ('"etag"', 10, 1)
+    cur = FakeCursor(manifest)
+    monkeypatch.setattr(
+        loader.psycopg2, "connect", lambda **kwargs: FakeConnection(cur)
+    )
+
+    loader.create_events_table(full_refresh=full_refresh)
+
+    expected = entries[1:] if full_refresh else entries
+    assert sorted(manifest) == sorted(expected)
+    dropped = any(s.startswith("DROP TABLE") for s in cur.statements)
+    assert dropped == full_refresh
+
+
+def test_user_id_type_follows_key_mode(manifest, monkeypatch):
+    cur = FakeCursor(manifest, user_id_type=None)
+    monkeypatch.setattr(
+        loader.psycopg2, "connect", lambda **kwargs: FakeConnection(cur)
+    )
+
+    loader.create_events_table(id_keys="integer")
+    assert cur.user_id_type == "INTEGER"
+    loader.merge_staged_events(cur, "integer")
+    assert "NULLIF(user_id, '')::INTEGER" in cur.statements[-1]
+
+    # Email keys need the table recreated first
+    with pytest.raises(ValueError, match="--full-refresh"):
+        loader.create_events_table(id_keys="email")
+    loader.create_events_table(full_refresh=True, id_keys="email")
+    assert cur.user_id_type == "VARCHAR(255)"
+
+
+def test_csv_files_are_staged_and_merged_by_event_id(manifest):
+    cur = FakeCursor(manifest)
+    first = (
+        "event_id,session_id,user_id,event_timestamp,event_type,product_id,"
+        "page_url,device_type,browser\n"
+        "e1,s1,a@example.com,2024-01-01 10:00:00,page_view,,/,desktop,Chrome\n"
+        'e2,s1,a@example.com,2024-01-01 10:01:00,add_to_cart,7,"/p/7,x",desktop,'
+        "Chrome\n"
+    )
+    # Columns in another order, an extra column and an event loaded before
+    second = (
+        "session_id,event_id,event_type,user_id,event_timestamp,product_id,"
+        "page_url,device_type,browser,referrer\n"
+        "s2,e2,page_view,,2024-01-02 09:00:00,,/,mobile,Safari,google\n"
+        "s2,e3,page_view,,2024-01-02 09:01:00,,/,mobile,Safari,\n"
+    )
+
+    assert loader.copy_csv_to_stage(cur, io.BytesIO(first.encode())) == 2
+    assert cur.statements[-1] == (
+        'COPY clickstream_events_stage ("event_id", "session_id", "user_id", '
+        '"event_timestamp", "event_type", "product_id", "page_url", '
+        '"device_type", "browser") FROM STDIN WITH (FORMAT csv)'
+    )
+    assert loader.copy_csv_to_stage(cur, io.BytesIO(second.encode())) == 2
+    assert (
+        'ALTER TABLE clickstream_events_stage ADD COLUMN IF NOT EXISTS "referrer" '
+        "TEXT;" in cur.statements
+    )
+    assert cur.stage[1]["page_url"] == "/p/7,x"
+    assert cur.stage[2]["referrer"] == "google"
+
+    assert loader.merge_staged_events(cur) == (4, 3)
+    assert sorted(cur.events) == ["e1", "e2", "e3"]
+    assert cur.events["e2"]["session_id"] == "s1"
+
+    FakeConnection(cur).commit()
+    assert loader.merge_staged_events(cur) == (0, 0)
@@ -21,12 +21,58 @@
 -- Grain: One row per customer (with SCD Type 2 history)
 -- ==============================================================================
 
-with source as (
+with customers as (
 
     select * from {{ source('postgres_ecommerce', 'customers') }}
 
 ),
 
+-- Earlier segment versions (empty unless generated with --history-depth);
+-- identity columns come from the customer's current row
+history as (
+
+    select
+        c.customer_id,
+        c.email,
+        c.first_name,
+        c.last_name,
+        c.phone,
+        c.registration_date,
+        h.customer_segment,
+        h.segment_start_date,
+        h.segment_end_date,
+        h.is_current,
+        h.created_at,
+        h.updated_at
+    from {{ source('postgres_ecommerce', 'customer_history') }} h
+    inner join customers c
+        on h.customer_id = c.customer_id
+
+),
+
+source as (
+
+    select
+        customer_id,
+        email,
+        first_name,
+        last_name,
+        phone,
+        registration_date,
+        customer_segment,
+        segment_start_date,
+        segment_end_date,
+        is_current,
+        created_at,
+        updated_at
+    from customers
+
+    union all
+
+    select * from history
+
+),
+
 renamed as (
 
     select